@@ -1,6 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Store, Product, StoreProduct, Seller, Sale, SaleItem, StockMovement, CashFlow, Category, Cliente, Fornecedor, Funcionario, ContaPagar, ContaReceber, FolhaPagamento, RelatorioFinanceiro
+from django.db.models import Q
+from django.utils.html import format_html
+from .models import User, Store, Product, StoreProduct, Seller, Sale, SaleItem, StockMovement, StockSnapshot, CashFlow, Category, Cliente, Fornecedor, Funcionario, ContaPagar, ContaPagarRecorrente, ContaReceber, RecebimentoConta, SaldoCliente, FolhaPagamento, RelatorioFinanceiro, RegistroExclusao, SellerDailyStats, Tarefa, Arquivamento
+from .images import clear_variants, schedule_variants
+from .search import search_clientes
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'role', 'is_staff', 'store')
@@ -54,27 +58,57 @@ class ProductAdmin(admin.ModelAdmin):
     
     def image_tag(self, obj):
         if obj.image:
-            return f'<img src="{obj.image.url}" style="height: 50px;" />'
+            thumbnail = (obj.image_variants or {}).get('160', {}).get('jpeg')
+            url = obj.image.storage.url(thumbnail) if thumbnail else obj.image.url
+            return format_html('<img src="{}" style="height: 50px;" />', url)
         return '-'
     image_tag.short_description = 'Foto'
-    image_tag.allow_tags = True
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            if obj.image:
+                schedule_variants(obj)
+            else:
+                clear_variants(obj)
 
 @admin.register(StoreProduct)
 class StoreProductAdmin(admin.ModelAdmin):
-    list_display = ['product', 'store', 'quantity']
-    list_filter = ['store', 'product__category']
+    list_display = ['product', 'store', 'quantity', 'reorder_level', 'stock_status']
+    list_filter = ['store', 'stock_status', 'product__category']
     search_fields = ['product__name', 'store__name']
 
+    def save_model(self, request, obj, form, change):
+        quantidade_anterior = form.initial.get('quantity', 0) if change else 0
+        super().save_model(request, obj, form, change)
+        StockMovement.registrar(obj.store, obj.product, obj.quantity - quantidade_anterior, 'Ajuste de estoque (admin)')
+
 @admin.register(Seller)
 class SellerAdmin(admin.ModelAdmin):
-    list_display = ['name', 'email', 'phone', 'store']
+    list_display = ['name', 'email', 'phone', 'store', 'funcionario']
     list_filter = ['store']
     search_fields = ['name', 'email']
+    raw_id_fields = ['funcionario']
+
+@admin.register(SellerDailyStats)
+class SellerDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['date', 'seller', 'store', 'sales_count', 'revenue', 'items_count']
+    list_filter = ['store', 'date']
+    date_hierarchy = 'date'
+    readonly_fields = ['seller', 'store', 'date', 'sales_count', 'revenue', 'items_count', 'updated_at']
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
     list_display = ('nome', 'email', 'telefone', 'cpf', 'grau_od', 'grau_oe', 'dnp_od', 'dnp_oe', 'adicao')
-    search_fields = ('nome', 'email', 'cpf')
+    search_fields = ('email',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """E-mail pelo admin; nome, CPF e telefone pelas chaves normalizadas, como na API"""
+        por_email, duplicados = super().get_search_results(request, queryset, search_term)
+        if not search_term.strip():
+            return por_email, duplicados
+        normalizados = search_clientes(queryset, search_term).order_by().values('pk')
+        return queryset.filter(Q(pk__in=normalizados) | Q(pk__in=por_email.values('pk'))), False
 
 # Admin para Gestão Financeira
 @admin.register(Fornecedor)
@@ -101,6 +135,12 @@ class ContaPagarAdmin(admin.ModelAdmin):
     date_hierarchy = 'data_vencimento'
     readonly_fields = ('valor_restante', 'dias_vencimento')
 
+@admin.register(ContaPagarRecorrente)
+class ContaPagarRecorrenteAdmin(admin.ModelAdmin):
+    list_display = ('descricao', 'tipo', 'valor', 'dia_vencimento', 'data_inicio', 'data_fim', 'ativo', 'store')
+    list_filter = ('tipo', 'ativo', 'store')
+    search_fields = ('descricao',)
+
 @admin.register(ContaReceber)
 class ContaReceberAdmin(admin.ModelAdmin):
     list_display = ('descricao', 'tipo', 'cliente', 'valor', 'data_vencimento', 'status', 'store')
@@ -110,6 +150,21 @@ class ContaReceberAdmin(admin.ModelAdmin):
     date_hierarchy = 'data_vencimento'
     readonly_fields = ('valor_restante', 'dias_vencimento')
 
+@admin.register(RecebimentoConta)
+class RecebimentoContaAdmin(admin.ModelAdmin):
+    list_display = ('conta', 'valor', 'data_recebimento', 'forma_pagamento', 'criado_por')
+    list_filter = ('forma_pagamento', 'data_recebimento')
+    search_fields = ('conta__descricao', 'conta__cliente__nome')
+    date_hierarchy = 'data_recebimento'
+    raw_id_fields = ('conta',)
+
+@admin.register(SaldoCliente)
+class SaldoClienteAdmin(admin.ModelAdmin):
+    list_display = ('cliente', 'total_aberto', 'contas_abertas', 'atualizado_em')
+    search_fields = ('cliente__nome_busca', 'cliente__cpf_busca')
+    ordering = ('-total_aberto',)
+    readonly_fields = ('cliente', 'total_aberto', 'contas_abertas', 'atualizado_em')
+
 @admin.register(FolhaPagamento)
 class FolhaPagamentoAdmin(admin.ModelAdmin):
     list_display = ('funcionario', 'ano', 'mes', 'salario_base', 'comissao', 'bonus', 'descontos', 'salario_liquido', 'pago')
@@ -126,11 +181,32 @@ class RelatorioFinanceiroAdmin(admin.ModelAdmin):
     ordering = ('-data_fim',)
     readonly_fields = ('receita_total', 'despesa_total', 'lucro_bruto', 'margem_lucro')
 
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nome', 'status', 'tentativas', 'criado_por', 'criado_em', 'concluida_em')
+    list_filter = ('status', 'nome')
+    ordering = ('-criado_em',)
+    readonly_fields = ('resultado', 'erro', 'iniciada_em', 'concluida_em')
+
+@admin.register(RegistroExclusao)
+class RegistroExclusaoAdmin(admin.ModelAdmin):
+    list_display = ('recurso', 'objeto_id', 'store_id', 'excluido_em')
+    list_filter = ('recurso',)
+    ordering = ('-excluido_em',)
+    readonly_fields = ('recurso', 'objeto_id', 'store_id', 'excluido_em')
+
+@admin.register(Arquivamento)
+class ArquivamentoAdmin(admin.ModelAdmin):
+    list_display = ('corte', 'iniciado_em', 'concluido_em', 'movidas')
+    ordering = ('-iniciado_em',)
+    readonly_fields = ('corte', 'iniciado_em', 'concluido_em', 'movidas')
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Store, StoreAdmin)
 admin.site.register(Product, ProductAdmin)
 admin.site.register(Sale, SaleAdmin)
 admin.site.register(SaleItem)
 admin.site.register(StockMovement)
+admin.site.register(StockSnapshot)
 admin.site.register(CashFlow)
 admin.site.register(Category, CategoryAdmin) 
\ No newline at end of file
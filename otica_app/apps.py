@@ -3,4 +3,14 @@ from django.apps import AppConfig
 
 class OticaAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'otica_app' 
\ No newline at end of file
+    name = 'otica_app' 
+
+    def ready(self):
+        # Registra as tarefas em segundo plano (ver tasks.py)
+        from . import images, relatorios  # noqa: F401
+        # Marcas de exclusão da sincronização incremental (receptores de post_delete)
+        from . import sincronizacao  # noqa: F401
+        # Saldo dos clientes nas exclusões de contas a receber
+        from . import recebiveis  # noqa: F401
+        # Versão do estoque para os caches de valorização
+        from . import stock  # noqa: F401
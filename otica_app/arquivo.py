@@ -0,0 +1,149 @@
+"""
+Arquivo frio de vendas, movimentações de estoque e fluxo de caixa.
+
+O comando arquivar_periodos copia para as tabelas Archived* (mesmas colunas
+e ids) as linhas anteriores ao corte e as apaga das tabelas quentes, em
+lotes com uma transação cada. As tabelas quentes ficam com os meses recentes
+e cabem em memória.
+
+Relatórios chamam fontes(Model, inicio): se o período começa antes do corte
+do último arquivamento (ou não tem início), a consulta roda também no arquivo
+e os resultados são somados com somar_por. Como as tabelas de arquivo têm os
+mesmos nomes de campos e relações, o mesmo filtro serve para as duas.
+
+Ficam na tabela quente, mesmo antigas:
+    vendas de sessões de caixa ainda abertas (o fechamento soma as vendas);
+    vendas ligadas a contas a receber (a FK venda seria anulada);
+    fluxos de caixa de sessões ainda abertas.
+"""
+from datetime import date, datetime, time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils import timezone
+
+from .models import (
+    ArchivedCashFlow, ArchivedSale, ArchivedSaleItem, ArchivedStockMovement, Arquivamento,
+    CashFlow, ContaReceber, Sale, SaleItem, StockMovement,
+)
+from .utils import somar_meses
+
+TAMANHO_LOTE = 1000
+# O arquivo só muda quando o comando roda; agregados sobre ele podem ficar em cache
+CACHE_TIMEOUT = 60 * 60
+
+ARQUIVOS = {
+    Sale: ArchivedSale,
+    SaleItem: ArchivedSaleItem,
+    StockMovement: ArchivedStockMovement,
+    CashFlow: ArchivedCashFlow,
+}
+
+
+def _estado():
+    """(corte, versão) do arquivo; versão None se o último arquivamento não terminou"""
+    estado = Arquivamento.objects.aggregate(
+        corte=Max('corte'),
+        ultimo=Max('id'),
+        ultimo_concluido=Max('id', filter=Q(concluido_em__isnull=False)),
+    )
+    versao = estado['ultimo'] if estado['ultimo'] == estado['ultimo_concluido'] else None
+    return estado['corte'], versao
+
+
+def data_corte():
+    """Tudo anterior a esta data pode estar no arquivo; None se nunca houve arquivamento"""
+    return _estado()[0]
+
+
+def fontes(model, inicio=None):
+    """
+    Managers a consultar para dados a partir de `inicio` (date, datetime ou
+    None para todo o histórico): a tabela quente e, se preciso, a de arquivo.
+    """
+    corte = data_corte()
+    if isinstance(inicio, datetime):
+        inicio = timezone.localdate(inicio)
+    if corte is not None and (inicio is None or inicio < corte):
+        return [model.objects, ARQUIVOS[model].objects]
+    return [model.objects]
+
+
+def agregado_arquivado(chave, funcao):
+    """Resultado de `funcao` (consulta ao arquivo) em cache enquanto o arquivo não mudar"""
+    versao = _estado()[1]
+    if versao is None:
+        return funcao()
+    return cache.get_or_set(f'arquivo:{versao}:{chave}', funcao, CACHE_TIMEOUT)
+
+
+def somar_por(linhas, *chaves):
+    """
+    Junta linhas agregadas de várias fontes: linhas com os mesmos valores em
+    `chaves` viram uma, com os demais campos somados (None conta como zero).
+    """
+    resultado = {}
+    for linha in linhas:
+        chave = tuple(linha[campo] for campo in chaves)
+        atual = resultado.get(chave)
+        if atual is None:
+            resultado[chave] = dict(linha)
+            continue
+        for campo, valor in linha.items():
+            if campo not in chaves and valor is not None:
+                atual[campo] = valor if atual[campo] is None else atual[campo] + valor
+    return list(resultado.values())
+
+
+def _mover(origem, filtro, tamanho_lote, filhos=()):
+    """
+    Move em lotes as linhas de `origem` que atendem `filtro` para o arquivo.
+    `filhos` são (modelo, campo da FK) movidos junto, antes do pai.
+    """
+    destino = ARQUIVOS[origem]
+    total = 0
+    while True:
+        with transaction.atomic():
+            linhas = list(origem.objects.filter(filtro).order_by('pk').values()[:tamanho_lote])
+            if not linhas:
+                return total
+            ids = [linha['id'] for linha in linhas]
+            destino.objects.bulk_create([destino(**linha) for linha in linhas])
+            for filho, campo in filhos:
+                dependentes = filho.objects.filter(**{f'{campo}__in': ids})
+                ARQUIVOS[filho].objects.bulk_create(
+                    [ARQUIVOS[filho](**linha) for linha in dependentes.values()], batch_size=tamanho_lote
+                )
+                dependentes.delete()
+            origem.objects.filter(pk__in=ids).delete()
+        total += len(linhas)
+
+
+def arquivar(corte, tamanho_lote=TAMANHO_LOTE):
+    """Move para o arquivo o que é anterior a `corte` (date); devolve o Arquivamento"""
+    # Registrado antes de mover: um relatório rodando durante o processo já
+    # consulta o arquivo, e uma interrupção não esconde as linhas já movidas
+    arquivamento = Arquivamento.objects.create(corte=corte)
+    limite = timezone.make_aware(datetime.combine(corte, time.min))
+    sessao_fechada = Q(cash_till_session__isnull=True) | Q(cash_till_session__status='fechado')
+
+    vendas = (
+        Q(sale_date__lt=limite)
+        & sessao_fechada
+        & ~Exists(ContaReceber.objects.filter(venda=OuterRef('pk')))
+    )
+    arquivamento.movidas = {
+        'vendas': _mover(Sale, vendas, tamanho_lote, filhos=[(SaleItem, 'sale')]),
+        'movimentacoes_estoque': _mover(StockMovement, Q(created_at__lt=limite), tamanho_lote),
+        'fluxos_caixa': _mover(CashFlow, Q(date__lt=limite) & sessao_fechada, tamanho_lote),
+    }
+    arquivamento.concluido_em = timezone.now()
+    arquivamento.save(update_fields=['movidas', 'concluido_em'])
+    return arquivamento
+
+
+def corte_por_meses(meses, hoje=None):
+    """Primeiro dia do mês `meses` meses antes do atual: os meses anteriores estão fechados"""
+    hoje = hoje or timezone.localdate()
+    return somar_meses(date(hoje.year, hoje.month, 1), -meses)
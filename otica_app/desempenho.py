@@ -0,0 +1,117 @@
+"""
+Desempenho dos vendedores a partir de SellerDailyStats.
+
+A tabela diária é mantida incrementalmente por SellerDailyStats.registrar nas
+vendas; recalcular_desempenho a reconstrói a partir de Sale/SaleItem, e do
+arquivo para períodos antigos, quando necessário (carga inicial, correções
+manuais no banco).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+
+from .arquivo import fontes
+from .models import Sale, SaleItem, SellerDailyStats
+from .stock import inicio_do_dia
+
+AGRUPAMENTOS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def recalcular_desempenho(inicio=None, fim=None):
+    """Reconstrói os totais diários no intervalo de datas (inclusive); devolve quantas linhas gravou"""
+    estatisticas = SellerDailyStats.objects.all()
+    if inicio:
+        estatisticas = estatisticas.filter(date__gte=inicio)
+    if fim:
+        estatisticas = estatisticas.filter(date__lte=fim)
+
+    linhas = {}
+    # Vendas e itens da tabela quente e, para períodos antigos, do arquivo
+    for vendas, itens in zip(fontes(Sale, inicio), fontes(SaleItem, inicio)):
+        vendas = vendas.all()
+        if inicio:
+            vendas = vendas.filter(sale_date__gte=inicio_do_dia(inicio))
+        if fim:
+            vendas = vendas.filter(sale_date__lt=inicio_do_dia(fim + timedelta(days=1)))
+
+        totais = (
+            vendas.annotate(dia=TruncDate('sale_date'))
+            .order_by()
+            .values('seller_id', 'store_id', 'dia')
+            .annotate(quantidade=Count('id'), total=Sum('total_amount'))
+        )
+        for row in totais:
+            chave = (row['seller_id'], row['dia'])
+            linha = linhas.get(chave)
+            if linha is None:
+                linha = linhas[chave] = SellerDailyStats(
+                    seller_id=row['seller_id'], store_id=row['store_id'], date=row['dia'], revenue=Decimal('0')
+                )
+            linha.sales_count += row['quantidade']
+            linha.revenue += row['total'] or 0
+
+        totais_itens = (
+            itens.filter(sale__in=vendas)
+            .annotate(dia=TruncDate('sale__sale_date'))
+            .order_by()
+            .values('sale__seller_id', 'dia')
+            .annotate(quantidade=Sum('quantity'))
+        )
+        for row in totais_itens:
+            linha = linhas.get((row['sale__seller_id'], row['dia']))
+            if linha is not None:
+                linha.items_count += row['quantidade'] or 0
+
+    with transaction.atomic():
+        estatisticas.delete()
+        SellerDailyStats.objects.bulk_create(linhas.values(), batch_size=1000)
+    return len(linhas)
+
+
+def desempenho_vendedores(estatisticas, agrupamento=None):
+    """
+    Ranking por faturamento a partir das linhas diárias filtradas.
+    Com agrupamento ('day', 'week', 'month') há uma linha por vendedor e período.
+    """
+    campos = ['seller_id', 'seller__name', 'seller__funcionario_id', 'store_id', 'store__name']
+    if agrupamento == 'day':
+        estatisticas = estatisticas.annotate(period=TruncDate('date'))
+    elif agrupamento:
+        estatisticas = estatisticas.annotate(period=AGRUPAMENTOS[agrupamento]('date'))
+    if agrupamento:
+        campos.append('period')
+
+    rows = (
+        estatisticas.order_by()
+        .values(*campos)
+        .annotate(sales=Sum('sales_count'), total=Sum('revenue'), items=Sum('items_count'))
+        .order_by(*(['period'] if agrupamento else []), '-total', 'seller__name')
+    )
+
+    resultado = []
+    for row in rows:
+        vendas = row['sales'] or 0
+        receita = row['total'] or Decimal('0')
+        item = {
+            'seller': row['seller_id'],
+            'seller_name': row['seller__name'],
+            'funcionario': row['seller__funcionario_id'],
+            'store': row['store_id'],
+            'store_name': row['store__name'],
+            'sales_count': vendas,
+            'revenue': receita,
+            'items_count': row['items'] or 0,
+            'average_ticket': (receita / vendas).quantize(Decimal('0.01')) if vendas else Decimal('0.00'),
+            'items_per_sale': round((row['items'] or 0) / vendas, 2) if vendas else 0,
+        }
+        if agrupamento:
+            item['period'] = row['period']
+        resultado.append(item)
+    return resultado
@@ -0,0 +1,279 @@
+"""
+Eventos em tempo real por loja (Server-Sent Events).
+
+Os caminhos de escrita chamam `publicar(store_id, tipo, dados)`; depois do
+commit da transação o evento é gravado em EventoLoja. As escritas podem vir
+de qualquer processo (workers do gunicorn, comandos): o processo ASGI que
+serve /api/events/ (uvicorn otica_backend.asgi:application, um worker) lê a
+tabela a cada EVENTS_POLL_INTERVAL segundos e o `broker` em memória
+distribui os eventos novos às conexões abertas. Cada assinante tem uma fila
+asyncio ligada ao seu event loop, alimentada com call_soon_threadsafe.
+
+A leitura relê uma janela de JANELA_SEGUNDOS e ignora os ids já entregues:
+um id menor pode ser confirmado depois de um maior. O reenvio após
+reconexão (Last-Event-ID) também vem da tabela, que guarda
+EVENTS_RETENTION_HOURS horas de eventos (limpar() roda no leitor e no
+comando limpar_eventos, para a tabela não crescer sem conexões abertas).
+
+O EventSource não envia cabeçalhos: o cliente troca o JWT por um ticket
+(`emitir_ticket`, POST /api/events/ticket/) e abre o stream com ?ticket=.
+O ticket é assinado, vale EVENTS_TICKET_MAX_AGE segundos, serve só para o
+stream e é consumido na primeira abertura, então o que fica nos logs de
+acesso não autentica mais nada.
+"""
+import asyncio
+import json
+import secrets
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+
+TIPOS = (
+    'sale_created',
+    'stock_changed',
+    'order_status_changed',
+    'till_opened',
+    'till_closed',
+)
+
+# Eventos reenviados no máximo após uma reconexão (Last-Event-ID)
+HISTORICO_POR_LOJA = 200
+# Eventos relidos a cada leitura da tabela; cobre commits fora de ordem de id
+JANELA_SEGUNDOS = 10
+# Intervalo entre as limpezas dos eventos fora da retenção
+INTERVALO_LIMPEZA = 10 * 60
+# Eventos pendentes por conexão; um cliente lento perde eventos em vez de acumular memória
+TAMANHO_FILA = 500
+# Salt da assinatura dos tickets: um valor assinado para outro fim não vale como ticket
+SALT_TICKET = 'otica_app.eventos.ticket'
+
+
+class Assinatura:
+    def __init__(self, store_id):
+        self.store_id = store_id
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue(maxsize=TAMANHO_FILA)
+        self.perdidos = 0
+
+    def _entregar(self, evento):
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.perdidos += 1
+
+    async def proximo(self, timeout):
+        """Próximo evento ou None se nada chegar em `timeout` segundos"""
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Distribui eventos para as assinaturas da loja e para as de todas as lojas (store_id None)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._assinaturas = defaultdict(set)
+
+    def assinar(self, store_id=None):
+        assinatura = Assinatura(store_id)
+        with self._lock:
+            self._assinaturas[store_id].add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            assinaturas = self._assinaturas.get(assinatura.store_id)
+            if assinaturas is not None:
+                assinaturas.discard(assinatura)
+                if not assinaturas:
+                    del self._assinaturas[assinatura.store_id]
+
+    def distribuir(self, evento):
+        with self._lock:
+            destinos = list(self._assinaturas.get(evento['store'], ())) + list(self._assinaturas.get(None, ()))
+        for assinatura in destinos:
+            try:
+                assinatura.loop.call_soon_threadsafe(assinatura._entregar, evento)
+            except RuntimeError:
+                # Loop já encerrado: a conexão caiu sem cancelar a assinatura
+                self.cancelar(assinatura)
+
+    def total_assinaturas(self):
+        with self._lock:
+            return sum(len(assinaturas) for assinaturas in self._assinaturas.values())
+
+
+broker = Broker()
+
+
+def _como_evento(registro):
+    return {
+        'id': registro.id,
+        'type': registro.tipo,
+        'store': registro.store_id,
+        'at': registro.criado_em,
+        'data': registro.dados,
+    }
+
+
+def _gravar(store_id, tipo, dados):
+    from .models import EventoLoja
+    EventoLoja.objects.create(store_id=store_id, tipo=tipo, dados=dados)
+
+
+def publicar(store_id, tipo, dados):
+    """Grava o evento quando a transação atual for confirmada (imediatamente em autocommit)"""
+    if store_id is None:
+        return
+    transaction.on_commit(lambda: _gravar(store_id, tipo, dados))
+
+
+def recentes(store_id, depois_de):
+    """Eventos com id > depois_de ainda retidos, em ordem (no máximo HISTORICO_POR_LOJA)"""
+    from .models import EventoLoja
+    queryset = EventoLoja.objects.filter(id__gt=depois_de)
+    if store_id is not None:
+        queryset = queryset.filter(store_id=store_id)
+    registros = list(queryset.order_by('-id')[:HISTORICO_POR_LOJA])
+    return [_como_evento(registro) for registro in reversed(registros)]
+
+
+def limpar(agora=None):
+    """Apaga os eventos fora da retenção (EVENTS_RETENTION_HOURS); devolve quantos"""
+    from .models import EventoLoja
+    agora = agora or timezone.now()
+    apagados, _ = EventoLoja.objects.filter(
+        criado_em__lt=agora - timedelta(hours=settings.EVENTS_RETENTION_HOURS)
+    ).delete()
+    return apagados
+
+
+def emitir_ticket(user):
+    """Ticket assinado de uso único para abrir o stream de eventos em nome de `user`"""
+    return signing.dumps({'u': user.pk, 'n': secrets.token_urlsafe(12)}, salt=SALT_TICKET, compress=True)
+
+
+def usuario_do_ticket(ticket):
+    """Usuário do ticket, ou None se for inválido, expirado ou já usado"""
+    from .models import User
+    max_age = settings.EVENTS_TICKET_MAX_AGE
+    try:
+        dados = signing.loads(ticket, salt=SALT_TICKET, max_age=max_age)
+    except signing.BadSignature:
+        return None
+    # cache.add só grava se a chave não existir: o segundo uso do mesmo ticket falha
+    if not cache.add(f"eventos:ticket:{dados['n']}", True, timeout=max_age):
+        return None
+    return User.objects.filter(pk=dados['u'], is_active=True).first()
+
+
+class Leitor:
+    """
+    Lê os eventos novos da tabela e os entrega ao broker; um por processo
+    ASGI, compartilhado por todas as conexões: uma consulta por intervalo,
+    qualquer que seja o número de clientes, e nenhuma sem clientes.
+    """
+
+    def __init__(self):
+        self._tarefa = None
+        self._entregues = {}
+        self._inicial = True
+        self._ultima_limpeza = None
+
+    def garantir(self):
+        """Inicia a leitura no event loop atual, se ainda não estiver rodando"""
+        loop = asyncio.get_running_loop()
+        if self._tarefa is None or self._tarefa.done() or self._tarefa.get_loop() is not loop:
+            # Eventos já na janela ao iniciar são anteriores às assinaturas: não são entregues
+            self._inicial = True
+            self._tarefa = loop.create_task(self._rodar())
+
+    def ler(self):
+        """Uma leitura da tabela: entrega os eventos ainda não vistos; devolve quantos"""
+        from .models import EventoLoja
+        try:
+            agora = timezone.now()
+            inicio = agora - timedelta(seconds=JANELA_SEGUNDOS)
+            self._entregues = {pk: momento for pk, momento in self._entregues.items() if momento >= inicio}
+            novos = [
+                registro for registro in EventoLoja.objects.filter(criado_em__gte=inicio).order_by('id')
+                if registro.id not in self._entregues
+            ]
+            for registro in novos:
+                self._entregues[registro.id] = registro.criado_em
+                if not self._inicial:
+                    broker.distribuir(_como_evento(registro))
+            self._inicial = False
+            if self._ultima_limpeza is None or (agora - self._ultima_limpeza).total_seconds() >= INTERVALO_LIMPEZA:
+                self._ultima_limpeza = agora
+                limpar(agora)
+            return len(novos)
+        finally:
+            close_old_connections()
+
+    async def _rodar(self):
+        ler = sync_to_async(self.ler, thread_sensitive=False)
+        while broker.total_assinaturas():
+            await ler()
+            await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
+
+
+leitor = Leitor()
+
+
+def formatar_sse(evento):
+    """Bloco text/event-stream de um evento"""
+    corpo = json.dumps(
+        {'id': evento['id'], 'store': evento['store'], 'at': evento['at'], 'data': evento['data']},
+        cls=DjangoJSONEncoder,
+        separators=(',', ':'),
+    )
+    return f"id: {evento['id']}\nevent: {evento['type']}\ndata: {corpo}\n\n"
+
+
+async def stream(store_id, ultimo_id=None, heartbeat=15, duracao_maxima=300):
+    """
+    Corpo do text/event-stream: reenvia o que o cliente perdeu desde
+    `ultimo_id`, depois segue a fila da assinatura. Comentários a cada
+    `heartbeat` segundos mantêm proxies abertos; após `duracao_maxima` o
+    stream termina e o EventSource reconecta com Last-Event-ID, o que também
+    libera assinaturas de clientes que caíram sem aviso.
+    """
+    assinatura = broker.assinar(store_id)
+    leitor.garantir()
+    try:
+        yield 'retry: 3000\n\n'
+        # Ids podem chegar fora de ordem: a deduplicação é pelo conjunto enviado
+        enviados = set()
+        if ultimo_id is not None:
+            for evento in await sync_to_async(recentes)(store_id, ultimo_id):
+                enviados.add(evento['id'])
+                yield formatar_sse(evento)
+
+        limite = asyncio.get_running_loop().time() + duracao_maxima
+        while True:
+            restante = limite - asyncio.get_running_loop().time()
+            if restante <= 0:
+                break
+            evento = await assinatura.proximo(min(heartbeat, restante))
+            if evento is None:
+                yield ': ping\n\n'
+                continue
+            # O histórico reenviado pode já conter eventos que também chegaram na fila
+            if evento['id'] in enviados:
+                continue
+            enviados.add(evento['id'])
+            yield formatar_sse(evento)
+    finally:
+        broker.cancelar(assinatura)
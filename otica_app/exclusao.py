@@ -0,0 +1,62 @@
+"""
+Purga física dos objetos excluídos logicamente (ver ExclusaoLogica em models.py).
+
+Só remove objetos sem nada que dependa deles: o Collector do Django monta a
+exclusão como delete() faria e, se ela apagaria, protegeria ou anularia
+qualquer outra linha (vendas, folhas, contas, movimentações de estoque), o
+objeto fica. Cada lote roda em sua própria transação.
+"""
+from datetime import timedelta
+
+from django.db import router, transaction
+from django.db.models.deletion import Collector, ProtectedError, RestrictedError
+from django.utils import timezone
+
+from .models import Category, Fornecedor, Funcionario, Product
+
+# Produtos antes das categorias: purgar um produto pode liberar a categoria
+MODELOS = [Product, Category, Fornecedor, Funcionario]
+TAMANHO_LOTE = 500
+
+
+def tem_dependentes(obj):
+    collector = Collector(using=router.db_for_write(type(obj), instance=obj), origin=obj)
+    try:
+        collector.collect([obj])
+    except (ProtectedError, RestrictedError):
+        return True
+    # SET_NULL e exclusões rápidas ficam como querysets ainda não avaliados
+    pendentes = [*collector.fast_deletes, *(objs for lista in collector.field_updates.values() for objs in lista)]
+    if any(objs.exists() if hasattr(objs, 'exists') else objs for objs in pendentes):
+        return True
+    return any(instances for model, instances in collector.data.items() if model is not type(obj))
+
+
+def purgar_modelo(model, limite, tamanho_lote=TAMANHO_LOTE):
+    """Devolve (apagados, mantidos por terem dependências)"""
+    apagados = mantidos = 0
+    ultimo = 0
+    while True:
+        lote = list(
+            model.todos.filter(excluido_em__lt=limite, pk__gt=ultimo).order_by('pk')[:tamanho_lote]
+        )
+        if not lote:
+            break
+        ultimo = lote[-1].pk
+        with transaction.atomic():
+            for obj in lote:
+                if tem_dependentes(obj):
+                    mantidos += 1
+                    continue
+                obj.excluir_definitivamente()
+                apagados += 1
+    return apagados, mantidos
+
+
+def purgar_excluidos(dias, tamanho_lote=TAMANHO_LOTE):
+    """{modelo: (apagados, mantidos)} para os excluídos há mais de `dias` dias"""
+    limite = timezone.now() - timedelta(days=dias)
+    return {
+        model._meta.verbose_name_plural: purgar_modelo(model, limite, tamanho_lote)
+        for model in MODELOS
+    }
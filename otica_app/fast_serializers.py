@@ -0,0 +1,194 @@
+"""
+Serialização somente-leitura para as listagens mais acessadas.
+
+Trabalha sobre linhas de .values() em vez de instâncias de modelo: cada campo
+tem um caminho de coluna resolvido uma única vez e a formatação de Decimal e
+datas é feita coluna a coluna. A saída é a mesma dos ModelSerializers
+equivalentes (StoreProductSerializer, SaleSerializer, ClienteSerializer).
+"""
+import decimal
+from collections import defaultdict
+from operator import itemgetter
+
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import Cliente, SaleItem
+
+
+def decimal_column(max_digits, decimal_places):
+    """Mesma regra de DecimalField.to_representation do DRF (string quantizada)"""
+    quantum = decimal.Decimal('.1') ** decimal_places
+    context = decimal.getcontext().copy()
+    context.prec = max_digits
+
+    def format_column(values):
+        return [
+            None if value is None else '{:f}'.format(
+                (value if isinstance(value, decimal.Decimal) else decimal.Decimal(str(value))).quantize(quantum, context=context)
+            )
+            for value in values
+        ]
+    return format_column
+
+
+def datetime_column(values):
+    """ISO 8601 no fuso atual, com 'Z' para UTC, como DateTimeField do DRF"""
+    tz = timezone.get_current_timezone()
+    formatted = []
+    for value in values:
+        if not value:
+            formatted.append(None)
+            continue
+        text = value.astimezone(tz).isoformat() if timezone.is_aware(value) else value.isoformat()
+        formatted.append(text[:-6] + 'Z' if text.endswith('+00:00') else text)
+    return formatted
+
+
+def date_column(values):
+    return [value.isoformat() if value else None for value in values]
+
+
+def text_column(values):
+    return [None if value is None else str(value) for value in values]
+
+
+money = decimal_column(10, 2)
+
+
+class FastSerializer:
+    """
+    Declare `fields` como lista de (nome_de_saída, caminho_no_values, formatador).
+    O formatador recebe a coluna inteira e devolve a coluna formatada.
+    """
+    fields = []
+
+    def __init__(self):
+        self.names = [name for name, _, _ in self.fields]
+        self.paths = list(dict.fromkeys(path for _, path, _ in self.fields))
+        self.getters = [(itemgetter(path), formatter) for _, path, formatter in self.fields]
+
+    def value_paths(self):
+        return self.paths
+
+    def serialize(self, rows):
+        rows = list(rows)
+        columns = []
+        for getter, formatter in self.getters:
+            column = [getter(row) for row in rows]
+            columns.append(formatter(column) if formatter else column)
+        names = self.names
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+class StoreProductFastSerializer(FastSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('store', 'store_id', None),
+        ('product', 'product_id', None),
+        ('quantity', 'quantity', None),
+        ('reorder_level', 'reorder_level', None),
+        ('stock_status', 'stock_status', None),
+        ('product_name', 'product__name', text_column),
+        ('product_brand', 'product__brand', text_column),
+        ('product_model', 'product__model', text_column),
+        ('product_code', 'product__code', text_column),
+        ('product_price', 'product__price', money),
+        ('product_category', 'product__category__name', text_column),
+        ('store_name', 'store__name', text_column),
+    ]
+
+
+class SaleItemFastSerializer(FastSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('product', 'product_id', None),
+        ('product_name', 'product__name', text_column),
+        ('quantity', 'quantity', None),
+        ('unit_price', 'unit_price', money),
+        ('total_price', 'total_price', money),
+    ]
+
+
+class ClienteFastSerializer(FastSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('nome', 'nome', None),
+        ('email', 'email', None),
+        ('telefone', 'telefone', None),
+        ('cpf', 'cpf', None),
+        ('data_nascimento', 'data_nascimento', date_column),
+        ('sexo', 'sexo', None),
+        ('endereco', 'endereco', None),
+        ('numero', 'numero', None),
+        ('bairro', 'bairro', None),
+        ('cidade', 'cidade', None),
+        ('estado', 'estado', None),
+        ('cep', 'cep', None),
+        ('observacoes', 'observacoes', None),
+        ('grau_od', 'grau_od', None),
+        ('grau_oe', 'grau_oe', None),
+        ('dnp_od', 'dnp_od', None),
+        ('dnp_oe', 'dnp_oe', None),
+        ('adicao', 'adicao', None),
+        ('observacoes_opticas', 'observacoes_opticas', None),
+        ('criado_em', 'criado_em', datetime_column),
+        ('atualizado_em', 'atualizado_em', datetime_column),
+    ]
+
+
+class SaleFastSerializer(FastSerializer):
+    # 'cliente' e 'items' são preenchidos depois com uma consulta cada
+    fields = [
+        ('id', 'id', None),
+        ('store', 'store_id', None),
+        ('store_name', 'store__name', text_column),
+        ('seller', 'seller_id', None),
+        ('seller_name', 'seller__name', text_column),
+        ('cliente', 'cliente_id', None),
+        ('customer_name', 'customer_name', None),
+        ('customer_email', 'customer_email', None),
+        ('customer_phone', 'customer_phone', None),
+        ('total_amount', 'total_amount', money),
+        ('payment_method', 'payment_method', None),
+        ('sale_date', 'sale_date', datetime_column),
+        ('items', 'id', None),
+    ]
+
+    item_serializer = SaleItemFastSerializer()
+    cliente_serializer = ClienteFastSerializer()
+
+    def serialize(self, rows):
+        data = super().serialize(rows)
+        if not data:
+            return data
+
+        items_by_sale = defaultdict(list)
+        item_rows = (
+            SaleItem.objects.filter(sale_id__in=[row['id'] for row in data])
+            .order_by('id')
+            .values('sale_id', *self.item_serializer.value_paths())
+        )
+        item_rows = list(item_rows)
+        for sale_id, item in zip((row['sale_id'] for row in item_rows), self.item_serializer.serialize(item_rows)):
+            items_by_sale[sale_id].append(item)
+
+        cliente_ids = {row['cliente'] for row in data if row['cliente'] is not None}
+        clientes = {}
+        if cliente_ids:
+            cliente_rows = Cliente.objects.filter(id__in=cliente_ids).values(*self.cliente_serializer.value_paths())
+            clientes = {cliente['id']: cliente for cliente in self.cliente_serializer.serialize(cliente_rows)}
+
+        for row in data:
+            row['cliente'] = clientes.get(row['cliente'])
+            row['items'] = items_by_sale.get(row['items'], [])
+        return data
+
+
+def fast_list_response(view, queryset, serializer):
+    """Equivalente a ListModelMixin.list usando o caminho rápido"""
+    rows = queryset.values(*serializer.value_paths())
+    page = view.paginate_queryset(rows)
+    if page is not None:
+        return view.get_paginated_response(serializer.serialize(page))
+    return Response(serializer.serialize(rows))
@@ -0,0 +1,131 @@
+"""
+Geração em lote da folha de pagamento mensal.
+
+A comissão de cada funcionário é comissao_percentual sobre o total das vendas
+do mês, obtido com uma única consulta agrupada por vendedor (pelo vínculo
+Seller.funcionario ou, na falta dele, por loja e nome). O nome só é usado
+para funcionários sem vendedor vinculado e que não dividem o nome com outro
+da mesma loja, para nenhuma venda entrar em duas comissões. As
+linhas de FolhaPagamento são gravadas com um upsert na chave única
+(funcionario, ano, mes): salário base e comissão são recalculados, bônus e
+descontos lançados à mão são preservados e folhas já pagas não são tocadas.
+As folhas existentes do mês ficam bloqueadas (select_for_update) da leitura
+de `pago` até o upsert, então um pagamento concorrente espera a geração
+terminar em vez de ter os valores sobrescritos. Como bulk_create não chama
+save(), o salário líquido é recalculado depois em um único UPDATE.
+"""
+import calendar
+from collections import Counter, defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+
+from .arquivo import fontes
+from .models import FolhaPagamento, Funcionario, Sale, Seller
+from .stock import inicio_do_dia
+from .utils import normalizar_texto, somar_meses
+
+CENTAVOS = Decimal('0.01')
+
+
+def funcionarios_ativos(ano, mes, store_ids=None):
+    """Funcionários ativos com vínculo em algum dia do mês"""
+    primeiro = date(ano, mes, 1)
+    ultimo = date(ano, mes, calendar.monthrange(ano, mes)[1])
+    queryset = Funcionario.objects.filter(ativo=True, data_admissao__lte=ultimo).filter(
+        Q(data_demissao__isnull=True) | Q(data_demissao__gte=primeiro)
+    )
+    if store_ids:
+        queryset = queryset.filter(store_id__in=store_ids)
+    return queryset
+
+
+def vendas_por_vendedor(ano, mes, store_ids=None):
+    """
+    Total vendido no mês por funcionário vinculado ao vendedor e, para
+    vendedores ainda sem vínculo, por (loja, nome normalizado).
+    """
+    primeiro = date(ano, mes, 1)
+    rows = []
+    for manager in fontes(Sale, primeiro):
+        queryset = manager.filter(
+            sale_date__gte=inicio_do_dia(primeiro),
+            sale_date__lt=inicio_do_dia(somar_meses(primeiro, 1)),
+        )
+        if store_ids:
+            queryset = queryset.filter(store_id__in=store_ids)
+        rows += (
+            queryset.order_by()
+            .values('store_id', 'seller__name', 'seller__funcionario_id')
+            .annotate(total=Sum('total_amount'))
+        )
+
+    por_funcionario, por_nome = defaultdict(Decimal), defaultdict(Decimal)
+    for row in rows:
+        if row['seller__funcionario_id']:
+            por_funcionario[row['seller__funcionario_id']] += row['total'] or 0
+        else:
+            por_nome[row['store_id'], normalizar_texto(row['seller__name'])] += row['total'] or 0
+    return por_funcionario, por_nome
+
+
+def gerar_folha(ano, mes, store_ids=None):
+    """Gera ou atualiza a folha do mês; devolve um resumo com as contagens"""
+    funcionarios = list(funcionarios_ativos(ano, mes, store_ids).only(
+        'id', 'nome', 'store_id', 'salario_base', 'comissao_percentual'
+    ))
+    ids = [f.id for f in funcionarios]
+    por_funcionario, por_nome = vendas_por_vendedor(ano, mes, store_ids)
+
+    # Vendas por nome só para quem não tem vendedor vinculado e tem nome único na loja
+    vinculados = set(Seller.objects.filter(funcionario_id__in=ids).values_list('funcionario_id', flat=True))
+    chave_nome = {f.id: (f.store_id, normalizar_texto(f.nome)) for f in funcionarios if f.id not in vinculados}
+    repetidos = Counter(chave_nome.values())
+
+    with transaction.atomic():
+        pagas = {
+            funcionario_id
+            for funcionario_id, pago in FolhaPagamento.objects.select_for_update()
+            .filter(ano=ano, mes=mes, funcionario__in=ids)
+            .values_list('funcionario_id', 'pago')
+            if pago
+        }
+
+        folhas = []
+        for funcionario in funcionarios:
+            if funcionario.id in pagas:
+                continue
+            vendido = por_funcionario.get(funcionario.id, Decimal('0'))
+            chave = chave_nome.get(funcionario.id)
+            if chave is not None and repetidos[chave] == 1:
+                vendido += por_nome.get(chave, Decimal('0'))
+            comissao = (vendido * funcionario.comissao_percentual / 100).quantize(CENTAVOS)
+            folhas.append(FolhaPagamento(
+                funcionario_id=funcionario.id,
+                ano=ano,
+                mes=mes,
+                salario_base=funcionario.salario_base,
+                comissao=comissao,
+                salario_liquido=funcionario.salario_base + comissao,
+            ))
+
+        FolhaPagamento.objects.bulk_create(
+            folhas,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['funcionario', 'ano', 'mes'],
+            update_fields=['salario_base', 'comissao'],
+        )
+        recalculadas = FolhaPagamento.objects.filter(
+            ano=ano, mes=mes, pago=False, funcionario_id__in=[folha.funcionario_id for folha in folhas]
+        ).update(salario_liquido=F('salario_base') + F('comissao') + F('bonus') - F('descontos'))
+
+    return {
+        'ano': ano,
+        'mes': mes,
+        'geradas': recalculadas,
+        'ignoradas_pagas': len(pagas),
+        'total_comissoes': sum((folha.comissao for folha in folhas), Decimal('0')),
+    }
@@ -0,0 +1,79 @@
+"""
+Visão consolidada do cliente para o balcão: compras, pedidos e receitas.
+
+Cada seção é uma consulta sobre índices por (cliente, data); itens das
+compras vêm por prefetch, então o total de consultas não depende do tamanho
+do histórico. Compras antigas podem estar no arquivo (ver arquivo.py).
+"""
+from django.db.models import Prefetch
+
+from .arquivo import fontes
+from .models import Order, Sale, SaleItem
+
+CAMPOS_OLHO = {
+    'esferico': 'sphere',
+    'cilindrico': 'cylinder',
+    'eixo': 'axis',
+    'adicao': 'addition',
+    'dnp': 'dnp',
+    'altura': 'height',
+}
+CAMPOS_RECEITA = [f'{campo}_{lado}' for campo in CAMPOS_OLHO.values() for lado in ('right', 'left')]
+
+
+def compras_do_cliente(cliente, store=None, limite=None):
+    """As `limite` compras mais recentes, somando tabela quente e arquivo"""
+    compras = []
+    for vendas, itens in zip(fontes(Sale), fontes(SaleItem)):
+        queryset = vendas.filter(cliente=cliente).select_related('store', 'seller').prefetch_related(
+            Prefetch('items', queryset=itens.select_related('product').order_by('id'))
+        )
+        if store is not None:
+            queryset = queryset.filter(store=store)
+        compras += queryset.order_by('-sale_date')[:limite]
+    compras.sort(key=lambda venda: venda.sale_date, reverse=True)
+    return compras[:limite]
+
+
+def pedidos_do_cliente(cliente, store=None):
+    queryset = Order.objects.filter(cliente=cliente).select_related('store', 'seller')
+    if store is not None:
+        queryset = queryset.filter(store=store)
+    return queryset.order_by('-created_at')
+
+
+def linha_do_tempo_receitas(cliente, store=None):
+    """
+    Receitas em ordem cronológica decrescente: medidas de cada pedido com
+    alguma medida preenchida, mais o grau registrado no cadastro do cliente.
+    """
+    pedidos = Order.objects.filter(cliente=cliente).exclude(
+        **{f'{campo}__isnull': True for campo in CAMPOS_RECEITA}
+    )
+    if store is not None:
+        pedidos = pedidos.filter(store=store)
+
+    receitas = []
+    for row in pedidos.order_by('-created_at').values('id', 'created_at', 'store_id', *CAMPOS_RECEITA):
+        receitas.append({
+            'origem': 'pedido',
+            'pedido': row['id'],
+            'store': row['store_id'],
+            'data': row['created_at'],
+            'od': {nome: row[f'{campo}_right'] for nome, campo in CAMPOS_OLHO.items()},
+            'oe': {nome: row[f'{campo}_left'] for nome, campo in CAMPOS_OLHO.items()},
+        })
+
+    if any([cliente.grau_od, cliente.grau_oe, cliente.dnp_od, cliente.dnp_oe, cliente.adicao]):
+        receitas.append({
+            'origem': 'cadastro',
+            'data': cliente.atualizado_em,
+            'grau_od': cliente.grau_od,
+            'grau_oe': cliente.grau_oe,
+            'dnp_od': cliente.dnp_od,
+            'dnp_oe': cliente.dnp_oe,
+            'adicao': cliente.adicao,
+            'observacoes': cliente.observacoes_opticas,
+        })
+        receitas.sort(key=lambda receita: receita['data'], reverse=True)
+    return receitas
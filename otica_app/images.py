@@ -0,0 +1,96 @@
+"""
+Variações redimensionadas da foto do produto.
+
+Para cada largura em VARIANT_WIDTHS são gravadas versões WebP e JPEG ao lado do
+original (products/foto_480.webp, products/foto_480.jpg...), corrigindo a
+orientação e sem metadados EXIF. O original não é alterado.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Product
+from .tasks import enfileirar, tarefa
+
+VARIANT_WIDTHS = (160, 480, 960)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _rgb(image):
+    """JPEG não tem transparência: aplica fundo branco"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def delete_variants(product):
+    storage = product.image.storage
+    for formats in (product.image_variants or {}).values():
+        for name in formats.values():
+            if storage.exists(name):
+                storage.delete(name)
+
+
+def generate_variants(product):
+    """Gera e grava as variações da foto atual do produto"""
+    if not product.image:
+        return {}
+
+    storage = product.image.storage
+    with product.image.open('rb') as arquivo:
+        original = Image.open(arquivo)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+    delete_variants(product)
+    base = os.path.splitext(product.image.name)[0]
+    variants = {}
+    for width in VARIANT_WIDTHS:
+        resized = original.copy()
+        if resized.width > width:
+            resized.thumbnail((width, width * 10), Image.LANCZOS)
+        variants[str(width)] = {}
+        for key, (pil_format, extension, options) in VARIANT_FORMATS.items():
+            image = _rgb(resized) if pil_format == 'JPEG' else resized
+            buffer = BytesIO()
+            # Sem o parâmetro exif o Pillow não grava metadados
+            image.save(buffer, pil_format, **options)
+            name = f'{base}_{width}.{extension}'
+            if storage.exists(name):
+                storage.delete(name)
+            variants[str(width)][key] = storage.save(name, ContentFile(buffer.getvalue()))
+
+    # updated_at também muda, para a sincronização incremental trazer as novas URLs
+    Product.objects.filter(pk=product.pk).update(image_variants=variants, updated_at=timezone.now())
+    product.image_variants = variants
+    return variants
+
+
+@tarefa('gerar_variantes_imagem')
+def gerar_variantes_imagem(product_id):
+    product = Product.objects.filter(pk=product_id).first()
+    if product is None or not product.image:
+        return {}
+    return generate_variants(product)
+
+
+def schedule_variants(product):
+    """Enfileira o processamento da foto; o worker roda após o commit"""
+    return enfileirar('gerar_variantes_imagem', product.pk)
+
+
+def clear_variants(product):
+    delete_variants(product)
+    Product.objects.filter(pk=product.pk).update(image_variants={}, updated_at=timezone.now())
+    product.image_variants = {}
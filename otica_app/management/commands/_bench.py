@@ -0,0 +1,66 @@
+"""Dados sintéticos compartilhados pelos comandos bench_* (em transação revertida ou removidos com remover_dados_benchmark)"""
+import random
+from decimal import Decimal
+
+from otica_app.models import Category, Cliente, Product, Sale, SaleItem, Seller, Store, StoreProduct
+
+
+def criar_dados_benchmark(rows, itens_por_venda=2, seed=42):
+    """Cria uma loja com `rows` produtos em estoque e `rows` vendas"""
+    rnd = random.Random(seed)
+    store = Store.objects.create(name='Loja Benchmark', address='Rua do Teste, 1')
+    seller = Seller.objects.create(name='Vendedor Benchmark', store=store)
+    category = Category.objects.create(name=f'Benchmark {rnd.random()}')
+
+    ultimo = Product.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    products = Product.objects.bulk_create([
+        Product(
+            name=f'Armação {i}', brand=rnd.choice(['Ray-Ban', 'Oakley', 'Prada', 'Vogue']),
+            model=f'M{i}', code=f'B{ultimo + i:07d}', description='Produto de benchmark',
+            price=Decimal(rnd.randint(5000, 90000)) / 100, cost=Decimal(rnd.randint(2000, 40000)) / 100,
+            category=category,
+        )
+        for i in range(rows)
+    ], batch_size=1000)
+    # bulk_create não passa por save(): a situação é calculada aqui
+    quantidades = [rnd.randint(0, 30) for _ in products]
+    StoreProduct.objects.bulk_create([
+        StoreProduct(
+            store=store, product=product, quantity=quantity,
+            stock_status=StoreProduct.calcular_stock_status(quantity, product.reorder_level),
+        )
+        for product, quantity in zip(products, quantidades)
+    ], batch_size=1000)
+
+    clientes = Cliente.objects.bulk_create([
+        Cliente(nome=f'Cliente {i}', cpf=f'B{i:010d}', telefone=f'(11) 9{i:08d}', email=f'cliente{i}@teste.com')
+        for i in range(max(rows // 5, 1))
+    ], batch_size=1000)
+    sales = Sale.objects.bulk_create([
+        Sale(
+            store=store, seller=seller, customer_name=f'Cliente {i}', customer_email='c@teste.com',
+            customer_phone='11999999999', payment_method=rnd.choice(['dinheiro', 'pix', 'cartao_credito']),
+            total_amount=Decimal('0.00'), cliente=rnd.choice(clientes) if i % 3 else None,
+        )
+        for i in range(rows)
+    ], batch_size=1000)
+    items = []
+    for sale in sales:
+        for product in rnd.sample(products, min(itens_por_venda, len(products))):
+            quantity = rnd.randint(1, 3)
+            items.append(SaleItem(sale=sale, product=product, quantity=quantity, unit_price=product.price, total_price=product.price * quantity))
+    SaleItem.objects.bulk_create(items, batch_size=1000)
+
+    return {'store': store, 'seller': seller, 'category': category, 'products': products, 'clientes': clientes, 'sales': sales}
+
+
+def remover_dados_benchmark(dados):
+    """Desfaz criar_dados_benchmark quando os dados precisaram ser confirmados"""
+    Sale.objects.filter(store=dados['store']).delete()
+    StoreProduct.objects.filter(store=dados['store']).delete()
+    # Produto e categoria têm exclusão lógica: delete() só os esconderia
+    Product.todos.filter(category=dados['category']).excluir_definitivamente()
+    Cliente.objects.filter(id__in=[cliente.id for cliente in dados['clientes']]).delete()
+    dados['category'].excluir_definitivamente()
+    dados['seller'].delete()
+    dados['store'].delete()
@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from otica_app.arquivo import TAMANHO_LOTE, arquivar, corte_por_meses
+
+
+class Command(BaseCommand):
+    help = (
+        'Move vendas, itens, movimentações de estoque e fluxos de caixa dos meses '
+        'fechados para as tabelas de arquivo, em lotes (rode mensalmente)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=12, help='Meses mantidos na tabela quente além do atual')
+        parser.add_argument('--corte', help='Data de corte (AAAA-MM-DD); substitui --meses')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE)
+
+    def handle(self, *args, **options):
+        if options['corte']:
+            try:
+                corte = date.fromisoformat(options['corte'])
+            except ValueError:
+                raise CommandError('Data de corte inválida, use o formato AAAA-MM-DD.')
+        else:
+            corte = corte_por_meses(options['meses'])
+
+        arquivamento = arquivar(corte, options['lote'])
+        for nome, quantidade in arquivamento.movidas.items():
+            self.stdout.write(self.style.SUCCESS(f'{nome}: {quantidade} linhas anteriores a {corte:%d/%m/%Y} arquivadas'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from otica_app.vencimentos import atualizar_vencidos
+
+
+class Command(BaseCommand):
+    help = 'Marca como vencidas as contas pendentes com vencimento anterior a hoje (rode diariamente)'
+
+    def handle(self, *args, **options):
+        pagar, receber = atualizar_vencidos()
+        self.stdout.write(self.style.SUCCESS(
+            f'{pagar} contas a pagar e {receber} contas a receber marcadas como vencidas'
+        ))
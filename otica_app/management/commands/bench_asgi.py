@@ -0,0 +1,95 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import AsyncClient, Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from otica_app.models import User
+
+from ._bench import criar_dados_benchmark, remover_dados_benchmark
+
+
+def _resumo(duracoes, total):
+    duracoes = sorted(duracoes)
+    p95 = duracoes[min(len(duracoes) - 1, int(len(duracoes) * 0.95))]
+    return (
+        f'p50 {statistics.median(duracoes) * 1000:7.1f} ms | p95 {p95 * 1000:7.1f} ms | '
+        f'{len(duracoes) / total:6.1f} req/s'
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a latência dos dashboards servidos pelo handler WSGI e pelo ASGI sob '
+        'requisições concorrentes, com as consultas em paralelo e em sequência. '
+        'Os dados são confirmados (as threads usam outras conexões) e removidos ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--requisicoes', type=int, default=200)
+        parser.add_argument('--concorrencia', type=int, default=10)
+
+    def _wsgi(self, url, headers, requisicoes, concorrencia):
+        local = threading.local()
+
+        def requisitar(_):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            inicio = time.perf_counter()
+            resposta = local.client.get(url, headers=headers)
+            duracao = time.perf_counter() - inicio
+            assert resposta.status_code == 200, resposta.status_code
+            close_old_connections()
+            return duracao
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(concorrencia) as pool:
+            duracoes = list(pool.map(requisitar, range(requisicoes)))
+        return duracoes, time.perf_counter() - inicio
+
+    async def _asgi(self, url, headers, requisicoes, concorrencia):
+        client = AsyncClient()
+        limite = asyncio.Semaphore(concorrencia)
+
+        async def requisitar():
+            async with limite:
+                inicio = time.perf_counter()
+                resposta = await client.get(url, headers=headers)
+                duracao = time.perf_counter() - inicio
+                assert resposta.status_code == 200, resposta.status_code
+                return duracao
+
+        inicio = time.perf_counter()
+        duracoes = await asyncio.gather(*(requisitar() for _ in range(requisicoes)))
+        return duracoes, time.perf_counter() - inicio
+
+    def handle(self, *args, **options):
+        dados = criar_dados_benchmark(options['rows'])
+        admin = User.objects.create(username='benchmark-asgi', role='admin')
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(admin).access_token}'}
+        urls = [
+            '/api/reports/dashboard-stats/',
+            f'/api/reports/dashboard-stats/?store={dados["store"].id}',
+            '/api/financeiro/dashboard/',
+        ]
+        requisicoes, concorrencia = options['requisicoes'], options['concorrencia']
+        self.stdout.write(f'{requisicoes} requisições, {concorrencia} simultâneas')
+        try:
+            for url in urls:
+                self.stdout.write(url)
+                for modo, workers in (('sequencial', 0), ('paralelo', None)):
+                    ajustes = {} if workers is None else {'REPORT_QUERY_WORKERS': workers}
+                    with override_settings(**ajustes):
+                        wsgi = self._wsgi(url, headers, requisicoes, concorrencia)
+                        asgi = asyncio.run(self._asgi(url, headers, requisicoes, concorrencia))
+                    self.stdout.write(f'  WSGI {modo:10} {_resumo(*wsgi)}')
+                    self.stdout.write(f'  ASGI {modo:10} {_resumo(*asgi)}')
+        finally:
+            admin.delete()
+            remover_dados_benchmark(dados)
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from otica_app.models import User
+
+from ._bench import criar_dados_benchmark
+
+ENCODINGS = [('identity', ''), ('gzip', 'gzip'), ('br', 'br, gzip')]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede bytes trafegados e tempo até o último byte (processamento + transferência '
+        'na banda informada) das listagens da API com e sem compressão. Dados revertidos ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--kbps', type=int, default=1500, help='Banda simulada do link (4G fraco ~1500 kbit/s)')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _requisitar(self, client, url, accept_encoding, repeat):
+        melhor = None
+        resposta = None
+        for _ in range(repeat):
+            inicio = time.perf_counter()
+            resposta = client.get(url, HTTP_HOST='localhost', HTTP_ACCEPT_ENCODING=accept_encoding)
+            corpo = b''.join(resposta.streaming_content) if resposta.streaming else resposta.content
+            duracao = time.perf_counter() - inicio
+            melhor = duracao if melhor is None else min(melhor, duracao)
+        return melhor, resposta, len(corpo)
+
+    def handle(self, *args, **options):
+        bytes_por_segundo = options['kbps'] * 1000 / 8
+        with transaction.atomic():
+            dados = criar_dados_benchmark(options['rows'])
+            store = dados['store']
+            admin = User.objects.create(username='benchmark-compressao', role='admin')
+            client = APIClient()
+            client.force_authenticate(admin)
+
+            urls = [
+                f'/api/store-products/?store={store.id}',
+                '/api/clientes/',
+                f'/api/sales/?store={store.id}',
+                f'/api/reports/stock-position/?store={store.id}',
+                '/api/products/search/?q=armacao&limit=50',
+            ]
+            for url in urls:
+                self.stdout.write(url)
+                for nome, accept_encoding in ENCODINGS:
+                    servidor, resposta, tamanho = self._requisitar(client, url, accept_encoding, options['repeat'])
+                    ttlb = servidor + tamanho / bytes_por_segundo
+                    self.stdout.write(
+                        f'  {nome:9} {resposta.get("Content-Encoding", "-"):5} {tamanho:>9} bytes | '
+                        f'servidor {servidor * 1000:7.1f} ms | último byte {ttlb * 1000:8.1f} ms'
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,90 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from otica_app.models import User
+
+URLS_PADRAO = ['/api/auth/me/', '/api/stores/', '/api/reports/dashboard-stats/']
+
+
+def _percentil(valores, fracao):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * fracao))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a latência das requisições com uma conexão nova por requisição '
+        '(CONN_MAX_AGE=0) e com conexões persistentes, no banco configurado. '
+        'Ao fim de cada requisição roda close_old_connections, como o handler '
+        'WSGI/ASGI faz em request_finished.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=300)
+        parser.add_argument('--concorrencia', type=int, default=4)
+        parser.add_argument('--max-age', type=int, default=60, help='CONN_MAX_AGE do modo persistente')
+        parser.add_argument('--url', action='append', dest='urls', help='Repetível; padrão: me, lojas e dashboard')
+
+    def _configurar(self, max_age):
+        for conn in connections.all():
+            conn.close()
+            conn.settings_dict['CONN_MAX_AGE'] = max_age
+
+    def _tempo_conexao(self, repeticoes=20):
+        duracoes = []
+        for _ in range(repeticoes):
+            connection.close()
+            inicio = time.perf_counter()
+            connection.ensure_connection()
+            duracoes.append(time.perf_counter() - inicio)
+        connection.close()
+        return statistics.median(duracoes)
+
+    def _carga(self, urls, headers, requisicoes, concorrencia):
+        local = threading.local()
+
+        def requisitar(indice):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            url = urls[indice % len(urls)]
+            inicio = time.perf_counter()
+            resposta = local.client.get(url, headers=headers)
+            # O Client de testes desliga este passo do request_finished; aqui ele é refeito
+            close_old_connections()
+            duracao = time.perf_counter() - inicio
+            assert resposta.status_code == 200, (url, resposta.status_code)
+            return duracao
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(concorrencia) as pool:
+            duracoes = list(pool.map(requisitar, range(requisicoes)))
+        return duracoes, time.perf_counter() - inicio
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or URLS_PADRAO
+        original = connection.settings_dict.get('CONN_MAX_AGE', 0)
+        admin = User.objects.create(username='benchmark-conexoes', role='admin')
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(admin).access_token}'}
+        try:
+            self.stdout.write(
+                f'{connection.vendor} {connection.settings_dict.get("HOST") or connection.settings_dict["NAME"]} | '
+                f'abrir conexão: {self._tempo_conexao() * 1000:.2f} ms (mediana)'
+            )
+            self.stdout.write(f'{options["requisicoes"]} requisições, {options["concorrencia"]} simultâneas, {", ".join(urls)}')
+            for nome, max_age in (('nova por requisição', 0), (f'persistente ({options["max_age"]}s)', options['max_age'])):
+                self._configurar(max_age)
+                duracoes, total = self._carga(urls, headers, options['requisicoes'], options['concorrencia'])
+                self.stdout.write(
+                    f'  {nome:24} p50 {statistics.median(duracoes) * 1000:7.2f} ms | '
+                    f'p95 {_percentil(duracoes, 0.95) * 1000:7.2f} ms | {len(duracoes) / total:7.1f} req/s'
+                )
+        finally:
+            self._configurar(original)
+            User.objects.filter(pk=admin.pk).delete()
@@ -0,0 +1,66 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from rest_framework.renderers import JSONRenderer
+
+from otica_app.fast_serializers import SaleFastSerializer
+from otica_app.models import Product, Sale
+from otica_app.renderers import FastJSONRenderer, orjson
+from otica_app.serializers import ProductSerializer
+
+from ._bench import criar_dados_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara tempo de renderização e bytes por resposta entre o JSONRenderer do DRF '
+        'e o FastJSONRenderer nos payloads de vendas e produtos. Dados revertidos ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def _medir(self, renderer, data, repeat):
+        melhor = None
+        for _ in range(repeat):
+            inicio = time.perf_counter()
+            saida = renderer.render(data, 'application/json')
+            duracao = time.perf_counter() - inicio
+            melhor = duracao if melhor is None else min(melhor, duracao)
+        return melhor, saida
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson não instalado: FastJSONRenderer usa o renderer padrão.'))
+
+        padrao, rapido = JSONRenderer(), FastJSONRenderer()
+        for rows in options['rows']:
+            with transaction.atomic():
+                dados = criar_dados_benchmark(rows)
+                store = dados['store']
+                sales = Sale.objects.filter(store=store)
+                payloads = {
+                    'sales': SaleFastSerializer().serialize(sales.values(*SaleFastSerializer().value_paths())),
+                    'products': ProductSerializer(
+                        Product.objects.filter(store_products__store=store).select_related('category'), many=True
+                    ).data,
+                    # Agregados com Decimal cru, como nos relatórios
+                    'sales-report': list(
+                        sales.values('seller__name', 'payment_method')
+                        .annotate(total_sales=Count('id'), total_revenue=Sum('total_amount'))
+                    ) * max(rows // 10, 1),
+                }
+                for nome, data in payloads.items():
+                    t_padrao, saida_padrao = self._medir(padrao, data, options['repeat'])
+                    t_rapido, saida_rapida = self._medir(rapido, data, options['repeat'])
+                    iguais = json.loads(saida_padrao) == json.loads(saida_rapida)
+                    self.stdout.write(
+                        f'{nome:13} {rows:>6} linhas | padrão {t_padrao * 1000:8.2f} ms {len(saida_padrao):>9} bytes | '
+                        f'rápido {t_rapido * 1000:8.2f} ms {len(saida_rapida):>9} bytes | '
+                        f'{t_padrao / t_rapido:5.1f}x | conteúdo idêntico: {"sim" if iguais else "NÃO"}'
+                    )
+                transaction.set_rollback(True)
@@ -0,0 +1,70 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from otica_app.fast_serializers import SaleFastSerializer, StoreProductFastSerializer
+from otica_app.models import Sale, StoreProduct
+from otica_app.serializers import SaleSerializer, StoreProductSerializer
+
+from ._bench import criar_dados_benchmark
+
+
+def _plain(data):
+    return json.loads(json.dumps(data))
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão dos serializers DRF com o caminho rápido sobre .values() '
+        'nas listagens de vendas e estoque. Os dados são criados e revertidos em transação.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def _medir(self, func, repeat):
+        melhor = None
+        resultado = None
+        for _ in range(repeat):
+            inicio = time.perf_counter()
+            resultado = func()
+            duracao = time.perf_counter() - inicio
+            melhor = duracao if melhor is None else min(melhor, duracao)
+        return melhor, resultado
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        for rows in options['rows']:
+            with transaction.atomic():
+                dados = criar_dados_benchmark(rows)
+                store = dados['store']
+
+                # Mesmos querysets usados pelas views
+                store_products = StoreProduct.objects.filter(store=store).select_related('product', 'store')
+                sales = Sale.objects.filter(store=store).select_related('seller', 'store').prefetch_related('items__product')
+
+                casos = [
+                    (
+                        'store-products',
+                        lambda: StoreProductSerializer(store_products.all(), many=True).data,
+                        lambda: StoreProductFastSerializer().serialize(store_products.values(*StoreProductFastSerializer().value_paths())),
+                    ),
+                    (
+                        'sales',
+                        lambda: SaleSerializer(sales.all(), many=True).data,
+                        lambda: SaleFastSerializer().serialize(sales.values(*SaleFastSerializer().value_paths())),
+                    ),
+                ]
+                for nome, drf, rapido in casos:
+                    t_drf, saida_drf = self._medir(drf, repeat)
+                    t_rapido, saida_rapida = self._medir(rapido, repeat)
+                    iguais = _plain(saida_drf) == _plain(saida_rapida)
+                    self.stdout.write(
+                        f'{nome:15} {rows:>6} linhas | DRF {rows / t_drf:>10.0f} linhas/s ({t_drf * 1000:8.1f} ms) | '
+                        f'rápido {rows / t_rapido:>10.0f} linhas/s ({t_rapido * 1000:8.1f} ms) | '
+                        f'{t_drf / t_rapido:5.1f}x | saída idêntica: {"sim" if iguais else "NÃO"}'
+                    )
+                transaction.set_rollback(True)
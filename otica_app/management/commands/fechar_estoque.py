@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from otica_app.stock import registrar_fechamento
+
+
+class Command(BaseCommand):
+    help = 'Grava o fechamento diário de estoque por loja (agendar via cron logo após a meia-noite)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Data do fechamento (AAAA-MM-DD). Padrão: ontem')
+        parser.add_argument('--store', type=int, action='append', help='Restringe a uma ou mais lojas')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                data = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('Data inválida, use o formato AAAA-MM-DD.')
+        else:
+            data = timezone.localdate() - timedelta(days=1)
+
+        total = registrar_fechamento(data, options['store'])
+        self.stdout.write(self.style.SUCCESS(f'{total} posições de estoque gravadas para {data:%d/%m/%Y}'))
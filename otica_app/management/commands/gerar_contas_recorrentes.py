@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from otica_app.recorrencias import materializar_recorrencias
+
+
+class Command(BaseCommand):
+    help = 'Gera as próximas ocorrências das contas a pagar recorrentes (rode diariamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=3, help='Quantos meses à frente gerar, contando o inicial (padrão: 3)')
+        parser.add_argument('--a-partir', help='Mês inicial YYYY-MM (padrão: mês atual)')
+        parser.add_argument('--store', type=int, action='append', help='ID da loja (pode repetir; padrão: todas)')
+
+    def handle(self, *args, **options):
+        if options['meses'] < 1:
+            raise CommandError('--meses deve ser pelo menos 1')
+        a_partir = None
+        if options['a_partir']:
+            try:
+                a_partir = date.fromisoformat(f"{options['a_partir']}-01")
+            except ValueError:
+                raise CommandError('Use o formato YYYY-MM em --a-partir')
+
+        criadas = materializar_recorrencias(options['meses'], a_partir, options['store'])
+        self.stdout.write(self.style.SUCCESS(f'{criadas} contas a pagar geradas'))
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from otica_app.folha import gerar_folha
+
+
+class Command(BaseCommand):
+    help = 'Gera a folha de pagamento do mês para todos os funcionários ativos'
+
+    def add_arguments(self, parser):
+        hoje = date.today()
+        parser.add_argument('--ano', type=int, default=hoje.year)
+        parser.add_argument('--mes', type=int, default=hoje.month)
+        parser.add_argument('--store', type=int, action='append', help='ID da loja (pode repetir; padrão: todas)')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['mes'] <= 12:
+            raise CommandError('Mês deve estar entre 1 e 12')
+
+        resumo = gerar_folha(options['ano'], options['mes'], options['store'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{resumo["geradas"]} folhas geradas para {resumo["mes"]:02d}/{resumo["ano"]} '
+            f'({resumo["ignoradas_pagas"]} já pagas mantidas, comissões R$ {resumo["total_comissoes"]})'
+        ))
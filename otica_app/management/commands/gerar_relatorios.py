@@ -0,0 +1,35 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from otica_app.models import RelatorioFinanceiro
+from otica_app.relatorios import gerar_relatorios
+
+
+class Command(BaseCommand):
+    help = 'Gera os relatórios financeiros das lojas a partir de vendas, contas e folha'
+
+    def add_arguments(self, parser):
+        tipos = [tipo for tipo, _ in RelatorioFinanceiro.TIPO_CHOICES]
+        parser.add_argument('--tipo', choices=tipos, default='mensal')
+        parser.add_argument('--ano', type=int, default=date.today().year, help='Ano a gerar (padrão: atual)')
+        parser.add_argument('--inicio', help='Data inicial YYYY-MM-DD (substitui --ano)')
+        parser.add_argument('--fim', help='Data final YYYY-MM-DD (substitui --ano)')
+        parser.add_argument('--store', type=int, action='append', help='ID da loja (pode repetir; padrão: todas)')
+
+    def handle(self, *args, **options):
+        try:
+            inicio = date.fromisoformat(options['inicio']) if options['inicio'] else date(options['ano'], 1, 1)
+            fim = date.fromisoformat(options['fim']) if options['fim'] else date(options['ano'], 12, 31)
+        except ValueError as exc:
+            raise CommandError(f'Data inválida: {exc}')
+        if fim < inicio:
+            raise CommandError('A data final deve ser igual ou posterior à inicial')
+
+        comeco = time.perf_counter()
+        novos, alterados = gerar_relatorios(options['tipo'], inicio, fim, options['store'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(novos)} relatórios criados e {len(alterados)} atualizados '
+            f'({options["tipo"]}, {inicio} a {fim}) em {time.perf_counter() - comeco:.2f}s'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from otica_app.images import generate_variants
+from otica_app.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Gera as variações redimensionadas das fotos de produtos já cadastradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regera também produtos que já têm variações')
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.exclude(image='').exclude(image__isnull=True).order_by('id')
+        if not options['force']:
+            queryset = queryset.filter(image_variants={})
+
+        gerados = falhas = 0
+        for product in queryset.iterator(chunk_size=200):
+            try:
+                generate_variants(product)
+                gerados += 1
+            except Exception as exc:
+                falhas += 1
+                self.stderr.write(f'Produto {product.id} ({product.image.name}): {exc}')
+
+        self.stdout.write(self.style.SUCCESS(f'{gerados} produtos processados, {falhas} falhas'))
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from otica_app.eventos import limpar
+
+
+class Command(BaseCommand):
+    help = 'Apaga os eventos em tempo real (EventoLoja) mais antigos que EVENTS_RETENTION_HOURS (rode de hora em hora)'
+
+    def handle(self, *args, **options):
+        apagados = limpar()
+        self.stdout.write(self.style.SUCCESS(
+            f'{apagados} eventos com mais de {settings.EVENTS_RETENTION_HOURS} horas apagados'
+        ))
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from otica_app.sincronizacao import limpar_exclusoes
+
+
+class Command(BaseCommand):
+    help = 'Apaga as marcas de exclusão da sincronização incremental mais antigas que SYNC_TOMBSTONE_DAYS (rode diariamente)'
+
+    def handle(self, *args, **options):
+        apagadas = limpar_exclusoes()
+        self.stdout.write(self.style.SUCCESS(
+            f'{apagadas} marcas de exclusão com mais de {settings.SYNC_TOMBSTONE_DAYS} dias apagadas'
+        ))
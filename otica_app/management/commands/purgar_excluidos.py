@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from otica_app.exclusao import TAMANHO_LOTE, purgar_excluidos
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove fisicamente produtos, categorias, fornecedores e funcionários excluídos '
+        'logicamente há mais de --dias dias e sem histórico associado (rode semanalmente)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=180)
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE)
+
+    def handle(self, *args, **options):
+        resultado = purgar_excluidos(options['dias'], options['lote'])
+        for nome, (apagados, mantidos) in resultado.items():
+            self.stdout.write(self.style.SUCCESS(
+                f'{nome}: {apagados} removidos, {mantidos} mantidos por terem histórico'
+            ))
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from otica_app.desempenho import recalcular_desempenho
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os totais diários de desempenho dos vendedores a partir das vendas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Data inicial YYYY-MM-DD (padrão: todo o histórico)')
+        parser.add_argument('--fim', help='Data final YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        try:
+            inicio = date.fromisoformat(options['inicio']) if options['inicio'] else None
+            fim = date.fromisoformat(options['fim']) if options['fim'] else None
+        except ValueError as exc:
+            raise CommandError(f'Data inválida: {exc}')
+
+        linhas = recalcular_desempenho(inicio, fim)
+        self.stdout.write(self.style.SUCCESS(f'{linhas} linhas de desempenho diário gravadas'))
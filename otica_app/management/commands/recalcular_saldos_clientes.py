@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from otica_app.recebiveis import recalcular_saldos
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o saldo em aberto de cada cliente a partir das contas a receber'
+
+    def handle(self, *args, **options):
+        clientes = recalcular_saldos()
+        self.stdout.write(self.style.SUCCESS(f'{clientes} clientes com saldo em aberto'))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from otica_app.tasks import limpar_antigas, recuperar_travadas, rodar_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Worker da fila de tarefas em segundo plano'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Executa as pendentes e sai')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos entre consultas à fila vazia')
+        parser.add_argument('--manter-dias', type=int, default=30, help='Apaga tarefas finalizadas há mais dias que isso')
+
+    def handle(self, *args, **options):
+        devolvidas, falhas = recuperar_travadas()
+        if devolvidas:
+            self.stdout.write(f'{devolvidas} tarefas travadas devolvidas à fila')
+        if falhas:
+            self.stdout.write(f'{falhas} tarefas travadas marcadas como falhas (máximo de tentativas)')
+        apagadas = limpar_antigas(options['manter_dias'])
+        if apagadas:
+            self.stdout.write(f'{apagadas} tarefas antigas removidas')
+
+        if options['once']:
+            executadas = rodar_pendentes()
+            self.stdout.write(self.style.SUCCESS(f'{executadas} tarefas executadas'))
+            return
+
+        self.stdout.write('Aguardando tarefas (Ctrl+C para sair)...')
+        ultima_recuperacao = time.monotonic()
+        try:
+            while True:
+                if not rodar_pendentes():
+                    time.sleep(options['intervalo'])
+                if time.monotonic() - ultima_recuperacao > 60:
+                    recuperar_travadas()
+                    ultima_recuperacao = time.monotonic()
+        except KeyboardInterrupt:
+            self.stdout.write('Worker encerrado')
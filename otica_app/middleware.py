@@ -0,0 +1,137 @@
+"""
+Compressão negociada (brotli ou gzip) das respostas da API.
+
+Só comprime conteúdo textual (JSON por padrão) acima de
+API_COMPRESSION_MIN_SIZE bytes. Respostas em streaming, síncronas ou
+assíncronas, usam um único compressor incremental, produzindo um stream
+contínuo em vez de um membro gzip por pedaço.
+"""
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli é opcional
+    brotli = None
+
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_CONTENT_TYPES = ('application/json',)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _accepted_encodings(header):
+    """Codificações aceitas no Accept-Encoding, ignorando as com q=0"""
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name)
+    return accepted
+
+
+class _GzipStream:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+STREAMS = {'gzip': _GzipStream, 'br': _BrotliStream}
+
+
+def compress_bytes(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    stream = _GzipStream()
+    return stream.compress(content) + stream.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Substitui o GZipMiddleware do Django para as respostas da API"""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'API_COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+        self.content_types = tuple(getattr(settings, 'API_COMPRESSION_CONTENT_TYPES', DEFAULT_CONTENT_TYPES))
+
+    def choose_encoding(self, request):
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in self.content_types:
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            stream = STREAMS[encoding]()
+            original = response.streaming_content
+            if response.is_async:
+                async def compressed():
+                    async for chunk in original:
+                        data = stream.compress(chunk)
+                        if data:
+                            yield data
+                    yield stream.finish()
+            else:
+                def compressed():
+                    for chunk in original:
+                        data = stream.compress(chunk)
+                        if data:
+                            yield data
+                    yield stream.finish()
+            response.streaming_content = compressed()
+            del response.headers['Content-Length']
+        else:
+            content = compress_bytes(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
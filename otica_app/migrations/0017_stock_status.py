@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:38
+
+from django.db import migrations, models
+
+
+def fill_stock_status(apps, schema_editor):
+    # Na criação dos campos todos os produtos seguem o estoque mínimo padrão (5)
+    StoreProduct = apps.get_model('otica_app', 'StoreProduct')
+    StoreProduct.objects.filter(quantity__gt=0, quantity__lt=5).update(stock_status='low')
+    StoreProduct.objects.filter(quantity__gte=5).update(stock_status='normal')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0016_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reorder_level',
+            field=models.IntegerField(default=5, verbose_name='Estoque Mínimo'),
+        ),
+        migrations.AddField(
+            model_name='storeproduct',
+            name='reorder_level',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Estoque Mínimo da Loja'),
+        ),
+        migrations.AddField(
+            model_name='storeproduct',
+            name='stock_status',
+            field=models.CharField(choices=[('normal', 'Normal'), ('low', 'Estoque Baixo'), ('out', 'Sem Estoque')], default='out', editable=False, max_length=10, verbose_name='Situação do Estoque'),
+        ),
+        migrations.AddIndex(
+            model_name='storeproduct',
+            index=models.Index(fields=['store', 'stock_status'], name='storeprod_store_status_idx'),
+        ),
+        migrations.RunPython(fill_stock_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:52
+
+from django.db import migrations
+
+TRIGRAM_FIELDS = ('name', 'brand', 'model', 'code')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Índices de trigramas só existem no PostgreSQL; no SQLite a busca usa o índice em memória
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in TRIGRAM_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS product_{field}_trgm_idx '
+            f'ON otica_app_product USING gin (UPPER("{field}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in TRIGRAM_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS product_{field}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0017_stock_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
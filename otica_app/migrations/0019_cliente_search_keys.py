@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:41
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _normalize(value):
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).lower().split())
+
+
+def fill_search_keys(apps, schema_editor):
+    Cliente = apps.get_model('otica_app', 'Cliente')
+    clientes = list(Cliente.objects.only('id', 'nome', 'cpf', 'telefone'))
+    for cliente in clientes:
+        cliente.nome_busca = _normalize(cliente.nome)
+        cliente.cpf_busca = re.sub(r'\D', '', cliente.cpf or '')
+        cliente.telefone_busca = re.sub(r'\D', '', cliente.telefone or '')
+    Cliente.objects.bulk_update(clientes, ['nome_busca', 'cpf_busca', 'telefone_busca'], batch_size=1000)
+
+
+def create_name_trigram_index(apps, schema_editor):
+    # Busca por sobrenome (LIKE '%termo%') indexada via pg_trgm, habilitado na 0018
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS cliente_nome_busca_trgm_idx '
+        'ON otica_app_cliente USING gin ("nome_busca" gin_trgm_ops)'
+    )
+
+
+def drop_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS cliente_nome_busca_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0018_product_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='cpf_busca',
+            field=models.CharField(blank=True, editable=False, max_length=11, verbose_name='CPF (busca)'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='nome_busca',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='Nome (busca)'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='telefone_busca',
+            field=models.CharField(blank=True, editable=False, max_length=20, verbose_name='Telefone (busca)'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nome_busca'], name='cliente_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['cpf_busca'], name='cliente_cpf_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['telefone_busca'], name='cliente_tel_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_name_trigram_index, drop_name_trigram_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0019_cliente_search_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variações da Foto'),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:53
+
+import unicodedata
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def _normalize(value):
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).lower().split())
+
+
+def link_sellers(apps, schema_editor):
+    """Vincula vendedor e funcionário da mesma loja com o mesmo nome, quando o par é único"""
+    Seller = apps.get_model('otica_app', 'Seller')
+    Funcionario = apps.get_model('otica_app', 'Funcionario')
+
+    funcionarios = defaultdict(list)
+    for funcionario in Funcionario.objects.only('id', 'nome', 'store_id'):
+        funcionarios[funcionario.store_id, _normalize(funcionario.nome)].append(funcionario.id)
+    sellers = defaultdict(list)
+    for seller in Seller.objects.only('id', 'name', 'store_id'):
+        sellers[seller.store_id, _normalize(seller.name)].append(seller)
+
+    linked = []
+    for key, candidates in sellers.items():
+        if len(candidates) == 1 and len(funcionarios.get(key, [])) == 1:
+            candidates[0].funcionario_id = funcionarios[key][0]
+            linked.append(candidates[0])
+    Seller.objects.bulk_update(linked, ['funcionario'], batch_size=1000)
+
+
+def fill_daily_stats(apps, schema_editor):
+    Sale = apps.get_model('otica_app', 'Sale')
+    SaleItem = apps.get_model('otica_app', 'SaleItem')
+    SellerDailyStats = apps.get_model('otica_app', 'SellerDailyStats')
+
+    rows = {}
+    totals = (
+        Sale.objects.annotate(day=TruncDate('sale_date')).order_by()
+        .values('seller_id', 'store_id', 'day')
+        .annotate(count=Count('id'), total=Sum('total_amount'))
+    )
+    for row in totals:
+        stats = rows.get((row['seller_id'], row['day']))
+        if stats is None:
+            stats = rows[row['seller_id'], row['day']] = SellerDailyStats(
+                seller_id=row['seller_id'], store_id=row['store_id'], date=row['day'], revenue=Decimal('0')
+            )
+        stats.sales_count += row['count']
+        stats.revenue += row['total'] or 0
+
+    items = (
+        SaleItem.objects.annotate(day=TruncDate('sale__sale_date')).order_by()
+        .values('sale__seller_id', 'day')
+        .annotate(quantity=Sum('quantity'))
+    )
+    for row in items:
+        stats = rows.get((row['sale__seller_id'], row['day']))
+        if stats is not None:
+            stats.items_count += row['quantity'] or 0
+
+    SellerDailyStats.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0021_tarefa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seller',
+            name='funcionario',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vendedor', to='otica_app.funcionario', verbose_name='Funcionário'),
+        ),
+        migrations.CreateModel(
+            name='SellerDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('sales_count', models.IntegerField(default=0, verbose_name='Vendas')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Faturamento')),
+                ('items_count', models.IntegerField(default=0, verbose_name='Itens Vendidos')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='otica_app.seller', verbose_name='Vendedor')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seller_daily_stats', to='otica_app.store', verbose_name='Loja')),
+            ],
+            options={
+                'verbose_name': 'Desempenho Diário do Vendedor',
+                'verbose_name_plural': 'Desempenho Diário dos Vendedores',
+                'indexes': [models.Index(fields=['store', 'date'], name='sellerstats_store_date_idx')],
+                'unique_together': {('seller', 'date')},
+            },
+        ),
+        migrations.RunPython(link_sellers, migrations.RunPython.noop),
+        migrations.RunPython(fill_daily_stats, migrations.RunPython.noop),
+    ]
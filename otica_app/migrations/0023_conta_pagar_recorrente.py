@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:55
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0022_seller_funcionario_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContaPagarRecorrente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao', models.CharField(max_length=200, verbose_name='Descrição')),
+                ('tipo', models.CharField(choices=[('fornecedor', 'Fornecedor'), ('funcionario', 'Funcionário'), ('imposto', 'Imposto'), ('servico', 'Serviço'), ('aluguel', 'Aluguel'), ('energia', 'Energia'), ('agua', 'Água'), ('internet', 'Internet'), ('telefone', 'Telefone'), ('manutencao', 'Manutenção'), ('marketing', 'Marketing'), ('outro', 'Outro')], max_length=20, verbose_name='Tipo')),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Valor')),
+                ('dia_vencimento', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(31)], verbose_name='Dia de Vencimento')),
+                ('data_inicio', models.DateField(verbose_name='Início')),
+                ('data_fim', models.DateField(blank=True, null=True, verbose_name='Fim')),
+                ('ativo', models.BooleanField(default=True, verbose_name='Ativo')),
+                ('observacoes', models.TextField(blank=True, verbose_name='Observações')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Conta a Pagar Recorrente',
+                'verbose_name_plural': 'Contas a Pagar Recorrentes',
+                'ordering': ['store', 'dia_vencimento', 'descricao'],
+            },
+        ),
+        migrations.AddField(
+            model_name='contapagar',
+            name='competencia',
+            field=models.DateField(blank=True, help_text='Primeiro dia do mês a que a conta recorrente se refere', null=True, verbose_name='Competência'),
+        ),
+        migrations.AddField(
+            model_name='contapagarrecorrente',
+            name='fornecedor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='otica_app.fornecedor', verbose_name='Fornecedor'),
+        ),
+        migrations.AddField(
+            model_name='contapagarrecorrente',
+            name='store',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contas_pagar_recorrentes', to='otica_app.store', verbose_name='Loja'),
+        ),
+        migrations.AddField(
+            model_name='contapagar',
+            name='recorrencia',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='contas', to='otica_app.contapagarrecorrente', verbose_name='Recorrência'),
+        ),
+        migrations.AddConstraint(
+            model_name='contapagar',
+            constraint=models.UniqueConstraint(fields=('recorrencia', 'competencia'), name='contapagar_recorrencia_competencia_uniq'),
+        ),
+    ]
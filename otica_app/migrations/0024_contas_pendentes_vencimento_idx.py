@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0023_conta_pagar_recorrente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contapagar',
+            index=models.Index(condition=models.Q(('status', 'pendente')), fields=['data_vencimento'], name='contapagar_pendente_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contareceber',
+            index=models.Index(condition=models.Q(('status', 'pendente')), fields=['data_vencimento'], name='contareceber_pendente_venc_idx'),
+        ),
+    ]
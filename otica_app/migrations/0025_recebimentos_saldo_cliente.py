@@ -0,0 +1,99 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:58
+
+from decimal import Decimal
+from django.conf import settings
+import django.core.validators
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+import django.db.models.deletion
+
+
+def backfill(apps, schema_editor):
+    ContaReceber = apps.get_model('otica_app', 'ContaReceber')
+    RecebimentoConta = apps.get_model('otica_app', 'RecebimentoConta')
+    SaldoCliente = apps.get_model('otica_app', 'SaldoCliente')
+
+    # Valores já recebidos viram um lançamento único, para o razão fechar com valor_recebido
+    RecebimentoConta.objects.bulk_create(
+        [
+            RecebimentoConta(
+                conta_id=conta['id'],
+                valor=conta['valor_recebido'],
+                data_recebimento=conta['data_recebimento'] or conta['data_vencimento'],
+                observacoes='Recebido antes do controle de recebimentos',
+            )
+            for conta in ContaReceber.objects.filter(valor_recebido__gt=0).values(
+                'id', 'valor_recebido', 'data_recebimento', 'data_vencimento'
+            )
+        ],
+        batch_size=1000,
+    )
+
+    open_amount = Case(
+        When(Q(status__in=['recebido', 'cancelado']) | Q(valor_recebido__gte=F('valor')), then=Value(Decimal('0'))),
+        default=F('valor') - F('valor_recebido'),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    rows = (
+        ContaReceber.objects.filter(cliente__isnull=False)
+        .annotate(aberto=open_amount).filter(aberto__gt=0)
+        .order_by().values('cliente_id').annotate(total=Sum('aberto'), contas=Count('id'))
+    )
+    SaldoCliente.objects.bulk_create(
+        [SaldoCliente(cliente_id=row['cliente_id'], total_aberto=row['total'], contas_abertas=row['contas']) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0024_contas_pendentes_vencimento_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='saldo', serialize=False, to='otica_app.cliente', verbose_name='Cliente')),
+                ('total_aberto', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total em Aberto')),
+                ('contas_abertas', models.IntegerField(default=0, verbose_name='Contas em Aberto')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Saldo do Cliente',
+                'verbose_name_plural': 'Saldos dos Clientes',
+            },
+        ),
+        migrations.AddField(
+            model_name='contareceber',
+            name='parcela',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Parcela'),
+        ),
+        migrations.AddField(
+            model_name='contareceber',
+            name='total_parcelas',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Total de Parcelas'),
+        ),
+        migrations.CreateModel(
+            name='RecebimentoConta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Valor')),
+                ('data_recebimento', models.DateField(verbose_name='Data de Recebimento')),
+                ('forma_pagamento', models.CharField(blank=True, choices=[('dinheiro', 'Dinheiro'), ('cartao_credito', 'Cartão de Crédito'), ('cartao_debito', 'Cartão de Débito'), ('pix', 'PIX'), ('boleto', 'Boleto'), ('transferencia', 'Transferência')], max_length=15, verbose_name='Forma de Pagamento')),
+                ('observacoes', models.TextField(blank=True, verbose_name='Observações')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('conta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recebimentos', to='otica_app.contareceber', verbose_name='Conta')),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recebimentos', to=settings.AUTH_USER_MODEL, verbose_name='Lançado por')),
+            ],
+            options={
+                'verbose_name': 'Recebimento',
+                'verbose_name_plural': 'Recebimentos',
+                'ordering': ['-data_recebimento', '-id'],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
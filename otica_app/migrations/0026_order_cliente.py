@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:59
+
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _normalize(value):
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).lower().split())
+
+
+def link_orders(apps, schema_editor):
+    """Liga pedidos a clientes pelo telefone ou, na falta dele, pelo nome, quando há um único cliente correspondente"""
+    Order = apps.get_model('otica_app', 'Order')
+    Cliente = apps.get_model('otica_app', 'Cliente')
+
+    by_phone, by_name = defaultdict(set), defaultdict(set)
+    for cliente_id, nome_busca, telefone_busca in Cliente.objects.values_list('id', 'nome_busca', 'telefone_busca'):
+        if telefone_busca:
+            by_phone[telefone_busca].add(cliente_id)
+        if nome_busca:
+            by_name[nome_busca].add(cliente_id)
+
+    linked = []
+    for order in Order.objects.filter(cliente__isnull=True).only('id', 'customer_name', 'customer_phone'):
+        candidates = by_phone.get(re.sub(r'\D', '', order.customer_phone or '')) or by_name.get(_normalize(order.customer_name))
+        if candidates and len(candidates) == 1:
+            order.cliente_id = next(iter(candidates))
+            linked.append(order)
+    Order.objects.bulk_update(linked, ['cliente'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0025_recebimentos_saldo_cliente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='cliente',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pedidos', to='otica_app.cliente', verbose_name='Cliente'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['cliente', '-created_at'], name='order_cliente_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['cliente', '-sale_date'], name='sale_cliente_date_idx'),
+        ),
+        migrations.RunPython(link_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0026_order_cliente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['store', 'status', '-created_at', '-id'], name='order_store_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['store', 'updated_at'], name='order_store_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:09
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0027_order_board_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroExclusao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recurso', models.CharField(max_length=30, verbose_name='Recurso')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID do Objeto')),
+                ('store_id', models.BigIntegerField(blank=True, null=True, verbose_name='Loja')),
+                ('excluido_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Excluído em')),
+            ],
+            options={
+                'verbose_name': 'Registro de Exclusão',
+                'verbose_name_plural': 'Registros de Exclusão',
+            },
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Atualizado em'),
+        ),
+        migrations.AddField(
+            model_name='seller',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Data de Atualização'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['atualizado_em', 'id'], name='cliente_atualizado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at', 'id'], name='product_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seller',
+            index=models.Index(fields=['store', 'updated_at', 'id'], name='seller_store_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storeproduct',
+            index=models.Index(fields=['store', 'updated_at', 'id'], name='storeprod_store_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroexclusao',
+            index=models.Index(fields=['recurso', 'excluido_em', 'id'], name='exclusao_recurso_data_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0028_sync_incremental'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='excluido_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Excluído em'),
+        ),
+        migrations.AddField(
+            model_name='fornecedor',
+            name='excluido_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Excluído em'),
+        ),
+        migrations.AddField(
+            model_name='funcionario',
+            name='excluido_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Excluído em'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='excluido_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Excluído em'),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=100, verbose_name='Nome'),
+        ),
+        migrations.AlterField(
+            model_name='funcionario',
+            name='cpf',
+            field=models.CharField(max_length=14, verbose_name='CPF'),
+        ),
+        migrations.AddIndex(
+            model_name='fornecedor',
+            index=models.Index(condition=models.Q(('excluido_em__isnull', True), ('ativo', True)), fields=['nome'], name='fornecedor_ativo_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='funcionario',
+            index=models.Index(condition=models.Q(('excluido_em__isnull', True), ('ativo', True)), fields=['store', 'nome'], name='funcionario_ativo_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('excluido_em__isnull', True)), fields=['name'], name='product_vivo_nome_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(condition=models.Q(('excluido_em__isnull', True)), fields=('name',), name='category_nome_vivo_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='funcionario',
+            constraint=models.UniqueConstraint(condition=models.Q(('excluido_em__isnull', True)), fields=('cpf',), name='funcionario_cpf_vivo_uniq'),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0029_exclusao_logica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('customer_name', models.CharField(max_length=100, verbose_name='Nome do Cliente')),
+                ('customer_email', models.EmailField(max_length=254, verbose_name='Email do Cliente')),
+                ('customer_phone', models.CharField(max_length=20, verbose_name='Telefone do Cliente')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Total')),
+                ('payment_method', models.CharField(choices=[('dinheiro', 'Dinheiro'), ('cartao_credito', 'Cartão de Crédito'), ('cartao_debito', 'Cartão de Débito'), ('pix', 'PIX')], default='dinheiro', max_length=15, verbose_name='Forma de Pagamento')),
+                ('sale_date', models.DateTimeField(verbose_name='Data da Venda')),
+                ('created_at', models.DateTimeField(verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(verbose_name='Atualizado em')),
+                ('cash_till_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_sales', to='otica_app.cashtillsession', verbose_name='Sessão de Caixa')),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vendas_arquivadas', to='otica_app.cliente', verbose_name='Cliente')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_sales', to='otica_app.seller', verbose_name='Vendedor')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_sales', to='otica_app.store', verbose_name='Loja')),
+            ],
+            options={
+                'verbose_name': 'Venda Arquivada',
+                'verbose_name_plural': 'Vendas Arquivadas',
+                'ordering': ['-sale_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Arquivamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('corte', models.DateField(verbose_name='Corte')),
+                ('iniciado_em', models.DateTimeField(auto_now_add=True, verbose_name='Iniciado em')),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('movidas', models.JSONField(blank=True, default=dict, verbose_name='Linhas movidas')),
+            ],
+            options={
+                'verbose_name': 'Arquivamento',
+                'verbose_name_plural': 'Arquivamentos',
+                'ordering': ['-iniciado_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSaleItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='Quantidade')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço Unitário')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço Total')),
+                ('updated_at', models.DateTimeField(verbose_name='Atualizado em')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_sale_items', to='otica_app.product', verbose_name='Produto')),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='otica_app.archivedsale', verbose_name='Venda')),
+            ],
+            options={
+                'verbose_name': 'Item de Venda Arquivada',
+                'verbose_name_plural': 'Itens de Vendas Arquivadas',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedCashFlow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Valor')),
+                ('flow_type', models.CharField(choices=[('entrada', 'Entrada'), ('saida', 'Saída')], max_length=10, verbose_name='Tipo')),
+                ('description', models.CharField(blank=True, max_length=200, verbose_name='Descrição')),
+                ('date', models.DateTimeField(verbose_name='Data')),
+                ('cash_till_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_cash_flows', to='otica_app.cashtillsession', verbose_name='Sessão de Caixa')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_cash_flows', to='otica_app.store', verbose_name='Loja')),
+            ],
+            options={
+                'verbose_name': 'Fluxo de Caixa Arquivado',
+                'verbose_name_plural': 'Fluxos de Caixa Arquivados',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedStockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='Quantidade')),
+                ('movement_type', models.CharField(choices=[('entrada', 'Entrada'), ('saida', 'Saída')], max_length=10, verbose_name='Tipo de Movimentação')),
+                ('reason', models.CharField(blank=True, max_length=200, verbose_name='Motivo')),
+                ('created_at', models.DateTimeField(verbose_name='Data da Movimentação')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_stock_movements', to='otica_app.product', verbose_name='Produto')),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_stock_movements', to='otica_app.store', verbose_name='Loja')),
+            ],
+            options={
+                'verbose_name': 'Movimentação de Estoque Arquivada',
+                'verbose_name_plural': 'Movimentações de Estoque Arquivadas',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['store', 'created_at'], name='archmov_store_created_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedsale',
+            index=models.Index(fields=['store', 'sale_date'], name='archsale_store_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedsale',
+            index=models.Index(fields=['cliente', '-sale_date'], name='archsale_cliente_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcashflow',
+            index=models.Index(fields=['store', 'date'], name='archflow_store_date_idx'),
+        ),
+    ]
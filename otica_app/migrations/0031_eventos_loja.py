@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:31
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0030_arquivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoLoja',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('store_id', models.BigIntegerField(verbose_name='Loja')),
+                ('tipo', models.CharField(max_length=30, verbose_name='Tipo')),
+                ('dados', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Dados')),
+                ('criado_em', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Criado em')),
+            ],
+            options={
+                'verbose_name': 'Evento da Loja',
+                'verbose_name_plural': 'Eventos das Lojas',
+                'indexes': [models.Index(fields=['store_id', 'id'], name='evento_loja_id_idx')],
+            },
+        ),
+    ]
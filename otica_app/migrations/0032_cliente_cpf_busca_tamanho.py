@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otica_app', '0031_eventos_loja'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cliente',
+            name='cpf_busca',
+            field=models.CharField(blank=True, editable=False, max_length=14, verbose_name='CPF (busca)'),
+        ),
+    ]
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import AbstractUser
-from django.core.validators import MinValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MaxValueValidator, MinValueValidator
 from decimal import Decimal
+from django.dispatch import Signal
 from django.utils import timezone
+from . import eventos
+from .utils import normalizar_texto, somente_digitos
 
 
 class User(AbstractUser):
@@ -45,8 +49,73 @@ class Store(models.Model):
         return self.name
 
 
-class Category(models.Model):
-    name = models.CharField('Nome', max_length=100, unique=True)
+# Enviado após a exclusão lógica de um objeto (sender=classe, instance=objeto)
+exclusao_logica = Signal()
+
+VIVOS = models.Q(excluido_em__isnull=True)
+
+
+class ExclusaoLogicaQuerySet(models.QuerySet):
+    def delete(self):
+        """Exclusão lógica objeto a objeto, preservando os efeitos de delete() de cada modelo"""
+        total = 0
+        with transaction.atomic(using=self.db):
+            for obj in self:
+                obj.delete()
+                total += 1
+        return total, {self.model._meta.label: total}
+
+    def excluir_definitivamente(self):
+        return super().delete()
+
+
+class VivosManager(models.Manager.from_queryset(ExclusaoLogicaQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(VIVOS)
+
+
+class ExclusaoLogica(models.Model):
+    """
+    delete() apenas preenche excluido_em. `objects` traz só as linhas vivas
+    (cada modelo tem índices parciais WHERE excluido_em IS NULL para as suas
+    listagens) e `todos` inclui as excluídas. O acesso por FK usa o manager
+    base e continua encontrando objetos excluídos referenciados pelo histórico.
+    O comando purgar_excluidos remove fisicamente as antigas sem dependências.
+    """
+    excluido_em = models.DateTimeField('Excluído em', null=True, blank=True, editable=False)
+
+    objects = VivosManager()
+    todos = models.Manager.from_queryset(ExclusaoLogicaQuerySet)()
+
+    class Meta:
+        abstract = True
+
+    def _marcar_exclusao(self, excluir):
+        agora = timezone.now()
+        self.excluido_em = agora if excluir else None
+        campos = {'excluido_em': self.excluido_em}
+        # updated_at / atualizado_em também mudam, para a sincronização incremental
+        for field in self._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                campos[field.attname] = agora
+                setattr(self, field.attname, agora)
+        type(self).todos.filter(pk=self.pk).update(**campos)
+
+    def delete(self, using=None, keep_parents=False):
+        if self.excluido_em is None:
+            self._marcar_exclusao(True)
+            exclusao_logica.send(sender=type(self), instance=self)
+        return 1, {self._meta.label: 1}
+
+    def restaurar(self):
+        self._marcar_exclusao(False)
+
+    def excluir_definitivamente(self):
+        return super().delete()
+
+
+class Category(ExclusaoLogica):
+    name = models.CharField('Nome', max_length=100)
     description = models.TextField('Descrição', blank=True)
     active = models.BooleanField('Ativo', default=True)
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
@@ -56,12 +125,15 @@ class Category(models.Model):
         verbose_name = 'Categoria'
         verbose_name_plural = 'Categorias'
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['name'], condition=VIVOS, name='category_nome_vivo_uniq'),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Product(models.Model):
+class Product(ExclusaoLogica):
     name = models.CharField('Nome', max_length=100)
     brand = models.CharField('Marca', max_length=100, blank=True)
     model = models.CharField('Modelo', max_length=100, blank=True)
@@ -71,6 +143,8 @@ class Product(models.Model):
     cost = models.DecimalField('Preço de Custo', max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, verbose_name='Categoria')
     image = models.ImageField(upload_to='products/', null=True, blank=True, verbose_name='Foto')
+    image_variants = models.JSONField('Variações da Foto', default=dict, blank=True, editable=False)
+    reorder_level = models.IntegerField('Estoque Mínimo', default=5)
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
     
@@ -78,26 +152,61 @@ class Product(models.Model):
         verbose_name = 'Produto'
         verbose_name_plural = 'Produtos'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='product_updated_idx'),
+            models.Index(fields=['name'], condition=VIVOS, name='product_vivo_nome_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estoque mínimo como carregado, para save() só recalcular as lojas quando mudar
+        instance._reorder_level_carregado = instance.__dict__.get('reorder_level')
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.code:
             # Busca o maior código já existente (considerando formato 01, 02, 03...)
-            last_product = Product.objects.order_by('-id').first()
+            # Inclui excluídos: o código continua único na tabela
+            last_product = Product.todos.order_by('-id').first()
             if last_product and last_product.code and last_product.code.isdigit():
                 next_code = int(last_product.code) + 1
             else:
                 next_code = 1
             self.code = f"{next_code:02d}"
+        creating = self._state.adding
         super().save(*args, **kwargs)
+        if not creating and self.reorder_level != getattr(self, '_reorder_level_carregado', None):
+            # Lojas sem estoque mínimo próprio seguem o do produto
+            StoreProduct.objects.filter(product=self, reorder_level__isnull=True).update(
+                stock_status=StoreProduct.stock_status_expression(models.Value(self.reorder_level)),
+                updated_at=timezone.now(),
+            )
+        self._reorder_level_carregado = self.reorder_level
+
+    def delete(self, *args, **kwargs):
+        # Sai do estoque das lojas, como na exclusão física; vendas e movimentações ficam
+        with transaction.atomic():
+            for store_product in StoreProduct.objects.filter(product=self):
+                store_product.delete()
+            return super().delete(*args, **kwargs)
 
 
 class StoreProduct(models.Model):
+    STOCK_STATUS_CHOICES = (
+        ('normal', 'Normal'),
+        ('low', 'Estoque Baixo'),
+        ('out', 'Sem Estoque'),
+    )
+
     store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='store_products', verbose_name='Loja')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='store_products', verbose_name='Produto')
     quantity = models.IntegerField('Quantidade em Estoque', default=0)
+    reorder_level = models.IntegerField('Estoque Mínimo da Loja', null=True, blank=True)
+    stock_status = models.CharField('Situação do Estoque', max_length=10, choices=STOCK_STATUS_CHOICES, default='out', editable=False)
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
     
@@ -106,21 +215,93 @@ class StoreProduct(models.Model):
         verbose_name_plural = 'Produtos das Lojas'
         unique_together = ['store', 'product']
         ordering = ['product__name']
+        indexes = [
+            models.Index(fields=['store', 'stock_status'], name='storeprod_store_status_idx'),
+            models.Index(fields=['store', 'updated_at', 'id'], name='storeprod_store_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.store.name} ({self.quantity})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estoque como carregado, para save() só publicar stock_changed quando o que o painel mostra mudar
+        instance._estoque_carregado = (instance.__dict__.get('quantity'), instance.__dict__.get('stock_status'))
+        return instance
+
+    @property
+    def effective_reorder_level(self):
+        if self.reorder_level is not None:
+            return self.reorder_level
+        return self.product.reorder_level
+
+    @staticmethod
+    def calcular_stock_status(quantity, reorder_level):
+        """Situação do estoque para a quantidade e o estoque mínimo efetivo"""
+        if quantity <= 0:
+            return 'out'
+        if quantity < reorder_level:
+            return 'low'
+        return 'normal'
+
+    @staticmethod
+    def stock_status_expression(reorder_level):
+        """Expressão SQL equivalente a save() para atualizações em lote"""
+        return models.Case(
+            models.When(quantity__lte=0, then=models.Value('out')),
+            models.When(quantity__lt=reorder_level, then=models.Value('low')),
+            default=models.Value('normal'),
+            output_field=models.CharField(),
+        )
+
+    def save(self, *args, **kwargs):
+        self.stock_status = self.calcular_stock_status(self.quantity, self.effective_reorder_level)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'quantity' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'stock_status'}
+        super().save(*args, **kwargs)
+        estoque = (self.quantity, self.stock_status)
+        if estoque != getattr(self, '_estoque_carregado', None):
+            self._estoque_carregado = estoque
+            self.publicar_estoque()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        self.publicar_estoque(removido=True)
+        return resultado
+
+    def publicar_estoque(self, removido=False):
+        eventos.publicar(self.store_id, 'stock_changed', {
+            'product': self.product_id,
+            'quantity': 0 if removido else self.quantity,
+            'stock_status': 'out' if removido else self.stock_status,
+            'removed': removido,
+        })
+
 
 class Seller(models.Model):
     name = models.CharField(max_length=200, verbose_name='Nome')
     email = models.EmailField(verbose_name='E-mail', blank=True)
     phone = models.CharField(max_length=20, verbose_name='Telefone', blank=True)
     store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='sellers', verbose_name='Loja')
+    funcionario = models.OneToOneField(
+        'Funcionario',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='vendedor',
+        verbose_name='Funcionário'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')
     
     class Meta:
         verbose_name = 'Vendedor'
         verbose_name_plural = 'Vendedores'
+        indexes = [
+            models.Index(fields=['store', 'updated_at', 'id'], name='seller_store_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.store.name}"
@@ -197,6 +378,9 @@ class Sale(models.Model):
         verbose_name = 'Venda'
         verbose_name_plural = 'Vendas'
         ordering = ['-sale_date']
+        indexes = [
+            models.Index(fields=['cliente', '-sale_date'], name='sale_cliente_date_idx'),
+        ]
 
     def __str__(self):
         return f'Venda {self.id} - {self.customer_name}'
@@ -218,6 +402,7 @@ class SaleItem(models.Model):
     quantity = models.IntegerField('Quantidade')
     unit_price = models.DecimalField('Preço Unitário', max_digits=10, decimal_places=2)
     total_price = models.DecimalField('Preço Total', max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
     
     class Meta:
         verbose_name = 'Item da Venda'
@@ -227,12 +412,67 @@ class SaleItem(models.Model):
         return f'{self.quantity}x {self.product.name}'
 
 
+class SellerDailyStats(models.Model):
+    """Totais diários por vendedor, mantidos a cada venda registrada ou excluída"""
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='daily_stats', verbose_name='Vendedor')
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='seller_daily_stats', verbose_name='Loja')
+    date = models.DateField('Data')
+    sales_count = models.IntegerField('Vendas', default=0)
+    revenue = models.DecimalField('Faturamento', max_digits=14, decimal_places=2, default=0)
+    items_count = models.IntegerField('Itens Vendidos', default=0)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Desempenho Diário do Vendedor'
+        verbose_name_plural = 'Desempenho Diário dos Vendedores'
+        unique_together = ['seller', 'date']
+        indexes = [
+            models.Index(fields=['store', 'date'], name='sellerstats_store_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.seller.name} - {self.date}: {self.sales_count} vendas'
+
+    @classmethod
+    def registrar(cls, sale, sign=1, items_count=None):
+        """Soma (sign=1) ou desconta (sign=-1) a venda no total do dia do vendedor"""
+        if items_count is None:
+            items_count = sale.items.aggregate(total=models.Sum('quantity'))['total'] or 0
+        day = timezone.localdate(sale.sale_date)
+        revenue = sign * sale.total_amount
+        changes = {
+            'sales_count': models.F('sales_count') + sign,
+            'revenue': models.F('revenue') + revenue,
+            'items_count': models.F('items_count') + sign * items_count,
+            'updated_at': timezone.now(),
+        }
+        row = cls.objects.filter(seller_id=sale.seller_id, date=day)
+        if row.update(**changes):
+            if sign < 0:
+                row.filter(sales_count__lte=0).delete()
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    seller_id=sale.seller_id,
+                    store_id=sale.store_id,
+                    date=day,
+                    sales_count=sign,
+                    revenue=revenue,
+                    items_count=sign * items_count,
+                )
+        except IntegrityError:
+            # Outra requisição criou a linha do dia ao mesmo tempo
+            row.update(**changes)
+
+
 class StockMovement(models.Model):
     MOVEMENT_TYPES = [
         ('entrada', 'Entrada'),
         ('saida', 'Saída'),
     ]
     
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='stock_movements', null=True, blank=True, verbose_name='Loja')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements', verbose_name='Produto')
     quantity = models.IntegerField(validators=[MinValueValidator(1)], verbose_name='Quantidade')
     movement_type = models.CharField(max_length=10, choices=MOVEMENT_TYPES, verbose_name='Tipo de Movimentação')
@@ -243,10 +483,47 @@ class StockMovement(models.Model):
         verbose_name = 'Movimentação de Estoque'
         verbose_name_plural = 'Movimentações de Estoque'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['store', 'created_at'], name='stockmov_store_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - {self.get_movement_type_display()} - {self.quantity}"
 
+    @classmethod
+    def registrar(cls, store, product, delta, reason=''):
+        """Registra no razão de estoque uma variação (positiva ou negativa) de quantidade"""
+        if not delta:
+            return None
+        return cls.objects.create(
+            store=store,
+            product=product,
+            quantity=abs(delta),
+            movement_type='entrada' if delta > 0 else 'saida',
+            reason=reason
+        )
+
+
+class StockSnapshot(models.Model):
+    """Foto do estoque de cada produto por loja no fechamento de um dia"""
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='stock_snapshots', verbose_name='Loja')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots', verbose_name='Produto')
+    date = models.DateField('Data')
+    quantity = models.IntegerField('Quantidade')
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Fechamento de Estoque'
+        verbose_name_plural = 'Fechamentos de Estoque'
+        unique_together = ['store', 'product', 'date']
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['store', 'date'], name='stocksnap_store_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.store.name} em {self.date:%d/%m/%Y} ({self.quantity})"
+
 
 class CashFlow(models.Model):
     FLOW_TYPES = [
@@ -281,6 +558,7 @@ class Order(models.Model):
     customer_phone = models.CharField(max_length=20, blank=True, null=True, verbose_name="Telefone do Cliente")
     seller = models.ForeignKey(Seller, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Vendedor")
     store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='orders', verbose_name='Loja')
+    cliente = models.ForeignKey('Cliente', on_delete=models.SET_NULL, null=True, blank=True, related_name='pedidos', verbose_name='Cliente')
 
     # Medidas - Olho Direito
     sphere_right = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name="Esférico (OD)")
@@ -312,6 +590,12 @@ class Order(models.Model):
         verbose_name = "Pedido"
         verbose_name_plural = "Pedidos"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['cliente', '-created_at'], name='order_cliente_created_idx'),
+            # Quadro de pedidos: colunas por status paginadas por (created_at, id) e polling por updated_at
+            models.Index(fields=['store', 'status', '-created_at', '-id'], name='order_store_status_idx'),
+            models.Index(fields=['store', 'updated_at'], name='order_store_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Pedido #{self.id} - {self.customer_name}"
@@ -342,6 +626,10 @@ class Cliente(models.Model):
     dnp_oe = models.CharField('DNP OE', max_length=20, blank=True, null=True)
     adicao = models.CharField('Adição', max_length=20, blank=True, null=True)
     observacoes_opticas = models.TextField('Observações Ópticas', blank=True, null=True)
+    # Chaves normalizadas para busca no balcão (preenchidas no save)
+    nome_busca = models.CharField('Nome (busca)', max_length=200, blank=True, editable=False)
+    cpf_busca = models.CharField('CPF (busca)', max_length=14, blank=True, editable=False)
+    telefone_busca = models.CharField('Telefone (busca)', max_length=20, blank=True, editable=False)
     criado_em = models.DateTimeField('Criado em', auto_now_add=True)
     atualizado_em = models.DateTimeField('Atualizado em', auto_now=True)
 
@@ -349,12 +637,27 @@ class Cliente(models.Model):
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
         ordering = ['nome']
+        indexes = [
+            models.Index(fields=['nome_busca'], name='cliente_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['cpf_busca'], name='cliente_cpf_busca_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['telefone_busca'], name='cliente_tel_busca_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['atualizado_em', 'id'], name='cliente_atualizado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nome} ({self.cpf})" if self.cpf else self.nome
 
+    def save(self, *args, **kwargs):
+        self.nome_busca = normalizar_texto(self.nome)
+        self.cpf_busca = somente_digitos(self.cpf)
+        self.telefone_busca = somente_digitos(self.telefone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'nome_busca', 'cpf_busca', 'telefone_busca'}
+        super().save(*args, **kwargs)
+
 
-class Fornecedor(models.Model):
+class Fornecedor(ExclusaoLogica):
     """Modelo para cadastro de fornecedores"""
     nome = models.CharField('Nome/Razão Social', max_length=200)
     cnpj = models.CharField('CNPJ', max_length=18, blank=True)
@@ -374,12 +677,15 @@ class Fornecedor(models.Model):
         verbose_name = 'Fornecedor'
         verbose_name_plural = 'Fornecedores'
         ordering = ['nome']
+        indexes = [
+            models.Index(fields=['nome'], condition=VIVOS & models.Q(ativo=True), name='fornecedor_ativo_nome_idx'),
+        ]
     
     def __str__(self):
         return self.nome
 
 
-class Funcionario(models.Model):
+class Funcionario(ExclusaoLogica):
     """Modelo para cadastro de funcionários"""
     CARGO_CHOICES = [
         ('vendedor', 'Vendedor'),
@@ -393,7 +699,7 @@ class Funcionario(models.Model):
     ]
     
     nome = models.CharField('Nome Completo', max_length=200)
-    cpf = models.CharField('CPF', max_length=14, unique=True)
+    cpf = models.CharField('CPF', max_length=14)
     rg = models.CharField('RG', max_length=20, blank=True)
     data_nascimento = models.DateField('Data de Nascimento', null=True, blank=True)
     email = models.EmailField('E-mail', blank=True)
@@ -419,6 +725,12 @@ class Funcionario(models.Model):
         verbose_name = 'Funcionário'
         verbose_name_plural = 'Funcionários'
         ordering = ['nome']
+        constraints = [
+            models.UniqueConstraint(fields=['cpf'], condition=VIVOS, name='funcionario_cpf_vivo_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['store', 'nome'], condition=VIVOS & models.Q(ativo=True), name='funcionario_ativo_nome_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nome} - {self.get_cargo_display()}"
@@ -460,6 +772,8 @@ class ContaPagar(models.Model):
     
     store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='contas_pagar', verbose_name='Loja')
     status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='pendente')
+    recorrencia = models.ForeignKey('ContaPagarRecorrente', on_delete=models.SET_NULL, null=True, blank=True, related_name='contas', verbose_name='Recorrência')
+    competencia = models.DateField('Competência', null=True, blank=True, help_text='Primeiro dia do mês a que a conta recorrente se refere')
     observacoes = models.TextField('Observações', blank=True)
     criado_em = models.DateTimeField('Criado em', auto_now_add=True)
     atualizado_em = models.DateTimeField('Atualizado em', auto_now=True)
@@ -468,6 +782,14 @@ class ContaPagar(models.Model):
         verbose_name = 'Conta a Pagar'
         verbose_name_plural = 'Contas a Pagar'
         ordering = ['data_vencimento']
+        constraints = [
+            # Uma ocorrência por recorrência e mês: a geração pode rodar quantas vezes quiser
+            models.UniqueConstraint(fields=['recorrencia', 'competencia'], name='contapagar_recorrencia_competencia_uniq'),
+        ]
+        indexes = [
+            # Varredura diária de vencidos (ver vencimentos.py)
+            models.Index(fields=['data_vencimento'], condition=models.Q(status='pendente'), name='contapagar_pendente_venc_idx'),
+        ]
     
     def __str__(self):
         return f"{self.descricao} - R$ {self.valor} (Venc: {self.data_vencimento})"
@@ -483,6 +805,31 @@ class ContaPagar(models.Model):
         return (self.data_vencimento - hoje).days
 
 
+class ContaPagarRecorrente(models.Model):
+    """Modelo de conta a pagar mensal (aluguel, energia, internet...) gerada pelo comando gerar_contas_recorrentes"""
+    descricao = models.CharField('Descrição', max_length=200)
+    tipo = models.CharField('Tipo', max_length=20, choices=ContaPagar.TIPO_CHOICES)
+    fornecedor = models.ForeignKey(Fornecedor, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Fornecedor')
+    valor = models.DecimalField('Valor', max_digits=10, decimal_places=2)
+    dia_vencimento = models.PositiveSmallIntegerField('Dia de Vencimento', validators=[MinValueValidator(1), MaxValueValidator(31)])
+    data_inicio = models.DateField('Início')
+    data_fim = models.DateField('Fim', null=True, blank=True)
+    
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='contas_pagar_recorrentes', verbose_name='Loja')
+    ativo = models.BooleanField('Ativo', default=True)
+    observacoes = models.TextField('Observações', blank=True)
+    criado_em = models.DateTimeField('Criado em', auto_now_add=True)
+    atualizado_em = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Conta a Pagar Recorrente'
+        verbose_name_plural = 'Contas a Pagar Recorrentes'
+        ordering = ['store', 'dia_vencimento', 'descricao']
+    
+    def __str__(self):
+        return f"{self.descricao} - R$ {self.valor} (todo dia {self.dia_vencimento})"
+
+
 class ContaReceber(models.Model):
     """Modelo para contas a receber"""
     TIPO_CHOICES = [
@@ -511,6 +858,8 @@ class ContaReceber(models.Model):
     
     store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='contas_receber', verbose_name='Loja')
     status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='pendente')
+    parcela = models.PositiveSmallIntegerField('Parcela', null=True, blank=True)
+    total_parcelas = models.PositiveSmallIntegerField('Total de Parcelas', null=True, blank=True)
     observacoes = models.TextField('Observações', blank=True)
     criado_em = models.DateTimeField('Criado em', auto_now_add=True)
     atualizado_em = models.DateTimeField('Atualizado em', auto_now=True)
@@ -519,6 +868,10 @@ class ContaReceber(models.Model):
         verbose_name = 'Conta a Receber'
         verbose_name_plural = 'Contas a Receber'
         ordering = ['data_vencimento']
+        indexes = [
+            # Varredura diária de vencidos (ver vencimentos.py)
+            models.Index(fields=['data_vencimento'], condition=models.Q(status='pendente'), name='contareceber_pendente_venc_idx'),
+        ]
     
     def __str__(self):
         return f"{self.descricao} - R$ {self.valor} (Venc: {self.data_vencimento})"
@@ -532,6 +885,117 @@ class ContaReceber(models.Model):
         from django.utils import timezone
         hoje = timezone.now().date()
         return (self.data_vencimento - hoje).days
+    
+    @staticmethod
+    def valor_em_aberto(valor, valor_recebido, status):
+        """Quanto ainda falta receber; contas recebidas ou canceladas não contam no saldo"""
+        if status in ('recebido', 'cancelado'):
+            return Decimal('0')
+        return max(Decimal(valor) - Decimal(valor_recebido), Decimal('0'))
+    
+    def save(self, *args, **kwargs):
+        anterior = None
+        if self.pk:
+            anterior = ContaReceber.objects.filter(pk=self.pk).values('cliente_id', 'valor', 'valor_recebido', 'status').first()
+        super().save(*args, **kwargs)
+        
+        # Mantém SaldoCliente com a diferença do valor em aberto desta conta
+        if anterior and anterior['cliente_id']:
+            aberto = self.valor_em_aberto(anterior['valor'], anterior['valor_recebido'], anterior['status'])
+            SaldoCliente.ajustar(anterior['cliente_id'], -aberto, -1 if aberto else 0)
+        if self.cliente_id:
+            aberto = self.valor_em_aberto(self.valor, self.valor_recebido, self.status)
+            SaldoCliente.ajustar(self.cliente_id, aberto, 1 if aberto else 0)
+    
+    # Exclusões (inclusive em cascata pela loja) ajustam o saldo em recebiveis.conta_excluida
+    
+    def registrar_recebimento(self, valor, data_recebimento=None, forma_pagamento='', usuario=None, observacoes='', encerrar=False):
+        """
+        Lança um recebimento total ou parcial; a conta fica 'recebido' quando
+        quitada, ou mesmo com saldo se `encerrar` (baixa com desconto). Com
+        `encerrar` e valor zero só encerra, sem lançar recebimento (devolve None).
+        """
+        data_recebimento = data_recebimento or timezone.localdate()
+        recebimento = None
+        with transaction.atomic():
+            conta = ContaReceber.objects.select_for_update().get(pk=self.pk)
+            if valor or not encerrar:
+                recebimento = RecebimentoConta.objects.create(
+                    conta=conta,
+                    valor=valor,
+                    data_recebimento=data_recebimento,
+                    forma_pagamento=forma_pagamento,
+                    observacoes=observacoes,
+                    criado_por=usuario,
+                )
+                conta.valor_recebido += recebimento.valor
+            conta.data_recebimento = data_recebimento
+            if encerrar or conta.valor_recebido >= conta.valor:
+                conta.status = 'recebido'
+            conta.save()
+        
+        self.valor_recebido = conta.valor_recebido
+        self.data_recebimento = conta.data_recebimento
+        self.status = conta.status
+        return recebimento
+
+
+class RecebimentoConta(models.Model):
+    """Pagamento (total ou parcial) lançado contra uma conta a receber"""
+    FORMA_CHOICES = Sale.PAYMENT_CHOICES + (
+        ('boleto', 'Boleto'),
+        ('transferencia', 'Transferência'),
+    )
+    
+    conta = models.ForeignKey(ContaReceber, on_delete=models.CASCADE, related_name='recebimentos', verbose_name='Conta')
+    valor = models.DecimalField('Valor', max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
+    data_recebimento = models.DateField('Data de Recebimento')
+    forma_pagamento = models.CharField('Forma de Pagamento', max_length=15, choices=FORMA_CHOICES, blank=True)
+    observacoes = models.TextField('Observações', blank=True)
+    criado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='recebimentos', verbose_name='Lançado por')
+    criado_em = models.DateTimeField('Criado em', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Recebimento'
+        verbose_name_plural = 'Recebimentos'
+        ordering = ['-data_recebimento', '-id']
+    
+    def __str__(self):
+        return f"R$ {self.valor} em {self.data_recebimento} ({self.conta.descricao})"
+
+
+class SaldoCliente(models.Model):
+    """Total em aberto de contas a receber por cliente, ajustado a cada alteração de ContaReceber"""
+    cliente = models.OneToOneField(Cliente, on_delete=models.CASCADE, primary_key=True, related_name='saldo', verbose_name='Cliente')
+    total_aberto = models.DecimalField('Total em Aberto', max_digits=12, decimal_places=2, default=0)
+    contas_abertas = models.IntegerField('Contas em Aberto', default=0)
+    atualizado_em = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Saldo do Cliente'
+        verbose_name_plural = 'Saldos dos Clientes'
+    
+    def __str__(self):
+        return f"{self.cliente.nome}: R$ {self.total_aberto}"
+    
+    @classmethod
+    def ajustar(cls, cliente_id, valor, contas=0):
+        """Soma `valor` e `contas` ao saldo do cliente, criando a linha se preciso"""
+        if not valor and not contas:
+            return
+        changes = {
+            'total_aberto': models.F('total_aberto') + valor,
+            'contas_abertas': models.F('contas_abertas') + contas,
+            'atualizado_em': timezone.now(),
+        }
+        row = cls.objects.filter(cliente_id=cliente_id)
+        if row.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(cliente_id=cliente_id, total_aberto=valor, contas_abertas=contas)
+        except IntegrityError:
+            row.update(**changes)
 
 
 class FolhaPagamento(models.Model):
@@ -618,15 +1082,199 @@ class RelatorioFinanceiro(models.Model):
     def __str__(self):
         return f"Relatório {self.get_tipo_display()} - {self.store.name} ({self.data_inicio} a {self.data_fim})"
     
-    def save(self, *args, **kwargs):
-        # Calcula valores automaticamente
+    def calcular_totais(self):
+        """Totais, lucro e margem a partir das parcelas (também usado antes de bulk_create/bulk_update)"""
         self.receita_total = self.receita_vendas + self.receita_servicos + self.receita_outras
         self.despesa_total = self.despesa_fornecedores + self.despesa_funcionarios + self.despesa_impostos + self.despesa_servicos + self.despesa_outras
         self.lucro_bruto = self.receita_total - self.despesa_total
         
         if self.receita_total > 0:
-            self.margem_lucro = (self.lucro_bruto / self.receita_total) * 100
+            margem = (self.lucro_bruto / self.receita_total * 100).quantize(Decimal('0.01'))
+            # A coluna comporta no máximo 999,99 em módulo
+            self.margem_lucro = max(min(margem, Decimal('999.99')), Decimal('-999.99'))
         else:
             self.margem_lucro = 0
-            
-        super().save(*args, **kwargs) 
\ No newline at end of file
+    
+    def save(self, *args, **kwargs):
+        # Calcula valores automaticamente
+        self.calcular_totais()
+        super().save(*args, **kwargs) 
+
+class Tarefa(models.Model):
+    """Trabalho executado em segundo plano pelo comando rodar_tarefas"""
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('falhou', 'Falhou'),
+    ]
+    
+    nome = models.CharField('Nome', max_length=100)
+    args = models.JSONField('Argumentos', default=list, blank=True)
+    kwargs = models.JSONField('Argumentos Nomeados', default=dict, blank=True)
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='pendente')
+    tentativas = models.PositiveIntegerField('Tentativas', default=0)
+    max_tentativas = models.PositiveIntegerField('Máximo de Tentativas', default=3)
+    resultado = models.JSONField('Resultado', null=True, blank=True)
+    erro = models.TextField('Erro', blank=True)
+    agendada_para = models.DateTimeField('Agendada para', default=timezone.now)
+    criado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tarefas', verbose_name='Criado por')
+    criado_em = models.DateTimeField('Criado em', auto_now_add=True)
+    iniciada_em = models.DateTimeField('Iniciada em', null=True, blank=True)
+    concluida_em = models.DateTimeField('Concluída em', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['status', 'agendada_para'], name='tarefa_status_agenda_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nome} #{self.pk} ({self.get_status_display()})"
+
+
+class EventoLoja(models.Model):
+    """Evento publicado por uma escrita; o processo ASGI lê a tabela e entrega pelo SSE (ver eventos.py)"""
+    # Sem FK: o evento pode ser de uma loja que está sendo excluída
+    store_id = models.BigIntegerField('Loja')
+    tipo = models.CharField('Tipo', max_length=30)
+    dados = models.JSONField('Dados', default=dict, encoder=DjangoJSONEncoder)
+    criado_em = models.DateTimeField('Criado em', default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = 'Evento da Loja'
+        verbose_name_plural = 'Eventos das Lojas'
+        indexes = [
+            models.Index(fields=['store_id', 'id'], name='evento_loja_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} (loja {self.store_id})"
+
+
+class RegistroExclusao(models.Model):
+    """Marca de exclusão consultada pela sincronização incremental (ver sincronizacao.py)"""
+    recurso = models.CharField('Recurso', max_length=30)
+    objeto_id = models.BigIntegerField('ID do Objeto')
+    # Sem FK: a loja pode estar sendo excluída junto com os registros
+    store_id = models.BigIntegerField('Loja', null=True, blank=True)
+    excluido_em = models.DateTimeField('Excluído em', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Registro de Exclusão'
+        verbose_name_plural = 'Registros de Exclusão'
+        indexes = [
+            models.Index(fields=['recurso', 'excluido_em', 'id'], name='exclusao_recurso_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recurso} #{self.objeto_id} ({self.excluido_em:%d/%m/%Y %H:%M})"
+
+
+# --- Arquivo de períodos fechados (ver arquivo.py) ---
+# Mesmas colunas das tabelas quentes, sem auto_now: as linhas chegam copiadas,
+# com os ids e datas originais, pelo comando arquivar_periodos.
+
+class ArchivedSale(models.Model):
+    cash_till_session = models.ForeignKey(
+        CashTillSession, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='archived_sales', verbose_name='Sessão de Caixa'
+    )
+    customer_name = models.CharField('Nome do Cliente', max_length=100)
+    customer_email = models.EmailField('Email do Cliente')
+    customer_phone = models.CharField('Telefone do Cliente', max_length=20)
+    seller = models.ForeignKey(Seller, on_delete=models.PROTECT, related_name='archived_sales', verbose_name='Vendedor')
+    total_amount = models.DecimalField('Total', max_digits=10, decimal_places=2, default=0)
+    payment_method = models.CharField('Forma de Pagamento', max_length=15, choices=Sale.PAYMENT_CHOICES, default='dinheiro')
+    sale_date = models.DateTimeField('Data da Venda')
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='archived_sales', verbose_name='Loja')
+    created_at = models.DateTimeField('Criado em')
+    updated_at = models.DateTimeField('Atualizado em')
+    cliente = models.ForeignKey('Cliente', on_delete=models.SET_NULL, null=True, blank=True, related_name='vendas_arquivadas', verbose_name='Cliente')
+
+    class Meta:
+        verbose_name = 'Venda Arquivada'
+        verbose_name_plural = 'Vendas Arquivadas'
+        ordering = ['-sale_date']
+        indexes = [
+            models.Index(fields=['store', 'sale_date'], name='archsale_store_date_idx'),
+            models.Index(fields=['cliente', '-sale_date'], name='archsale_cliente_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'Venda {self.id} - {self.customer_name} (arquivada)'
+
+
+class ArchivedSaleItem(models.Model):
+    # related_name igual ao de SaleItem: serializers de venda funcionam nos dois
+    sale = models.ForeignKey(ArchivedSale, on_delete=models.CASCADE, related_name='items', verbose_name='Venda')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='archived_sale_items', verbose_name='Produto')
+    quantity = models.IntegerField('Quantidade')
+    unit_price = models.DecimalField('Preço Unitário', max_digits=10, decimal_places=2)
+    total_price = models.DecimalField('Preço Total', max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField('Atualizado em')
+
+    class Meta:
+        verbose_name = 'Item de Venda Arquivada'
+        verbose_name_plural = 'Itens de Vendas Arquivadas'
+
+    def __str__(self):
+        return f'{self.quantity}x {self.product.name}'
+
+
+class ArchivedStockMovement(models.Model):
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='archived_stock_movements', null=True, blank=True, verbose_name='Loja')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='archived_stock_movements', verbose_name='Produto')
+    quantity = models.IntegerField(verbose_name='Quantidade')
+    movement_type = models.CharField(max_length=10, choices=StockMovement.MOVEMENT_TYPES, verbose_name='Tipo de Movimentação')
+    reason = models.CharField(max_length=200, verbose_name='Motivo', blank=True)
+    created_at = models.DateTimeField(verbose_name='Data da Movimentação')
+
+    class Meta:
+        verbose_name = 'Movimentação de Estoque Arquivada'
+        verbose_name_plural = 'Movimentações de Estoque Arquivadas'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['store', 'created_at'], name='archmov_store_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.get_movement_type_display()} - {self.quantity} (arquivada)"
+
+
+class ArchivedCashFlow(models.Model):
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='archived_cash_flows', verbose_name='Loja')
+    cash_till_session = models.ForeignKey(CashTillSession, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_cash_flows', verbose_name='Sessão de Caixa')
+    amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Valor')
+    flow_type = models.CharField(max_length=10, choices=CashFlow.FLOW_TYPES, verbose_name='Tipo')
+    description = models.CharField(max_length=200, verbose_name='Descrição', blank=True)
+    date = models.DateTimeField(verbose_name='Data')
+
+    class Meta:
+        verbose_name = 'Fluxo de Caixa Arquivado'
+        verbose_name_plural = 'Fluxos de Caixa Arquivados'
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['store', 'date'], name='archflow_store_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.store.name} - {self.get_flow_type_display()} - R$ {self.amount} (arquivado)"
+
+
+class Arquivamento(models.Model):
+    """Execução do arquivamento: tudo anterior a `corte` pode estar nas tabelas de arquivo"""
+    corte = models.DateField('Corte')
+    iniciado_em = models.DateTimeField('Iniciado em', auto_now_add=True)
+    concluido_em = models.DateTimeField('Concluído em', null=True, blank=True)
+    movidas = models.JSONField('Linhas movidas', default=dict, blank=True)
+
+    class Meta:
+        verbose_name = 'Arquivamento'
+        verbose_name_plural = 'Arquivamentos'
+        ordering = ['-iniciado_em']
+
+    def __str__(self):
+        return f"Arquivamento até {self.corte:%d/%m/%Y} ({self.iniciado_em:%d/%m/%Y %H:%M})"
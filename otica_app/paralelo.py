@@ -0,0 +1,64 @@
+"""
+Execução concorrente de consultas independentes dos dashboards.
+
+DRF 3.14 não tem views assíncronas, então as agregações independentes de
+uma mesma resposta rodam num pool de threads limitado: a latência passa a
+ser a da consulta mais lenta e não a soma de todas. Vale igualmente sob
+WSGI e ASGI (onde views síncronas ficam todas numa única thread).
+
+Cada thread tem sua própria conexão com o banco; close_old_connections ao
+final de cada consulta aplica CONN_MAX_AGE como no ciclo de uma requisição.
+Os contextvars (ex.: usar_replica) são copiados para a thread. O fuso horário
+ativo do Django fica num asgiref Local, que não é visível em outra thread, e
+por isso é reativado explicitamente (TruncDate e __date dependem dele).
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.REPORT_QUERY_WORKERS,
+                thread_name_prefix='consultas',
+            )
+        return _executor
+
+
+def _executar(consulta, fuso):
+    try:
+        with timezone.override(fuso):
+            return consulta()
+    finally:
+        close_old_connections()
+
+
+def em_paralelo(consultas):
+    """
+    Recebe {nome: função sem argumentos} e devolve {nome: resultado}.
+
+    Executa em sequência quando o pool está desligado
+    (REPORT_QUERY_WORKERS = 0), quando há uma só consulta ou dentro de uma
+    transação, cujas alterações ainda não confirmadas as outras conexões
+    não enxergariam.
+    """
+    if settings.REPORT_QUERY_WORKERS <= 0 or len(consultas) < 2 or connection.in_atomic_block:
+        return {nome: consulta() for nome, consulta in consultas.items()}
+
+    pool = _pool()
+    fuso = timezone.get_current_timezone()
+    futuros = {
+        nome: pool.submit(contextvars.copy_context().run, _executar, consulta, fuso)
+        for nome, consulta in consultas.items()
+    }
+    return {nome: futuro.result() for nome, futuro in futuros.items()}
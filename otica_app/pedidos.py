@@ -0,0 +1,76 @@
+"""
+Quadro de pedidos do laboratório (realizando / pronto / entregue).
+
+As contagens por status saem de uma única consulta agrupada e cada coluna é
+paginada por keyset em (created_at, id), percorrendo o índice
+order_store_status_idx sem OFFSET. Para polling, `since` devolve apenas os
+pedidos alterados depois do instante informado (índice order_store_updated_idx)
+e os ids dos excluídos, pelas marcas de RegistroExclusao (recurso 'orders'),
+como em /api/sync/.
+"""
+import base64
+import binascii
+
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Order, RegistroExclusao
+from .sincronizacao import CursorExpirado, inicio_retencao
+
+TAMANHO_PADRAO = 20
+TAMANHO_MAXIMO = 100
+MAX_ALTERADOS = 500
+
+
+def codificar_cursor(order):
+    texto = f'{order.created_at.isoformat()}|{order.pk}'
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """(created_at, id) do último pedido da página anterior; ValueError se inválido"""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Cursor inválido')
+    momento = parse_datetime(created_at)
+    if momento is None or not pk.isdigit():
+        raise ValueError('Cursor inválido')
+    return momento, int(pk)
+
+
+def contagem_por_status(queryset):
+    contagem = {status: 0 for status, _ in Order.STATUS_CHOICES}
+    for row in queryset.order_by().values('status').annotate(total=Count('id')):
+        contagem[row['status']] = row['total']
+    return contagem
+
+
+def pagina_coluna(queryset, status, cursor=None, tamanho=TAMANHO_PADRAO):
+    """Pedidos da coluna do mais novo para o mais antigo; devolve (pedidos, próximo cursor)"""
+    queryset = queryset.filter(status=status).order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decodificar_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    pedidos = list(queryset[:tamanho + 1])
+    proximo = codificar_cursor(pedidos[tamanho - 1]) if len(pedidos) > tamanho else None
+    return pedidos[:tamanho], proximo
+
+
+def alterados_desde(queryset, momento):
+    """Pedidos criados ou alterados depois de `momento`, mais antigos primeiro"""
+    return list(queryset.filter(updated_at__gt=momento).order_by('updated_at', 'id')[:MAX_ALTERADOS])
+
+
+def removidos_desde(momento, store_id=None):
+    """
+    Ids dos pedidos excluídos depois de `momento` (da loja, se informada).
+    CursorExpirado se `momento` é anterior à retenção das marcas.
+    """
+    if momento < inicio_retencao(timezone.now()):
+        raise CursorExpirado('since anterior ao período de retenção das exclusões; recarregue o quadro.')
+    marcas = RegistroExclusao.objects.filter(recurso='orders', excluido_em__gt=momento)
+    if store_id is not None:
+        marcas = marcas.filter(store_id=store_id)
+    return list(marcas.order_by('excluido_em', 'id').values_list('objeto_id', flat=True)[:MAX_ALTERADOS])
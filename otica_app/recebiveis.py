@@ -0,0 +1,96 @@
+"""
+Parcelamento e saldo de contas a receber.
+
+gerar_parcelas cria todas as parcelas de uma venda com um único bulk_create
+(a primeira absorve os centavos da divisão) e ajusta o SaldoCliente uma vez.
+conta_excluida tira do saldo as contas excluídas, inclusive em cascata
+(exclusão da loja) e por queryset.delete(), que não passam por delete().
+recalcular_saldos reconstrói SaldoCliente a partir de ContaReceber, para
+corrigir alterações feitas por fora do ORM (queryset.update, SQL manual).
+"""
+from decimal import ROUND_DOWN, Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ContaReceber, SaldoCliente
+from .utils import somar_meses
+
+CENTAVOS = Decimal('0.01')
+
+
+def dividir_valor(total, parcelas):
+    """Valores das parcelas somando exatamente `total`"""
+    base = (total / parcelas).quantize(CENTAVOS, rounding=ROUND_DOWN)
+    valores = [base] * parcelas
+    valores[0] += total - base * parcelas
+    return valores
+
+
+def gerar_parcelas(descricao, valor_total, parcelas, primeiro_vencimento, store, cliente=None, venda=None, tipo='venda', observacoes=''):
+    """Cria as `parcelas` contas mensais a partir de `primeiro_vencimento`"""
+    contas = [
+        ContaReceber(
+            descricao=f'{descricao} ({numero}/{parcelas})',
+            tipo=tipo,
+            cliente=cliente,
+            venda=venda,
+            valor=valor,
+            data_vencimento=somar_meses(primeiro_vencimento, numero - 1),
+            store=store,
+            parcela=numero,
+            total_parcelas=parcelas,
+            observacoes=observacoes,
+        )
+        for numero, valor in enumerate(dividir_valor(valor_total, parcelas), start=1)
+    ]
+    with transaction.atomic():
+        ContaReceber.objects.bulk_create(contas)
+        # bulk_create não passa por save(): ajusta o saldo de uma vez
+        if cliente is not None:
+            SaldoCliente.ajustar(cliente.pk, valor_total, parcelas)
+    return contas
+
+
+def recalcular_saldos():
+    """Reconstrói SaldoCliente com uma consulta agrupada; devolve quantos clientes têm saldo"""
+    em_aberto = Case(
+        When(Q(status__in=['recebido', 'cancelado']) | Q(valor_recebido__gte=F('valor')), then=Value(Decimal('0'))),
+        default=F('valor') - F('valor_recebido'),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    rows = (
+        ContaReceber.objects
+        .filter(cliente__isnull=False)
+        .annotate(aberto=em_aberto)
+        .filter(aberto__gt=0)
+        .order_by()
+        .values('cliente_id')
+        .annotate(total=Sum('aberto'), contas=Count('id'))
+    )
+    saldos = [
+        SaldoCliente(cliente_id=row['cliente_id'], total_aberto=row['total'], contas_abertas=row['contas'])
+        for row in rows
+    ]
+    with transaction.atomic():
+        SaldoCliente.objects.all().delete()
+        SaldoCliente.objects.bulk_create(saldos, batch_size=1000)
+    return len(saldos)
+
+
+@receiver(post_delete, sender=ContaReceber)
+def conta_excluida(sender, instance, **kwargs):
+    if not instance.cliente_id:
+        return
+    aberto = ContaReceber.valor_em_aberto(instance.valor, instance.valor_recebido, instance.status)
+    if aberto:
+        # Só atualiza: sem linha de saldo não há o que descontar, e o cliente
+        # pode ter sido excluído na mesma operação
+        SaldoCliente.objects.filter(cliente_id=instance.cliente_id).update(
+            total_aberto=F('total_aberto') - aberto,
+            contas_abertas=F('contas_abertas') - 1,
+            atualizado_em=timezone.now(),
+        )
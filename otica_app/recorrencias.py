@@ -0,0 +1,94 @@
+"""
+Geração das contas a pagar mensais a partir de ContaPagarRecorrente.
+
+Cada ocorrência é identificada por (recorrencia, competencia), com restrição
+única no banco. As ocorrências já existentes são descartadas antes do
+bulk_create; se uma execução simultânea inserir alguma no meio tempo, a
+inserção é refeita conta a conta, pulando as duplicadas. O comando pode rodar
+diariamente sem duplicar contas, e o total devolvido é o de contas inseridas.
+"""
+import calendar
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ContaPagar, ContaPagarRecorrente
+from .utils import somar_meses
+
+
+def vencimento(competencia, dia):
+    """Dia de vencimento no mês da competência, limitado ao último dia do mês"""
+    ultimo = calendar.monthrange(competencia.year, competencia.month)[1]
+    return competencia.replace(day=min(dia, ultimo))
+
+
+def materializar_recorrencias(meses=3, a_partir=None, store_ids=None):
+    """
+    Cria as contas das recorrências ativas para `meses` meses a partir do mês
+    de `a_partir` (padrão: mês atual no fuso TIME_ZONE, não no do servidor).
+    Devolve quantas contas foram criadas.
+    """
+    primeiro = (a_partir or timezone.localdate()).replace(day=1)
+    competencias = [somar_meses(primeiro, n) for n in range(meses)]
+    if not competencias:
+        return 0
+    ultimo = competencias[-1]
+
+    recorrencias = ContaPagarRecorrente.objects.filter(ativo=True, data_inicio__lte=vencimento(ultimo, 31)).filter(
+        Q(data_fim__isnull=True) | Q(data_fim__gte=primeiro)
+    )
+    if store_ids:
+        recorrencias = recorrencias.filter(store_id__in=store_ids)
+    recorrencias = list(recorrencias)
+
+    existentes = set(
+        ContaPagar.objects
+        .filter(recorrencia__in=recorrencias, competencia__gte=primeiro, competencia__lte=ultimo)
+        .values_list('recorrencia_id', 'competencia')
+    )
+
+    novas = []
+    for recorrencia in recorrencias:
+        for competencia in competencias:
+            if (recorrencia.id, competencia) in existentes:
+                continue
+            data_vencimento = vencimento(competencia, recorrencia.dia_vencimento)
+            if data_vencimento < recorrencia.data_inicio:
+                continue
+            if recorrencia.data_fim and data_vencimento > recorrencia.data_fim:
+                continue
+            novas.append(ContaPagar(
+                descricao=f'{recorrencia.descricao} - {competencia:%m/%Y}',
+                tipo=recorrencia.tipo,
+                fornecedor_id=recorrencia.fornecedor_id,
+                valor=recorrencia.valor,
+                data_vencimento=data_vencimento,
+                store_id=recorrencia.store_id,
+                recorrencia=recorrencia,
+                competencia=competencia,
+                observacoes=recorrencia.observacoes,
+            ))
+
+    return _inserir(novas)
+
+
+def _inserir(contas):
+    """Insere as contas e devolve quantas entraram de fato"""
+    try:
+        with transaction.atomic():
+            ContaPagar.objects.bulk_create(contas, batch_size=1000)
+        return len(contas)
+    except IntegrityError:
+        pass
+    inseridas = 0
+    for conta in contas:
+        # Lotes do bulk_create desfeito podem ter deixado o id preenchido
+        conta.pk = None
+        try:
+            with transaction.atomic():
+                conta.save(force_insert=True)
+        except IntegrityError:
+            continue
+        inseridas += 1
+    return inseridas
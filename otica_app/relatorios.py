@@ -0,0 +1,215 @@
+"""
+Geração de RelatorioFinanceiro a partir dos dados de origem.
+
+Para um intervalo de datas, as lojas e um tipo de período (diário, semanal,
+mensal, trimestral ou anual), faz uma consulta agrupada por fonte (vendas,
+contas a receber, contas a pagar e folha) cobrindo o intervalo inteiro e
+distribui os valores diários entre os períodos em memória. Os relatórios são
+gravados com bulk_create/bulk_update, preservando as observações dos que já
+existiam para a mesma loja, tipo e datas.
+
+Classificação das fontes:
+    receita_vendas        Sale.total_amount pela data da venda
+    receita_servicos      RecebimentoConta de contas 'servico', pela data de cada recebimento
+    receita_outras        RecebimentoConta de contas 'comissao'/'outro' ('venda' já está em Sale)
+    despesa_fornecedores  ContaPagar 'fornecedor' pagas (valor_pago)
+    despesa_funcionarios  FolhaPagamento.salario_liquido pela competência + ContaPagar 'funcionario' pagas
+    despesa_impostos      ContaPagar 'imposto' pagas
+    despesa_servicos      ContaPagar 'servico', 'manutencao' e 'marketing' pagas
+    despesa_outras        demais ContaPagar pagas (aluguel, contas de consumo, outro)
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .arquivo import fontes
+from .models import ContaPagar, FolhaPagamento, RecebimentoConta, RelatorioFinanceiro, Sale, Store
+from .replica import usar_replica
+from .tasks import tarefa
+from .utils import somar_meses
+
+RECEITA_POR_TIPO = {
+    'servico': 'receita_servicos',
+    'comissao': 'receita_outras',
+    'outro': 'receita_outras',
+}
+DESPESA_POR_TIPO = {
+    'fornecedor': 'despesa_fornecedores',
+    'funcionario': 'despesa_funcionarios',
+    'imposto': 'despesa_impostos',
+    'servico': 'despesa_servicos',
+    'manutencao': 'despesa_servicos',
+    'marketing': 'despesa_servicos',
+}
+CAMPOS_VALORES = [
+    'receita_vendas', 'receita_servicos', 'receita_outras',
+    'despesa_fornecedores', 'despesa_funcionarios', 'despesa_impostos', 'despesa_servicos', 'despesa_outras',
+]
+CAMPOS_CALCULADOS = ['receita_total', 'despesa_total', 'lucro_bruto', 'margem_lucro']
+
+# Tipos de período longos demais para rodar dentro da requisição
+TIPOS_EM_SEGUNDO_PLANO = ('trimestral', 'anual')
+
+
+def _inicio_periodo(tipo, dia):
+    if tipo == 'diario':
+        return dia
+    if tipo == 'semanal':
+        return dia - timedelta(days=dia.weekday())
+    if tipo == 'mensal':
+        return dia.replace(day=1)
+    if tipo == 'trimestral':
+        return date(dia.year, 3 * ((dia.month - 1) // 3) + 1, 1)
+    if tipo == 'anual':
+        return date(dia.year, 1, 1)
+    raise ValueError(f'Tipo de período inválido: {tipo}')
+
+
+def _proximo_periodo(tipo, inicio):
+    if tipo == 'diario':
+        return inicio + timedelta(days=1)
+    if tipo == 'semanal':
+        return inicio + timedelta(days=7)
+    meses = {'mensal': 1, 'trimestral': 3, 'anual': 12}[tipo]
+    return somar_meses(inicio, meses)
+
+
+def periodos(tipo, data_inicio, data_fim):
+    """Períodos de calendário (início, fim inclusive) que cobrem [data_inicio, data_fim]"""
+    resultado = []
+    inicio = _inicio_periodo(tipo, data_inicio)
+    while inicio <= data_fim:
+        proximo = _proximo_periodo(tipo, inicio)
+        resultado.append((inicio, proximo - timedelta(days=1)))
+        inicio = proximo
+    return resultado
+
+
+def _valores_por_dia(store_ids, inicio, fim):
+    """{(store_id, dia): {campo: valor}} com uma consulta agrupada por fonte"""
+    valores = defaultdict(lambda: defaultdict(Decimal))
+
+    # Períodos antigos somam as vendas do arquivo
+    for manager in fontes(Sale, inicio):
+        vendas = (
+            manager
+            .filter(store_id__in=store_ids, sale_date__date__gte=inicio, sale_date__date__lte=fim)
+            .annotate(dia=TruncDate('sale_date'))
+            .order_by()
+            .values('store_id', 'dia')
+            .annotate(total=Sum('total_amount'))
+        )
+        for row in vendas:
+            valores[row['store_id'], row['dia']]['receita_vendas'] += row['total'] or 0
+
+    # Cada recebimento (parcial ou não) entra na própria data, com a conta ainda aberta
+    recebidas = (
+        RecebimentoConta.objects
+        .filter(conta__store_id__in=store_ids, conta__tipo__in=RECEITA_POR_TIPO,
+                data_recebimento__gte=inicio, data_recebimento__lte=fim)
+        .order_by()
+        .values('conta__store_id', 'conta__tipo', 'data_recebimento')
+        .annotate(total=Sum('valor'))
+    )
+    for row in recebidas:
+        valores[row['conta__store_id'], row['data_recebimento']][RECEITA_POR_TIPO[row['conta__tipo']]] += row['total'] or 0
+
+    pagas = (
+        ContaPagar.objects
+        .filter(store_id__in=store_ids, status='pago', data_pagamento__gte=inicio, data_pagamento__lte=fim)
+        .order_by()
+        .values('store_id', 'tipo', 'data_pagamento')
+        .annotate(total=Sum('valor_pago'))
+    )
+    for row in pagas:
+        campo = DESPESA_POR_TIPO.get(row['tipo'], 'despesa_outras')
+        valores[row['store_id'], row['data_pagamento']][campo] += row['total'] or 0
+
+    # Folha entra no primeiro dia do mês de competência
+    folhas = (
+        FolhaPagamento.objects
+        .filter(funcionario__store_id__in=store_ids, ano__gte=inicio.year, ano__lte=fim.year)
+        .order_by()
+        .values('funcionario__store_id', 'ano', 'mes')
+        .annotate(total=Sum('salario_liquido'))
+    )
+    for row in folhas:
+        dia = date(row['ano'], row['mes'], 1)
+        if inicio <= dia <= fim:
+            valores[row['funcionario__store_id'], dia]['despesa_funcionarios'] += row['total'] or 0
+
+    return valores
+
+
+def gerar_relatorios(tipo, data_inicio, data_fim, store_ids=None):
+    """
+    Calcula e grava os relatórios do tipo informado para cada período que
+    cobre [data_inicio, data_fim]. Devolve (criados, atualizados).
+    """
+    if store_ids is None:
+        store_ids = list(Store.objects.values_list('id', flat=True))
+    lista_periodos = periodos(tipo, data_inicio, data_fim)
+    if not store_ids or not lista_periodos:
+        return [], []
+
+    inicio, fim = lista_periodos[0][0], lista_periodos[-1][1]
+    inicios = [periodo[0] for periodo in lista_periodos]
+
+    # As agregações sobre as fontes são a parte pesada e podem ler da réplica;
+    # os relatórios existentes, que serão regravados, vêm do primário
+    with usar_replica():
+        valores = _valores_por_dia(store_ids, inicio, fim)
+    totais = defaultdict(lambda: defaultdict(Decimal))
+    for (store_id, dia), campos in valores.items():
+        periodo = lista_periodos[bisect_right(inicios, dia) - 1]
+        for campo, valor in campos.items():
+            totais[store_id, periodo][campo] += valor
+
+    existentes = {
+        (relatorio.store_id, (relatorio.data_inicio, relatorio.data_fim)): relatorio
+        for relatorio in RelatorioFinanceiro.objects.filter(
+            store_id__in=store_ids, tipo=tipo, data_inicio__gte=inicio, data_fim__lte=fim
+        )
+    }
+
+    agora = timezone.now()
+    novos, alterados = [], []
+    for store_id in store_ids:
+        for periodo in lista_periodos:
+            relatorio = existentes.get((store_id, periodo))
+            if relatorio is None:
+                relatorio = RelatorioFinanceiro(store_id=store_id, tipo=tipo, data_inicio=periodo[0], data_fim=periodo[1])
+                novos.append(relatorio)
+            else:
+                # bulk_update não aplica auto_now
+                relatorio.atualizado_em = agora
+                alterados.append(relatorio)
+            calculados = totais.get((store_id, periodo), {})
+            for campo in CAMPOS_VALORES:
+                setattr(relatorio, campo, calculados.get(campo, Decimal('0')))
+            relatorio.calcular_totais()
+
+    with transaction.atomic():
+        RelatorioFinanceiro.objects.bulk_create(novos, batch_size=500)
+        RelatorioFinanceiro.objects.bulk_update(
+            alterados, CAMPOS_VALORES + CAMPOS_CALCULADOS + ['atualizado_em'], batch_size=500
+        )
+    return novos, alterados
+
+
+@tarefa('gerar_relatorios_financeiros')
+def gerar_relatorios_tarefa(tipo, data_inicio, data_fim, store_ids=None):
+    novos, alterados = gerar_relatorios(
+        tipo, date.fromisoformat(data_inicio), date.fromisoformat(data_fim), store_ids
+    )
+    return {
+        'criados': len(novos),
+        'atualizados': len(alterados),
+        'ids': [relatorio.pk for relatorio in novos + alterados],
+    }
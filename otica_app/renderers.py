@@ -0,0 +1,42 @@
+"""
+Renderer JSON de alta vazão para o DRF.
+
+Usa orjson quando instalado (dependência opcional) e mantém o formato do
+JSONRenderer padrão: Decimal vira número, datetimes em ISO 8601 com 'Z' para
+UTC e \\u2028/\\u2029 escapados. Sem orjson, ou quando o cliente pede JSON
+indentado, delega ao JSONRenderer do DRF.
+"""
+import decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+
+_fallback_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    # Caminho rápido para os tipos mais comuns fora das strings já serializadas
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    return _fallback_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        if b'\xe2\x80' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
@@ -0,0 +1,121 @@
+"""
+Leitura de relatórios e dashboards numa réplica do banco.
+
+As views de relatório marcadas com @usar_replica() (e as consultas de
+em_paralelo disparadas por elas, que herdam o contexto) leem do alias
+REPLICA_DATABASE_ALIAS; todo o resto, e toda escrita, continua no default.
+Sem o alias em DATABASES o roteador não faz nada.
+
+Leia-o-que-escreveu: depois de uma requisição de escrita bem-sucedida
+(POST, PUT, PATCH, DELETE), o usuário fica REPLICA_STICKY_SECONDS segundos
+lendo do primário, cobrindo o atraso de replicação. A marca fica no cache
+padrão, que em produção é o DatabaseCache compartilhado pelos workers; com
+um cache local por processo a marca só valeria no processo da escrita.
+Dentro de uma transação no default as leituras também ficam no primário.
+"""
+import contextlib
+import contextvars
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_ler_replica = contextvars.ContextVar('ler_replica', default=False)
+_requisicao = contextvars.ContextVar('requisicao_replica', default=None)
+
+
+def alias_replica():
+    """Alias da réplica, ou None quando não há réplica configurada"""
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+    if alias and alias != DEFAULT_DB_ALIAS and alias in settings.DATABASES:
+        return alias
+    return None
+
+
+def _chave(usuario_id):
+    return f'replica:escrita:{usuario_id}'
+
+
+def _usuario_id(request):
+    # Nas views do DRF o usuário autenticado pelo JWT é copiado para o HttpRequest
+    usuario = getattr(request, 'user', None)
+    if usuario is not None and usuario.is_authenticated:
+        return usuario.pk
+    return None
+
+
+def registrar_escrita(request):
+    usuario_id = _usuario_id(request)
+    if usuario_id is not None:
+        cache.set(_chave(usuario_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def _fixado_no_primario():
+    request = _requisicao.get()
+    if request is None:
+        return False
+    # Avaliado na primeira leitura roteada, quando a autenticação já rodou
+    if not hasattr(request, '_replica_primario'):
+        usuario_id = _usuario_id(request)
+        request._replica_primario = usuario_id is not None and bool(cache.get(_chave(usuario_id)))
+    return request._replica_primario
+
+
+@contextlib.contextmanager
+def usar_replica():
+    """
+    Leituras do bloco vão para a réplica, quando possível. Também serve de
+    decorador para os métodos das views de relatório: @usar_replica()
+    """
+    token = _ler_replica.set(True)
+    try:
+        yield
+    finally:
+        _ler_replica.reset(token)
+
+
+class RoteadorReplica:
+    def db_for_read(self, model, **hints):
+        alias = alias_replica()
+        if (
+            alias
+            # O DatabaseCache guarda a própria marca de escrita: sempre no primário
+            and model._meta.app_label != 'django_cache'
+            and _ler_replica.get()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+            and not _fixado_no_primario()
+        ):
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explícito: sem isso o Django gravaria objetos lidos da réplica de volta nela
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, alias_replica()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o esquema pela replicação (ou por cópia do arquivo, no SQLite)
+        if db == alias_replica():
+            return False
+        return None
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """Expõe a requisição ao roteador e marca o usuário após escritas"""
+
+    def process_request(self, request):
+        _requisicao.set(request)
+
+    def process_response(self, request, response):
+        if request.method not in METODOS_SEGUROS and response.status_code < 400:
+            registrar_escrita(request)
+        _requisicao.set(None)
+        return response
@@ -0,0 +1,212 @@
+"""
+Busca de produtos (nome, marca, modelo e código) e de clientes (CPF, telefone e nome).
+
+No PostgreSQL usa os índices GIN com pg_trgm criados na migração 0018 e
+ordena por similaridade de trigramas. Nos demais bancos (SQLite em
+desenvolvimento) usa um índice em memória reconstruído quando o catálogo muda.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import Case, Count, IntegerField, Max, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import Product
+from .utils import normalizar_texto, somente_digitos
+
+# Ocorrências avaliadas por busca no índice em memória; todas as que casam são
+# ordenadas por relevância e conferidas no banco em lotes de MAX_CANDIDATOS
+MAX_AVALIADOS = 5000
+MAX_CANDIDATOS = 300
+# Intervalo (segundos) entre verificações de mudança no catálogo
+INTERVALO_VERIFICACAO = 5
+
+
+@dataclass(frozen=True)
+class _Catalogo:
+    """Retrato imutável do catálogo; as posições são comuns a todas as listas"""
+    versao: tuple = None
+    ids: tuple = ()
+    nomes: tuple = ()
+    textos: tuple = ()
+    codigos: tuple = ()
+    inicios: tuple = ()
+    corpus: str = ''
+
+
+class ProductSearchIndex:
+    """
+    Índice em memória do catálogo: códigos ordenados + texto concatenado.
+
+    A reconstrução monta um _Catalogo novo e o troca numa única atribuição;
+    cada busca lê self._catalogo uma vez e nunca vê listas de versões diferentes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._verificado_em = 0
+        self._catalogo = _Catalogo()
+
+    def _versao_atual(self):
+        info = Product.objects.aggregate(total=Count('id'), ultima=Max('updated_at'))
+        return info['total'], info['ultima']
+
+    def _reconstruir(self, versao):
+        ids, nomes, textos, codigos, inicios = [], [], [], [], []
+        posicao = 0
+        rows = Product.objects.order_by('id').values_list('id', 'name', 'brand', 'model', 'code')
+        for product_id, name, brand, model, code in rows:
+            texto = normalizar_texto(' '.join(filter(None, (name, brand, model, code))))
+            ids.append(product_id)
+            nomes.append(normalizar_texto(name))
+            textos.append(texto)
+            inicios.append(posicao)
+            posicao += len(texto) + 1
+            if code:
+                codigos.append((code.lower(), len(ids) - 1))
+        codigos.sort()
+
+        self._catalogo = _Catalogo(
+            versao=versao, ids=tuple(ids), nomes=tuple(nomes), textos=tuple(textos),
+            codigos=tuple(codigos), inicios=tuple(inicios), corpus='\n'.join(textos),
+        )
+
+    def atualizar(self, forcar=False):
+        agora = time.monotonic()
+        if not forcar and agora - self._verificado_em < INTERVALO_VERIFICACAO:
+            return
+        self._verificado_em = agora
+        versao = self._versao_atual()
+        if versao != self._catalogo.versao:
+            with self._lock:
+                if versao != self._catalogo.versao:
+                    self._reconstruir(versao)
+
+    @staticmethod
+    def _por_codigo(catalogo, termo):
+        chave = termo.lower()
+        inicio = bisect_left(catalogo.codigos, (chave,))
+        fim = bisect_right(catalogo.codigos, (chave + '\uffff',))
+        return [posicao for _, posicao in catalogo.codigos[inicio:fim]]
+
+    @staticmethod
+    def _por_texto(catalogo, tokens):
+        corpus, inicios, textos = catalogo.corpus, catalogo.inicios, catalogo.textos
+        # Percorre as ocorrências do termo mais raro e confere os demais na entrada
+        chave = min(tokens, key=corpus.count)
+        encontrados = []
+        avaliados = 0
+        offset = corpus.find(chave)
+        while offset != -1 and avaliados < MAX_AVALIADOS:
+            posicao = bisect_right(inicios, offset) - 1
+            avaliados += 1
+            if all(t in textos[posicao] for t in tokens):
+                encontrados.append(posicao)
+            offset = corpus.find(chave, inicios[posicao] + len(textos[posicao]) + 1)
+        return encontrados
+
+    def buscar(self, termo):
+        """
+        Ids dos produtos que casam com `termo`, do mais relevante ao menos:
+        código com prefixo exato primeiro, depois o texto ordenado por relevância
+        """
+        self.atualizar()
+        catalogo = self._catalogo
+        consulta = normalizar_texto(termo)
+        tokens = consulta.split()
+        if not tokens:
+            return []
+
+        resultado = [catalogo.ids[posicao] for posicao in self._por_codigo(catalogo, termo.strip())]
+
+        def relevancia(posicao):
+            nome = catalogo.nomes[posicao]
+            if nome.startswith(consulta):
+                peso = 0
+            elif any(palavra.startswith(tokens[0]) for palavra in catalogo.textos[posicao].split()):
+                peso = 1
+            else:
+                peso = 2
+            return peso, nome
+
+        # Ordena todos os que casam antes de cortar: o melhor pode ter id alto
+        candidatos = sorted(self._por_texto(catalogo, tokens), key=relevancia)
+        ja_incluidos = set(resultado)
+        resultado.extend(catalogo.ids[posicao] for posicao in candidatos if catalogo.ids[posicao] not in ja_incluidos)
+        return resultado
+
+
+product_index = ProductSearchIndex()
+
+
+def _buscar_postgres(queryset, termo, limite):
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    filtro = Q()
+    for token in termo.split():
+        filtro &= (
+            Q(name__icontains=token) | Q(brand__icontains=token) |
+            Q(model__icontains=token) | Q(code__istartswith=token)
+        )
+    return list(
+        queryset.filter(Q(code__istartswith=termo) | filtro)
+        .annotate(
+            code_match=Case(When(code__istartswith=termo, then=Value(1)), default=Value(0), output_field=IntegerField()),
+            rank=Greatest(
+                TrigramSimilarity('name', termo),
+                TrigramSimilarity('brand', termo),
+                TrigramSimilarity('model', termo),
+            ),
+        )
+        .order_by('-code_match', '-rank', 'name')[:limite]
+    )
+
+
+def search_products(queryset, termo, limite=20):
+    """
+    Produtos de `queryset` que casam com `termo`, ordenados por relevância.
+
+    O escopo (loja do gerente) vem no próprio queryset, como filtro no banco:
+    o custo não depende do tamanho do catálogo da loja.
+    """
+    termo = (termo or '').strip()
+    if not termo:
+        return []
+
+    if connection.vendor == 'postgresql':
+        return _buscar_postgres(queryset, termo, limite)
+
+    ids = product_index.buscar(termo)
+    resultado = []
+    for inicio in range(0, len(ids), MAX_CANDIDATOS):
+        lote = ids[inicio:inicio + MAX_CANDIDATOS]
+        produtos = queryset.in_bulk(lote)
+        resultado.extend(produtos[product_id] for product_id in lote if product_id in produtos)
+        if len(resultado) >= limite:
+            break
+    return resultado[:limite]
+
+
+def search_clientes(queryset, termo):
+    """
+    Filtra clientes pelas chaves normalizadas em uma única consulta indexada.
+
+    Termos só com dígitos (e pontuação) buscam prefixo de CPF ou telefone;
+    os demais buscam o nome sem acentos, priorizando quem começa com o termo.
+    """
+    termo = (termo or '').strip()
+    digitos = somente_digitos(termo)
+    if digitos and not any(c.isalpha() for c in termo):
+        return queryset.filter(Q(cpf_busca__startswith=digitos) | Q(telefone_busca__startswith=digitos)).order_by('nome_busca')
+
+    nome = normalizar_texto(termo)
+    if not nome:
+        return queryset.none()
+    return (
+        queryset.filter(nome_busca__contains=nome)
+        .annotate(prefixo=Case(When(nome_busca__startswith=nome, then=Value(0)), default=Value(1), output_field=IntegerField()))
+        .order_by('prefixo', 'nome_busca')
+    )
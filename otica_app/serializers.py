@@ -1,9 +1,45 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth.hashers import make_password
-from .models import User, Store, Product, Seller, Sale, SaleItem, StockMovement, CashFlow, StoreProduct, CashTillSession, Order, Category, Cliente, Fornecedor, Funcionario, ContaPagar, ContaReceber, FolhaPagamento, RelatorioFinanceiro
+from .models import User, Store, Product, Seller, Sale, SaleItem, StockMovement, CashFlow, StoreProduct, CashTillSession, Order, Category, Cliente, Fornecedor, Funcionario, ContaPagar, ContaPagarRecorrente, ContaReceber, RecebimentoConta, SaldoCliente, FolhaPagamento, RelatorioFinanceiro, SellerDailyStats, Tarefa
+from . import eventos
 from django.db.models import Sum
+from django.utils import timezone
+from decimal import Decimal
+
+
+def data_referencia(serializer):
+    """
+    Data de hoje calculada uma vez por serialização e guardada no contexto do
+    serializer raiz, compartilhado por todas as linhas de uma listagem.
+    """
+    context = serializer.context
+    if 'hoje' not in context:
+        context['hoje'] = timezone.localdate()
+    return context['hoje']
+
+
+def requested_fields(request):
+    """Conjunto de campos pedidos em ?fields=a,b,c (None quando não informado)"""
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()}
+
+
+class SparseFieldsetMixin:
+    """Permite ?fields=id,nome nas leituras para devolver só as colunas pedidas"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -51,6 +87,9 @@ class StoreSerializer(serializers.ModelSerializer):
 
 
 class CategorySerializer(serializers.ModelSerializer):
+    # Unicidade só entre as categorias não excluídas (restrição parcial no banco)
+    name = serializers.CharField(label='Nome', max_length=100, validators=[UniqueValidator(queryset=Category.objects.all())])
+
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'active', 'created_at', 'updated_at']
@@ -60,12 +99,27 @@ class ProductSerializer(serializers.ModelSerializer):
     store_quantity = serializers.SerializerMethodField()
     category_name = serializers.CharField(source='category.name', read_only=True)
     image = serializers.ImageField(required=False, allow_null=True)
+    image_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
-        fields = ['id', 'name', 'brand', 'model', 'code', 'description', 'price', 'cost', 'category', 'category_name', 'store_quantity', 'image']
+        fields = ['id', 'name', 'brand', 'model', 'code', 'description', 'price', 'cost', 'category', 'category_name', 'store_quantity', 'reorder_level', 'image', 'image_variants']
         read_only_fields = ['code']
     
+    def get_image_variants(self, obj):
+        """URLs das versões reduzidas por largura e formato: {"480": {"webp": ..., "jpeg": ...}}"""
+        if not obj.image or not obj.image_variants:
+            return {}
+        request = self.context.get('request')
+        storage = obj.image.storage
+        variants = {}
+        for width, formats in obj.image_variants.items():
+            variants[width] = {}
+            for key, name in formats.items():
+                url = storage.url(name)
+                variants[width][key] = request.build_absolute_uri(url) if request else url
+        return variants
+    
     def get_store_quantity(self, obj):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
@@ -87,6 +141,16 @@ class ProductSerializer(serializers.ModelSerializer):
         return 0
 
 
+class ProductSyncSerializer(ProductSerializer):
+    """
+    Produto para /api/sync/products/: só campos que mudam junto com updated_at.
+    A quantidade vem do recurso stock e o nome da categoria da lista de categorias.
+    """
+
+    class Meta(ProductSerializer.Meta):
+        fields = ['id', 'name', 'brand', 'model', 'code', 'description', 'price', 'cost', 'category', 'reorder_level', 'image', 'image_variants']
+
+
 class StoreProductSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_brand = serializers.CharField(source='product.brand', read_only=True)
@@ -98,15 +162,17 @@ class StoreProductSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = StoreProduct
-        fields = ['id', 'store', 'product', 'quantity', 'product_name', 'product_brand', 'product_model', 'product_code', 'product_price', 'product_category', 'store_name']
+        fields = ['id', 'store', 'product', 'quantity', 'reorder_level', 'stock_status', 'product_name', 'product_brand', 'product_model', 'product_code', 'product_price', 'product_category', 'store_name']
+        read_only_fields = ['stock_status']
 
 
 class SellerSerializer(serializers.ModelSerializer):
     store_name = serializers.CharField(source='store.name', read_only=True)
+    funcionario_nome = serializers.CharField(source='funcionario.nome', read_only=True, default=None)
     
     class Meta:
         model = Seller
-        fields = ['id', 'name', 'email', 'phone', 'store', 'store_name', 'created_at']
+        fields = ['id', 'name', 'email', 'phone', 'store', 'store_name', 'funcionario', 'funcionario_nome', 'created_at', 'updated_at']
 
 
 class SaleItemSerializer(serializers.ModelSerializer):
@@ -119,7 +185,7 @@ class SaleItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['unit_price', 'total_price']
 
 
-class ClienteSerializer(serializers.ModelSerializer):
+class ClienteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = [
@@ -130,6 +196,15 @@ class ClienteSerializer(serializers.ModelSerializer):
         ]
 
 
+class ClienteListSerializer(serializers.ModelSerializer):
+    """Versão enxuta para listas e seleção de cliente"""
+    queryset_only = ['id', 'nome', 'cpf', 'telefone', 'email']
+
+    class Meta:
+        model = Cliente
+        fields = ['id', 'nome', 'cpf', 'telefone', 'email']
+
+
 class SaleSerializer(serializers.ModelSerializer):
     items = SaleItemSerializer(many=True, read_only=True)
     store_name = serializers.CharField(source='store.name', read_only=True)
@@ -189,7 +264,7 @@ class SaleCreateSerializer(serializers.ModelSerializer):
             total_price = unit_price * quantity
             
             try:
-                store_product = StoreProduct.objects.get(product=product, store=session.store)
+                store_product = StoreProduct.objects.select_related('product').get(product=product, store=session.store)
                 if store_product.quantity < quantity:
                     raise serializers.ValidationError(f"Produto {product.name} não tem estoque suficiente na loja {session.store.name}.")
                 
@@ -210,6 +285,7 @@ class SaleCreateSerializer(serializers.ModelSerializer):
             total_amount += total_price
             
             StockMovement.objects.create(
+                store=session.store,
                 product=product,
                 quantity=quantity,
                 movement_type='saida',
@@ -218,6 +294,7 @@ class SaleCreateSerializer(serializers.ModelSerializer):
         
         sale.total_amount = total_amount
         sale.save()
+        SellerDailyStats.registrar(sale, items_count=sum(item['quantity'] for item in items_data))
         
         if sale.payment_method in ['dinheiro', 'pix', 'cartao_debito', 'cartao_credito']:
             CashFlow.objects.create(
@@ -227,28 +304,38 @@ class SaleCreateSerializer(serializers.ModelSerializer):
                 description=f'Venda #{sale.id} ({sale.get_payment_method_display()})',
                 cash_till_session=session
             )
-        
+
+        eventos.publicar(sale.store_id, 'sale_created', {
+            'id': sale.id,
+            'seller': sale.seller_id,
+            'total_amount': sale.total_amount,
+            'payment_method': sale.payment_method,
+            'items_count': sum(item['quantity'] for item in items_data),
+        })
         return sale
 
 
 class StockMovementSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
-    store_name = serializers.CharField(source='product.store.name', read_only=True)
+    store_name = serializers.CharField(source='store.name', read_only=True)
     
     class Meta:
         model = StockMovement
         fields = '__all__'
     
+    def validate(self, attrs):
+        if not attrs.get('store'):
+            raise serializers.ValidationError({'store': 'Informe a loja da movimentação.'})
+        return attrs
+    
     def create(self, validated_data):
         movement = StockMovement.objects.create(**validated_data)
         
-        # Update product quantity
-        product = movement.product
-        if movement.movement_type == 'entrada':
-            product.quantity += movement.quantity
-        else:
-            product.quantity -= movement.quantity
-        product.save()
+        # Atualiza o estoque da loja
+        delta = movement.quantity if movement.movement_type == 'entrada' else -movement.quantity
+        store_product, _ = StoreProduct.objects.get_or_create(store=movement.store, product=movement.product)
+        store_product.quantity += delta
+        store_product.save()
         
         return movement
 
@@ -306,7 +393,7 @@ class CashTillSessionSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     store_name = serializers.CharField(source='store.name', read_only=True)
     seller_name = serializers.CharField(source='seller.name', read_only=True, allow_null=True)
     
@@ -323,6 +410,28 @@ class OrderSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class OrderListSerializer(serializers.ModelSerializer):
+    """Versão enxuta para o quadro/lista de pedidos, sem as medidas da receita"""
+    store_name = serializers.CharField(source='store.name', read_only=True)
+    seller_name = serializers.CharField(source='seller.name', read_only=True, allow_null=True)
+    queryset_only = ['id', 'customer_name', 'customer_phone', 'cliente', 'status', 'total_price', 'created_at', 'store', 'store__name', 'seller', 'seller__name']
+
+    class Meta:
+        model = Order
+        fields = ['id', 'customer_name', 'customer_phone', 'cliente', 'status', 'total_price', 'created_at', 'store', 'store_name', 'seller', 'seller_name']
+
+
+class HistoricoCompraSerializer(serializers.ModelSerializer):
+    """Venda vista a partir do cliente (sem repetir os dados do cliente)"""
+    items = SaleItemSerializer(many=True, read_only=True)
+    store_name = serializers.CharField(source='store.name', read_only=True)
+    seller_name = serializers.CharField(source='seller.name', read_only=True)
+    
+    class Meta:
+        model = Sale
+        fields = ['id', 'store', 'store_name', 'seller', 'seller_name', 'total_amount', 'payment_method', 'sale_date', 'items']
+
+
 # Serializers para Gestão Financeira
 class FornecedorSerializer(serializers.ModelSerializer):
     class Meta:
@@ -330,15 +439,27 @@ class FornecedorSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class FuncionarioSerializer(serializers.ModelSerializer):
+class FuncionarioSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     store_name = serializers.CharField(source='store.name', read_only=True)
     cargo_display = serializers.CharField(source='get_cargo_display', read_only=True)
+    # Unicidade só entre os funcionários não excluídos (restrição parcial no banco)
+    cpf = serializers.CharField(label='CPF', max_length=14, validators=[UniqueValidator(queryset=Funcionario.objects.all())])
     
     class Meta:
         model = Funcionario
         fields = '__all__'
 
 
+class FuncionarioListSerializer(serializers.ModelSerializer):
+    """Versão enxuta para listas e seletores de funcionário"""
+    cargo_display = serializers.CharField(source='get_cargo_display', read_only=True)
+    queryset_only = ['id', 'nome', 'cargo', 'store', 'ativo']
+
+    class Meta:
+        model = Funcionario
+        fields = ['id', 'nome', 'cargo', 'cargo_display', 'store', 'ativo']
+
+
 class ContaPagarSerializer(serializers.ModelSerializer):
     fornecedor_nome = serializers.CharField(source='fornecedor.nome', read_only=True)
     funcionario_nome = serializers.CharField(source='funcionario.nome', read_only=True)
@@ -346,11 +467,33 @@ class ContaPagarSerializer(serializers.ModelSerializer):
     tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     valor_restante = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    dias_vencimento = serializers.IntegerField(read_only=True)
+    dias_vencimento = serializers.SerializerMethodField()
     
     class Meta:
         model = ContaPagar
         fields = '__all__'
+        # Preenchidos só pela geração das recorrências; (recorrencia, competencia) é único
+        read_only_fields = ['recorrencia', 'competencia']
+    
+    def get_dias_vencimento(self, obj):
+        return (obj.data_vencimento - data_referencia(self)).days
+
+
+class ContaPagarRecorrenteSerializer(serializers.ModelSerializer):
+    fornecedor_nome = serializers.CharField(source='fornecedor.nome', read_only=True)
+    store_name = serializers.CharField(source='store.name', read_only=True)
+    tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
+    
+    class Meta:
+        model = ContaPagarRecorrente
+        fields = '__all__'
+    
+    def validate(self, attrs):
+        data_inicio = attrs.get('data_inicio', getattr(self.instance, 'data_inicio', None))
+        data_fim = attrs.get('data_fim', getattr(self.instance, 'data_fim', None))
+        if data_inicio and data_fim and data_fim < data_inicio:
+            raise serializers.ValidationError({'data_fim': 'A data final deve ser igual ou posterior à inicial.'})
+        return attrs
 
 
 class ContaReceberSerializer(serializers.ModelSerializer):
@@ -359,11 +502,75 @@ class ContaReceberSerializer(serializers.ModelSerializer):
     tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     valor_restante = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    dias_vencimento = serializers.IntegerField(read_only=True)
+    dias_vencimento = serializers.SerializerMethodField()
     
     class Meta:
         model = ContaReceber
         fields = '__all__'
+    
+    def get_dias_vencimento(self, obj):
+        return (obj.data_vencimento - data_referencia(self)).days
+
+
+class RecebimentoContaSerializer(serializers.ModelSerializer):
+    criado_por_nome = serializers.CharField(source='criado_por.username', read_only=True, default=None)
+    
+    class Meta:
+        model = RecebimentoConta
+        fields = ['id', 'conta', 'valor', 'data_recebimento', 'forma_pagamento', 'observacoes', 'criado_por', 'criado_por_nome', 'criado_em']
+        read_only_fields = ['conta', 'criado_por', 'criado_em']
+
+
+class RegistrarRecebimentoSerializer(serializers.Serializer):
+    """Recebimento total ou parcial; sem valor, quita o restante da conta"""
+    valor = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False)
+    # Compatibilidade: clientes antigos enviam o total já recebido, e a conta fica encerrada
+    valor_recebido = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False, write_only=True)
+    data_recebimento = serializers.DateField(required=False)
+    forma_pagamento = serializers.ChoiceField(choices=RecebimentoConta.FORMA_CHOICES, required=False, allow_blank=True)
+    observacoes = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate(self, attrs):
+        conta = self.context['conta']
+        if conta.status in ('recebido', 'cancelado'):
+            raise serializers.ValidationError(f'Conta já está {conta.get_status_display().lower()}.')
+        total = attrs.pop('valor_recebido', None)
+        if total is not None and 'valor' not in attrs:
+            # Lança só a diferença para o já recebido; sem diferença, apenas encerra
+            attrs['valor'] = max(total - conta.valor_recebido, Decimal('0'))
+            attrs['encerrar'] = True
+        attrs.setdefault('valor', conta.valor_restante)
+        if attrs['valor'] > conta.valor_restante:
+            raise serializers.ValidationError({'valor': f'Valor maior que o restante da conta (R$ {conta.valor_restante}).'})
+        return attrs
+
+
+class GerarParcelasSerializer(serializers.Serializer):
+    """Parcelamento de um valor (normalmente uma venda) em contas mensais"""
+    descricao = serializers.CharField(max_length=180)
+    valor_total = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    parcelas = serializers.IntegerField(min_value=1, max_value=48)
+    primeiro_vencimento = serializers.DateField()
+    tipo = serializers.ChoiceField(choices=ContaReceber.TIPO_CHOICES, default='venda')
+    venda = serializers.PrimaryKeyRelatedField(queryset=Sale.objects.all(), required=False, allow_null=True)
+    cliente = serializers.PrimaryKeyRelatedField(queryset=Cliente.objects.all(), required=False, allow_null=True)
+    store = serializers.PrimaryKeyRelatedField(queryset=Store.objects.all(), required=False, allow_null=True)
+    observacoes = serializers.CharField(required=False, allow_blank=True, default='')
+    
+    def validate(self, attrs):
+        venda = attrs.get('venda')
+        if venda is not None:
+            attrs['cliente'] = attrs.get('cliente') or venda.cliente
+            attrs['store'] = attrs.get('store') or venda.store
+        return attrs
+
+
+class SaldoClienteSerializer(serializers.ModelSerializer):
+    cliente_nome = serializers.CharField(source='cliente.nome', read_only=True)
+    
+    class Meta:
+        model = SaldoCliente
+        fields = ['cliente', 'cliente_nome', 'total_aberto', 'contas_abertas', 'atualizado_em']
 
 
 class FolhaPagamentoSerializer(serializers.ModelSerializer):
@@ -385,6 +592,37 @@ class RelatorioFinanceiroSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class GerarFolhaSerializer(serializers.Serializer):
+    """Parâmetros para gerar a folha do mês"""
+    ano = serializers.IntegerField(min_value=2000, max_value=2100)
+    mes = serializers.ChoiceField(choices=FolhaPagamento.MES_CHOICES)
+    store = serializers.PrimaryKeyRelatedField(queryset=Store.objects.all(), required=False, allow_null=True)
+
+
+class GerarRelatorioSerializer(serializers.Serializer):
+    """Parâmetros para gerar relatórios financeiros a partir dos lançamentos"""
+    tipo = serializers.ChoiceField(choices=RelatorioFinanceiro.TIPO_CHOICES)
+    data_inicio = serializers.DateField()
+    data_fim = serializers.DateField()
+    store = serializers.PrimaryKeyRelatedField(queryset=Store.objects.all(), required=False, allow_null=True)
+    
+    def validate(self, attrs):
+        if attrs['data_fim'] < attrs['data_inicio']:
+            raise serializers.ValidationError({'data_fim': 'A data final deve ser igual ou posterior à inicial.'})
+        if (attrs['data_fim'] - attrs['data_inicio']).days > 366 * 5:
+            raise serializers.ValidationError({'data_fim': 'O intervalo máximo é de 5 anos.'})
+        return attrs
+
+
+class TarefaSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = Tarefa
+        fields = ['id', 'nome', 'status', 'status_display', 'tentativas', 'max_tentativas', 'resultado', 'erro', 'agendada_para', 'criado_em', 'iniciada_em', 'concluida_em']
+        read_only_fields = fields
+
+
 # Serializers para dashboards e relatórios
 class DashboardFinanceiroSerializer(serializers.Serializer):
     """Serializer para dados do dashboard financeiro"""
@@ -0,0 +1,230 @@
+"""
+Sincronização incremental para o cache local do front-end.
+
+GET /api/sync/<recurso>/?cursor=... devolve as linhas criadas ou alteradas e
+os ids excluídos desde o cursor anterior. As alterações são percorridas por
+keyset em (updated_at, id) e as exclusões em (excluido_em, id) sobre
+RegistroExclusao, gravado pelos receptores de post_delete deste módulo (que
+também marcam os pedidos excluídos, lidos pelo quadro de pedidos).
+
+Linhas alteradas nos últimos ATRASO_SEGUNDOS ficam para a próxima chamada:
+o auto_now é preenchido antes do commit, e uma transação ainda aberta poderia
+confirmar depois uma linha com horário anterior ao do cursor já entregue.
+
+As marcas de exclusão são mantidas por SYNC_TOMBSTONE_DAYS dias (comando
+limpar_exclusoes); cursores mais antigos recebem CursorExpirado e o cliente
+refaz a carga completa.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .fast_serializers import ClienteFastSerializer, StoreProductFastSerializer
+from .models import Cliente, Order, Product, RegistroExclusao, Seller, StoreProduct, exclusao_logica
+
+TAMANHO_PADRAO = 200
+TAMANHO_MAXIMO = 1000
+ATRASO_SEGUNDOS = 2
+
+
+class CursorExpirado(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Recurso:
+    model: type
+    campo: str
+    # Caminho até a loja para usuários não administradores; None = catálogo global
+    campo_loja: Optional[str]
+    # Cada linha pertence a uma loja (estoque, vendedores). Nos demais, uma exclusão
+    # com loja indica só que o objeto saiu do escopo daquela loja
+    por_loja: bool
+    # Recebe (linhas, request) e devolve a lista serializada
+    serializar: Callable
+
+
+def _serializar_produtos(produtos, request):
+    from .serializers import ProductSyncSerializer
+    return ProductSyncSerializer(produtos, many=True, context={'request': request}).data
+
+
+def _serializar_vendedores(vendedores, request):
+    from .serializers import SellerSerializer
+    return SellerSerializer(vendedores.select_related('store', 'funcionario'), many=True).data
+
+
+def _serializar_valores(serializer):
+    def serializar(queryset, request):
+        return serializer.serialize(queryset.values(*serializer.value_paths()))
+    return serializar
+
+
+RECURSOS = {
+    'products': Recurso(Product, 'updated_at', 'store_products__store', False, _serializar_produtos),
+    'stock': Recurso(StoreProduct, 'updated_at', 'store', True, _serializar_valores(StoreProductFastSerializer())),
+    'clientes': Recurso(Cliente, 'atualizado_em', None, False, _serializar_valores(ClienteFastSerializer())),
+    'sellers': Recurso(Seller, 'updated_at', 'store', True, _serializar_vendedores),
+}
+
+
+def codificar_cursor(emitido_em, alterado, excluido):
+    """Cada posição é (instante, id) ou None"""
+    dados = {
+        't': emitido_em.isoformat(),
+        'a': [alterado[0].isoformat(), alterado[1]] if alterado else None,
+        'e': [excluido[0].isoformat(), excluido[1]] if excluido else None,
+    }
+    return base64.urlsafe_b64encode(json.dumps(dados, separators=(',', ':')).encode()).decode()
+
+
+def _posicao(valor):
+    if valor is None:
+        return None
+    momento, pk = valor
+    momento = parse_datetime(momento)
+    if momento is None or not isinstance(pk, int):
+        raise ValueError('Cursor inválido')
+    return momento, pk
+
+
+def decodificar_cursor(cursor):
+    """(emissão, posição das alterações, posição das exclusões); ValueError se inválido"""
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        emitido_em = parse_datetime(dados['t'])
+        if emitido_em is None:
+            raise ValueError('Cursor inválido')
+        return emitido_em, _posicao(dados['a']), _posicao(dados['e'])
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValueError('Cursor inválido')
+
+
+def _depois_de(campo, posicao):
+    momento, pk = posicao
+    return Q(**{f'{campo}__gt': momento}) | Q(**{campo: momento, 'id__gt': pk})
+
+
+def sincronizar(nome, request, store_id=None, cursor=None, tamanho=TAMANHO_PADRAO):
+    """
+    Página de alterações do recurso para a loja `store_id` (None = todas,
+    só para administradores). Sem cursor, devolve o recurso completo.
+    """
+    recurso = RECURSOS[nome]
+    emitido_em, alterado, excluido = decodificar_cursor(cursor) if cursor else (None, None, None)
+    agora = timezone.now()
+    if emitido_em and emitido_em < inicio_retencao(agora):
+        raise CursorExpirado('Cursor anterior ao período de retenção das exclusões; refaça a carga completa.')
+    limite = agora - timedelta(seconds=ATRASO_SEGUNDOS)
+
+    escopo = recurso.model.objects.all()
+    if store_id is not None and recurso.campo_loja:
+        escopo = escopo.filter(**{recurso.campo_loja: store_id})
+    queryset = escopo.filter(**{f'{recurso.campo}__lte': limite})
+    if alterado:
+        queryset = queryset.filter(_depois_de(recurso.campo, alterado))
+    linhas = list(queryset.order_by(recurso.campo, 'id').values_list(recurso.campo, 'id')[:tamanho + 1])
+    mais_alteracoes = len(linhas) > tamanho
+    linhas = linhas[:tamanho]
+    if linhas:
+        alterado = linhas[-1]
+        # Busca os objetos completos pelos ids da página, mantendo a ordem do keyset
+        por_id = recurso.model.objects.filter(id__in=[pk for _, pk in linhas])
+        results = {row['id']: row for row in recurso.serializar(por_id, request)}
+        results = [results[pk] for _, pk in linhas if pk in results]
+    else:
+        results = []
+
+    exclusoes = RegistroExclusao.objects.filter(recurso=nome, excluido_em__lte=limite)
+    if store_id is not None:
+        exclusoes = exclusoes.filter(Q(store_id=store_id) | Q(store_id__isnull=True))
+    elif not recurso.por_loja:
+        exclusoes = exclusoes.filter(store_id__isnull=True)
+    if excluido:
+        exclusoes = exclusoes.filter(_depois_de('excluido_em', excluido))
+    elif not cursor:
+        # Carga completa: não há o que remover do cache, só posiciona o cursor no fim
+        ultima = exclusoes.order_by('-excluido_em', '-id').values_list('excluido_em', 'id').first()
+        exclusoes = exclusoes.none()
+        excluido = ultima
+    marcas = list(exclusoes.order_by('excluido_em', 'id').values_list('excluido_em', 'id', 'objeto_id')[:tamanho + 1])
+    mais_exclusoes = len(marcas) > tamanho
+    marcas = marcas[:tamanho]
+    excluidos = []
+    if marcas:
+        excluido = marcas[-1][:2]
+        # Objeto que voltou ao escopo depois da exclusão (produto reincluído no estoque
+        # da loja) chega pelas alterações; a marca antiga não deve removê-lo do cache
+        ids = {objeto_id for _, _, objeto_id in marcas}
+        existentes = set(escopo.filter(id__in=ids).values_list('id', flat=True))
+        excluidos = list(dict.fromkeys(objeto_id for _, _, objeto_id in marcas if objeto_id not in existentes))
+
+    return {
+        'results': results,
+        'deleted': excluidos,
+        'cursor': codificar_cursor(agora, alterado, excluido),
+        'has_more': mais_alteracoes or mais_exclusoes,
+    }
+
+
+def inicio_retencao(agora):
+    return agora - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+
+
+def limpar_exclusoes():
+    """Apaga marcas de exclusão fora do período de retenção; devolve quantas"""
+    apagadas, _ = RegistroExclusao.objects.filter(excluido_em__lt=inicio_retencao(timezone.now())).delete()
+    return apagadas
+
+
+def registrar_exclusao(recurso, objeto_id, store_id=None):
+    RegistroExclusao.objects.create(recurso=recurso, objeto_id=objeto_id, store_id=store_id)
+
+
+@receiver(exclusao_logica, sender=Product)
+@receiver(post_delete, sender=Product)
+def produto_excluido(sender, instance, **kwargs):
+    # A purga física de um produto já excluído logicamente não gera nova marca
+    if kwargs.get('signal') is post_delete and instance.excluido_em is not None:
+        return
+    registrar_exclusao('products', instance.pk)
+
+
+@receiver(post_delete, sender=StoreProduct)
+def estoque_excluido(sender, instance, **kwargs):
+    registrar_exclusao('stock', instance.pk, instance.store_id)
+    # O produto sai do catálogo visível para a loja
+    registrar_exclusao('products', instance.product_id, instance.store_id)
+
+
+@receiver(post_save, sender=StoreProduct)
+def estoque_criado(sender, instance, created, **kwargs):
+    # Produto entrando no estoque de uma loja passa a fazer parte do catálogo dela
+    if created:
+        Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Cliente)
+def cliente_excluido(sender, instance, **kwargs):
+    registrar_exclusao('clientes', instance.pk)
+
+
+@receiver(post_delete, sender=Seller)
+def vendedor_excluido(sender, instance, **kwargs):
+    registrar_exclusao('sellers', instance.pk, instance.store_id)
+
+
+@receiver(post_delete, sender=Order)
+def pedido_excluido(sender, instance, **kwargs):
+    # Lido pelo polling do quadro de pedidos (?since=)
+    registrar_exclusao('orders', instance.pk, instance.store_id)
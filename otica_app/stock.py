@@ -0,0 +1,124 @@
+"""
+Razão de estoque por loja.
+
+A posição de estoque em uma data passada é reconstruída a partir do
+fechamento (StockSnapshot) mais recente até aquela data somado às
+movimentações (StockMovement) posteriores a ele, sem tocar em StoreProduct.
+Intervalos anteriores ao corte do arquivo somam também ArchivedStockMovement.
+
+versao_estoque() muda a cada gravação de StoreProduct ou Product (preço e
+custo) e entra na chave dos valores de estoque guardados em cache.
+"""
+import time as relogio
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .arquivo import fontes, somar_por
+from .models import Product, StockMovement, StockSnapshot, StoreProduct
+
+CHAVE_VERSAO = 'estoque:versao'
+
+
+def versao_estoque():
+    return cache.get_or_set(CHAVE_VERSAO, 0, None)
+
+
+def _nova_versao():
+    cache.set(CHAVE_VERSAO, relogio.time_ns(), None)
+
+
+@receiver(post_save, sender=StoreProduct)
+@receiver(post_delete, sender=StoreProduct)
+@receiver(post_save, sender=Product)
+def estoque_alterado(sender, **kwargs):
+    # Só depois do commit: antes dele uma leitura ainda veria os valores antigos
+    transaction.on_commit(_nova_versao)
+
+
+def inicio_do_dia(data):
+    """Primeiro instante (com fuso) do dia informado"""
+    return timezone.make_aware(datetime.combine(data, time.min))
+
+
+def _saldo_movimentacoes(store_id, inicio=None, fim=None):
+    """Soma das movimentações por produto no intervalo [inicio, fim)"""
+    saldo = Case(
+        When(movement_type='entrada', then=F('quantity')),
+        default=-F('quantity'),
+        output_field=IntegerField(),
+    )
+    rows = []
+    for manager in fontes(StockMovement, inicio):
+        queryset = manager.filter(store_id=store_id)
+        if inicio is not None:
+            queryset = queryset.filter(created_at__gte=inicio)
+        if fim is not None:
+            queryset = queryset.filter(created_at__lt=fim)
+        rows += queryset.order_by().values('product_id').annotate(saldo=Sum(saldo))
+    return {row['product_id']: row['saldo'] or 0 for row in somar_por(rows, 'product_id')}
+
+
+def stock_on_date(store_id, data):
+    """Quantidade em estoque de cada produto da loja no fechamento do dia `data`"""
+    fechamento = (
+        StockSnapshot.objects
+        .filter(store_id=store_id, date__lte=data)
+        .order_by('-date')
+        .values_list('date', flat=True)
+        .first()
+    )
+
+    posicao = {}
+    inicio = None
+    if fechamento:
+        posicao = dict(
+            StockSnapshot.objects
+            .filter(store_id=store_id, date=fechamento)
+            .values_list('product_id', 'quantity')
+        )
+        inicio = inicio_do_dia(fechamento + timedelta(days=1))
+
+    fim = inicio_do_dia(data + timedelta(days=1))
+    for product_id, saldo in _saldo_movimentacoes(store_id, inicio, fim).items():
+        posicao[product_id] = posicao.get(product_id, 0) + saldo
+
+    return posicao
+
+
+def registrar_fechamento(data, store_ids=None):
+    """
+    Grava o fechamento de estoque do dia `data` para as lojas informadas.
+
+    A quantidade é a atual de StoreProduct descontadas as movimentações
+    posteriores ao fim do dia, então o comando pode rodar depois da meia-noite.
+    """
+    queryset = StoreProduct.objects.all()
+    if store_ids:
+        queryset = queryset.filter(store_id__in=store_ids)
+
+    fim = inicio_do_dia(data + timedelta(days=1))
+    fechamentos = []
+    for store_id in set(queryset.values_list('store_id', flat=True)):
+        posteriores = _saldo_movimentacoes(store_id, inicio=fim)
+        for product_id, quantity in queryset.filter(store_id=store_id).values_list('product_id', 'quantity'):
+            fechamentos.append(StockSnapshot(
+                store_id=store_id,
+                product_id=product_id,
+                date=data,
+                quantity=quantity - posteriores.get(product_id, 0),
+            ))
+
+    StockSnapshot.objects.bulk_create(
+        fechamentos,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['store', 'product', 'date'],
+        update_fields=['quantity'],
+    )
+    return len(fechamentos)
@@ -0,0 +1,173 @@
+"""
+Fila de tarefas em segundo plano gravada no banco (modelo Tarefa).
+
+Funções registradas com @tarefa('nome') são enfileiradas com
+enfileirar('nome', ...) e executadas pelo comando `rodar_tarefas`. Argumentos e
+resultado precisam ser serializáveis em JSON. Falhas são repetidas com espera
+exponencial até max_tentativas.
+
+Com TASKS_EAGER = True as tarefas rodam no próprio processo logo após o commit
+(útil em testes e em desenvolvimento sem o worker), mas continuam registradas
+na tabela com status e resultado.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Tarefa
+
+logger = logging.getLogger(__name__)
+
+REGISTRO = {}
+ESPERA_BASE = 30  # segundos; dobra a cada nova tentativa
+TEMPO_LIMITE_PADRAO = 30 * 60
+
+
+class TarefaDesconhecida(Exception):
+    pass
+
+
+def tarefa(nome, max_tentativas=3):
+    """Registra a função como tarefa executável pelo worker"""
+    def decorator(func):
+        REGISTRO[nome] = (func, max_tentativas)
+        func.nome_tarefa = nome
+        return func
+    return decorator
+
+
+def enfileirar(nome, *args, criado_por=None, atraso=None, **kwargs):
+    """Cria a tarefa; ela só fica visível para o worker após o commit"""
+    if nome not in REGISTRO:
+        raise TarefaDesconhecida(nome)
+    _, max_tentativas = REGISTRO[nome]
+    agora = timezone.now()
+    job = Tarefa.objects.create(
+        nome=nome,
+        args=list(args),
+        kwargs=kwargs,
+        max_tentativas=max_tentativas,
+        agendada_para=agora + atraso if atraso else agora,
+        criado_por=criado_por if getattr(criado_por, 'is_authenticated', False) else None,
+    )
+    if getattr(settings, 'TASKS_EAGER', False):
+        transaction.on_commit(lambda: _executar_agora(job.pk))
+    return job
+
+
+def _executar_agora(tarefa_id):
+    if Tarefa.objects.filter(pk=tarefa_id, status='pendente').update(
+        status='executando', iniciada_em=timezone.now()
+    ):
+        executar(Tarefa.objects.get(pk=tarefa_id))
+
+
+def reservar_proxima():
+    """
+    Marca a próxima tarefa pendente como 'executando' e a devolve.
+
+    A reserva é um UPDATE condicionado ao status, então dois workers nunca
+    pegam a mesma tarefa, em SQLite ou PostgreSQL.
+    """
+    candidatas = (
+        Tarefa.objects
+        .filter(status='pendente', agendada_para__lte=timezone.now())
+        .order_by('agendada_para', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for tarefa_id in list(candidatas):
+        if Tarefa.objects.filter(pk=tarefa_id, status='pendente').update(
+            status='executando', iniciada_em=timezone.now()
+        ):
+            return Tarefa.objects.get(pk=tarefa_id)
+    return None
+
+
+def executar(job):
+    """Executa uma tarefa já reservada e grava resultado ou erro"""
+    job.tentativas += 1
+    try:
+        if job.nome not in REGISTRO:
+            raise TarefaDesconhecida(job.nome)
+        func, _ = REGISTRO[job.nome]
+        resultado = func(*job.args, **job.kwargs)
+    except Exception:
+        job.erro = traceback.format_exc()
+        if job.tentativas < job.max_tentativas:
+            job.status = 'pendente'
+            job.agendada_para = timezone.now() + timedelta(seconds=ESPERA_BASE * 2 ** (job.tentativas - 1))
+        else:
+            job.status = 'falhou'
+            job.concluida_em = timezone.now()
+        logger.exception('Tarefa %s #%s falhou (tentativa %s)', job.nome, job.pk, job.tentativas)
+    else:
+        job.status = 'concluida'
+        job.resultado = resultado
+        job.erro = ''
+        job.concluida_em = timezone.now()
+    job.save(update_fields=['status', 'tentativas', 'resultado', 'erro', 'agendada_para', 'concluida_em'])
+    return job
+
+
+def recuperar_travadas():
+    """
+    Recupera tarefas 'executando' de workers que morreram; devolve
+    (devolvidas à fila, marcadas como falhas).
+
+    A execução interrompida conta como tentativa: uma tarefa que derruba o
+    worker (memória, tempo limite do processo) não volta à fila para sempre,
+    e é marcada 'falhou' ao atingir max_tentativas.
+    """
+    agora = timezone.now()
+    limite = agora - timedelta(seconds=getattr(settings, 'TASKS_TIMEOUT', TEMPO_LIMITE_PADRAO))
+    travadas = Tarefa.objects.filter(status='executando', iniciada_em__lt=limite)
+    erro = 'Execução interrompida: o worker parou antes de concluir a tarefa'
+    falhas = travadas.filter(tentativas__gte=F('max_tentativas') - 1).update(
+        status='falhou', tentativas=F('tentativas') + 1, erro=erro, concluida_em=agora
+    )
+    devolvidas = travadas.filter(tentativas__lt=F('max_tentativas') - 1).update(
+        status='pendente', tentativas=F('tentativas') + 1, erro=erro, agendada_para=agora
+    )
+    return devolvidas, falhas
+
+
+def rodar_pendentes(limite=None):
+    """Executa tarefas pendentes até esvaziar a fila; devolve quantas rodaram"""
+    executadas = 0
+    while limite is None or executadas < limite:
+        close_old_connections()
+        job = reservar_proxima()
+        if job is None:
+            break
+        executar(job)
+        executadas += 1
+    return executadas
+
+
+def limpar_antigas(dias):
+    """Remove tarefas concluídas ou falhas há mais de `dias` dias"""
+    limite = timezone.now() - timedelta(days=dias)
+    apagadas, _ = Tarefa.objects.filter(
+        Q(status='concluida') | Q(status='falhou'), concluida_em__lt=limite
+    ).delete()
+    return apagadas
+
+
+def resposta_tarefa(request, job):
+    """Resposta 202 padrão para views que disparam trabalho em segundo plano"""
+    return Response(
+        {
+            'tarefa_id': job.pk,
+            'status': job.status,
+            'url': request.build_absolute_uri(reverse('tarefa-detail', args=[job.pk])),
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
@@ -0,0 +1,1233 @@
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+import zlib
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection, router
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import eventos, tasks
+from .arquivo import agregado_arquivado, arquivar, fontes
+from .models import ArchivedSale, ArchivedSaleItem, ArchivedStockMovement, CashTillSession, Category, Cliente, ContaPagar, ContaPagarRecorrente, ContaReceber, EventoLoja, FolhaPagamento, Funcionario, Order, Product, RegistroExclusao, RelatorioFinanceiro, SaldoCliente, Sale, SaleItem, Seller, SellerDailyStats, StockMovement, StockSnapshot, Store, StoreProduct, Tarefa, User
+from .desempenho import recalcular_desempenho
+from .exclusao import purgar_excluidos
+from .fast_serializers import ClienteFastSerializer, SaleFastSerializer, SaleItemFastSerializer, StoreProductFastSerializer
+from .folha import gerar_folha
+from .images import VARIANT_WIDTHS, clear_variants, generate_variants
+from .middleware import CompressionMiddleware
+from .paralelo import em_paralelo
+from .recorrencias import _inserir, materializar_recorrencias
+from .renderers import FastJSONRenderer
+from .replica import ReplicaMiddleware, usar_replica
+from .serializers import ClienteSerializer, SaleItemSerializer, SaleSerializer, StoreProductSerializer
+from .sincronizacao import codificar_cursor
+from .stock import inicio_do_dia, registrar_fechamento, stock_on_date
+from .vencimentos import atualizar_vencidos
+from .views import _usuario_do_stream
+
+
+class QuadroPedidosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.gerente = User.objects.create_user('gerente', password='x', role='gerente', store=cls.store)
+        for status_pedido in ('realizando', 'realizando', 'pronto', 'entregue'):
+            Order.objects.create(customer_name='Cliente', store=cls.store, total_price=Decimal('100.00'), status=status_pedido)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.gerente)
+
+    def test_paginar_uma_coluna_mantem_todas_as_contagens(self):
+        esperado = {'realizando': 2, 'pronto': 1, 'entregue': 1}
+        resposta = self.client.get('/api/orders/board/')
+        self.assertEqual(resposta.json()['counts'], esperado)
+
+        resposta = self.client.get('/api/orders/board/', {'status': 'pronto', 'page_size': 1})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['counts'], esperado)
+        self.assertEqual(list(resposta.json()['columns']), ['pronto'])
+        self.assertEqual(len(resposta.json()['columns']['pronto']['results']), 1)
+
+        resposta = self.client.get('/api/orders/board/', {'status': 'realizando', 'page_size': 1})
+        self.assertEqual(resposta.json()['counts'], esperado)
+        self.assertIsNotNone(resposta.json()['columns']['realizando']['next_cursor'])
+
+    def test_parametros_invalidos_devolvem_400(self):
+        admin = User.objects.create_user('admin', password='x', role='admin')
+        self.client.force_authenticate(admin)
+        for parametros in ({'store': 'abc'}, {'since': '2026-13-45T00:00:00'}, {'since': 'ontem'}, {'status': 'foo'}):
+            resposta = self.client.get('/api/orders/board/', parametros)
+            self.assertEqual(resposta.status_code, 400, parametros)
+
+    def test_polling_informa_os_pedidos_excluidos(self):
+        resposta = self.client.get('/api/orders/board/')
+        server_time = resposta.json()['server_time']
+        pedido = Order.objects.filter(status='pronto').get()
+        outra = Store.objects.create(name='Loja B', address='Rua 2')
+        Order.objects.create(customer_name='Outro', store=outra, total_price=Decimal('10.00')).delete()
+        pedido_id = pedido.id
+        pedido.delete()
+
+        resposta = self.client.get('/api/orders/board/', {'since': server_time})
+        self.assertEqual(resposta.json()['removed'], [pedido_id])
+        self.assertEqual(resposta.json()['changed'], [])
+        self.assertEqual(resposta.json()['counts']['pronto'], 0)
+
+    def test_polling_anterior_a_retencao_pede_recarga(self):
+        since = (timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS + 1)).isoformat()
+        resposta = self.client.get('/api/orders/board/', {'since': since})
+        self.assertEqual(resposta.status_code, 410)
+
+
+class ConsultasParalelasTests(TestCase):
+    def _consultas(self):
+        return {
+            'thread': lambda: threading.current_thread().name,
+            'fuso': lambda: timezone.get_current_timezone_name(),
+        }
+
+    @override_settings(REPORT_QUERY_WORKERS=2)
+    def test_fora_de_transacao_roda_no_pool_com_o_fuso_ativo(self):
+        with mock.patch('otica_app.paralelo.connection') as conexao, timezone.override('America/Manaus'):
+            conexao.in_atomic_block = False
+            resultados = em_paralelo(self._consultas())
+        self.assertTrue(resultados['thread'].startswith('consultas'))
+        self.assertEqual(resultados['fuso'], 'America/Manaus')
+
+    @override_settings(REPORT_QUERY_WORKERS=2)
+    def test_dentro_de_transacao_roda_em_sequencia(self):
+        # TestCase envolve cada teste numa transação: outra conexão não veria os dados
+        self.assertEqual(em_paralelo(self._consultas())['thread'], threading.current_thread().name)
+
+
+@override_settings(DATABASES={
+    **settings.DATABASES,
+    'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:', 'TEST': {'MIRROR': 'default'}},
+})
+class ReplicaTests(SimpleTestCase):
+    """O roteador só decide o alias; nenhuma consulta é feita na réplica"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User(pk=1, username='gerente', role='gerente')
+
+    def _requisitar(self, metodo, usuario=None):
+        lidos = []
+
+        def view(request):
+            with usar_replica():
+                lidos.append(router.db_for_read(Sale))
+            return HttpResponse(status=201 if metodo == 'post' else 200)
+
+        request = getattr(RequestFactory(), metodo)('/api/reports/dashboard-stats/')
+        request.user = usuario or self.usuario
+        ReplicaMiddleware(view)(request)
+        return lidos[0]
+
+    def test_relatorio_le_da_replica(self):
+        self.assertEqual(self._requisitar('get'), 'replica')
+
+    def test_leitura_apos_escrita_vai_para_o_primario(self):
+        self._requisitar('post')
+        self.assertEqual(self._requisitar('get'), 'default')
+        # A marca é por usuário
+        self.assertEqual(self._requisitar('get', User(pk=2, username='outro', role='gerente')), 'replica')
+
+    def test_fora_de_usar_replica_le_do_primario(self):
+        self.assertEqual(router.db_for_read(Sale), 'default')
+
+
+class SincronizacaoProdutosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.gerente = User.objects.create_user('gerente', password='x', role='gerente', store=cls.store)
+        cls.categoria = Category.objects.create(name='Categoria de teste')
+        for i in range(5):
+            produto = Product.objects.create(name=f'Produto {i}', description='-', price=Decimal('10.00'), cost=Decimal('5.00'), category=cls.categoria)
+            StoreProduct.objects.create(store=cls.store, product=produto, quantity=i)
+        # Fora da janela de ATRASO_SEGUNDOS
+        Product.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.gerente)
+
+    def test_produtos_sem_campos_derivados_e_sem_consulta_por_linha(self):
+        with CaptureQueriesContext(connection) as cinco:
+            resposta = self.client.get('/api/sync/products/')
+        self.assertEqual(len(resposta.json()['results']), 5)
+        for produto in resposta.json()['results']:
+            self.assertNotIn('store_quantity', produto)
+            self.assertNotIn('category_name', produto)
+
+        for i in range(5, 10):
+            produto = Product.objects.create(name=f'Produto {i}', description='-', price=Decimal('10.00'), cost=Decimal('5.00'), category=self.categoria)
+            StoreProduct.objects.create(store=self.store, product=produto, quantity=i)
+        Product.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+        with CaptureQueriesContext(connection) as dez:
+            resposta = self.client.get('/api/sync/products/')
+        self.assertEqual(len(resposta.json()['results']), 10)
+        self.assertEqual(len(dez), len(cinco))
+
+
+class SincronizacaoEstoqueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store, outra = Store.objects.create(name='Loja A', address='Rua 1'), Store.objects.create(name='Loja B', address='Rua 2')
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        cls.gerente = User.objects.create_user('gerente', password='x', role='gerente', store=cls.store)
+        categoria = Category.objects.create(name='Categoria de teste')
+        for i in range(5):
+            produto = Product.objects.create(name=f'Produto {i}', price=Decimal('10.00'), cost=Decimal('5.00'), category=categoria)
+            StoreProduct.objects.create(store=cls.store, product=produto, quantity=i)
+            StoreProduct.objects.create(store=outra, product=produto, quantity=i)
+        StoreProduct.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.gerente)
+
+    def _sync(self, recurso='stock', **params):
+        resposta = self.client.get(f'/api/sync/{recurso}/', params)
+        self.assertEqual(resposta.status_code, 200, resposta.content)
+        return resposta.json()
+
+    def test_paginas_percorrem_a_loja_sem_repetir(self):
+        ids, params = [], {'limit': 2}
+        while True:
+            pagina = self._sync(**params)
+            ids += [linha['id'] for linha in pagina['results']]
+            params['cursor'] = pagina['cursor']
+            if not pagina['has_more']:
+                break
+        self.assertEqual(sorted(ids), sorted(StoreProduct.objects.filter(store=self.store).values_list('id', flat=True)))
+
+    def test_cursor_traz_alteracoes_e_exclusoes_da_loja(self):
+        cursor, cursor_produtos = self._sync()['cursor'], self._sync('products')['cursor']
+        alterado, excluido, *_ = StoreProduct.objects.filter(store=self.store).order_by('id')
+        StoreProduct.objects.filter(pk=alterado.pk).update(quantity=50, updated_at=timezone.now() - timedelta(seconds=30))
+        excluido_id = excluido.pk
+        excluido.delete()
+        # Exclusão em outra loja não aparece para esta
+        StoreProduct.objects.exclude(store=self.store).exclude(product=excluido.product).first().delete()
+        RegistroExclusao.objects.update(excluido_em=timezone.now() - timedelta(seconds=30))
+
+        pagina = self._sync(cursor=cursor)
+        self.assertEqual([(linha['id'], linha['quantity']) for linha in pagina['results']], [(alterado.pk, 50)])
+        self.assertEqual(pagina['deleted'], [excluido_id])
+        # O produto saiu do catálogo da loja, embora continue no de outras
+        self.assertEqual(self._sync('products', cursor=cursor_produtos)['deleted'], [excluido.product_id])
+        # Nada novo desde o último cursor
+        self.assertEqual(self._sync(cursor=pagina['cursor'])['results'], [])
+
+    def test_cursor_fora_da_retencao_devolve_410(self):
+        antigo = codificar_cursor(timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS + 1), None, None)
+        self.assertEqual(self.client.get('/api/sync/stock/', {'cursor': antigo}).status_code, 410)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/sync/pedidos/').status_code, 404)
+        self.assertEqual(self.client.get('/api/sync/stock/', {'cursor': 'xyz'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/sync/stock/', {'limit': '0'}).status_code, 400)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get('/api/sync/stock/', {'store': 'abc'}).status_code, 400)
+
+
+class BuscaProdutosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        categoria = Category.objects.create(name='Categoria de teste')
+        for nome in ('Armação Ray', 'Armação Oakley', 'Lente Zeiss'):
+            Product.objects.create(name=nome, description='-', price=Decimal('10.00'), cost=Decimal('5.00'), category=categoria)
+
+    def setUp(self):
+        from .search import product_index
+        # O índice em memória é do processo: força a verificação do catálogo em cada teste
+        product_index._verificado_em = 0
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_limite_nao_positivo_vale_um(self):
+        for limite in ('-3', '0'):
+            resposta = self.client.get('/api/products/search/', {'q': 'armacao', 'limit': limite})
+            self.assertEqual(resposta.status_code, 200)
+            self.assertEqual(len(resposta.json()), 1)
+
+    def test_indice_reconstruido_apos_mudanca_no_catalogo(self):
+        from .search import product_index
+        product_index.atualizar(forcar=True)
+        catalogo = product_index._catalogo
+        self.assertEqual(product_index.buscar('zeiss'), list(Product.objects.filter(name='Lente Zeiss').values_list('id', flat=True)))
+
+        Product.objects.filter(name='Lente Zeiss').update(name='Lente Hoya', updated_at=timezone.now())
+        product_index.atualizar(forcar=True)
+        self.assertIsNot(product_index._catalogo, catalogo)
+        self.assertEqual(product_index.buscar('zeiss'), [])
+        self.assertEqual(len(product_index.buscar('hoya')), 1)
+
+    def test_gerente_so_encontra_produtos_da_loja(self):
+        store = Store.objects.create(name='Loja A', address='Rua 1')
+        gerente = User.objects.create_user('gerente', password='x', role='gerente', store=store)
+        ray = Product.objects.get(name='Armação Ray')
+        StoreProduct.objects.create(store=store, product=ray, quantity=1)
+        self.client.force_authenticate(gerente)
+        resposta = self.client.get('/api/products/search/', {'q': 'armacao'})
+        self.assertEqual([produto['id'] for produto in resposta.json()], [ray.id])
+
+    def test_relevancia_ordena_todos_os_candidatos_antes_de_cortar(self):
+        from .search import MAX_CANDIDATOS
+        categoria = Category.objects.get(name='Categoria de teste')
+        for i in range(MAX_CANDIDATOS + 10):
+            Product.objects.create(name=f'Estojo para lente {i}', description='-', price=Decimal('10.00'), cost=Decimal('5.00'), category=categoria)
+        # Id mais alto que todos os outros candidatos, mas o nome começa com o termo
+        Product.objects.create(name='Lente Hoya', description='-', price=Decimal('10.00'), cost=Decimal('5.00'), category=categoria)
+        resposta = self.client.get('/api/products/search/', {'q': 'lente', 'limit': 2})
+        self.assertEqual([produto['name'] for produto in resposta.json()], ['Lente Hoya', 'Lente Zeiss'])
+
+
+class RecorrenciasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        cls.recorrencia = ContaPagarRecorrente.objects.create(
+            descricao='Aluguel', tipo='aluguel', valor=Decimal('1500.00'), dia_vencimento=10,
+            data_inicio=date(2024, 1, 1), store=cls.store,
+        )
+
+    def _conta(self, competencia):
+        return ContaPagar(
+            descricao='Aluguel', tipo='aluguel', valor=Decimal('1500.00'), data_vencimento=competencia.replace(day=10),
+            store=self.store, recorrencia=self.recorrencia, competencia=competencia,
+        )
+
+    def test_total_conta_so_as_inseridas(self):
+        self.assertEqual(materializar_recorrencias(3, date(2024, 1, 1)), 3)
+        self.assertEqual(materializar_recorrencias(3, date(2024, 1, 1)), 0)
+        # Execução simultânea: a de fevereiro já existe quando a inserção roda
+        self.assertEqual(_inserir([self._conta(date(2024, 2, 1)), self._conta(date(2024, 4, 1))]), 1)
+        self.assertEqual(ContaPagar.objects.count(), 4)
+
+    def test_mes_atual_no_fuso_da_loja(self):
+        # 01/03 01:00 UTC ainda é 29/02 em America/Sao_Paulo
+        with mock.patch('django.utils.timezone.now', return_value=datetime(2024, 3, 1, 1, 0, tzinfo=dt_timezone.utc)):
+            materializar_recorrencias(1)
+        self.assertEqual(list(ContaPagar.objects.values_list('competencia', flat=True)), [date(2024, 2, 1)])
+
+    def test_api_nao_grava_recorrencia_nem_competencia(self):
+        materializar_recorrencias(1, date(2024, 1, 1))
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        resposta = client.post('/api/contas-pagar/', {
+            'descricao': 'Aluguel', 'tipo': 'aluguel', 'valor': '1500.00', 'data_vencimento': '2024-01-10',
+            'store': self.store.id, 'recorrencia': self.recorrencia.id, 'competencia': '2024-01-01',
+        })
+        self.assertEqual(resposta.status_code, 201)
+        self.assertIsNone(resposta.json()['recorrencia'])
+        self.assertIsNone(resposta.json()['competencia'])
+
+
+class PosicaoEstoqueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        cls.product = Product.objects.create(
+            name='Armação', price=Decimal('100.00'), cost=Decimal('40.00'),
+            category=Category.objects.create(name='Categoria de teste'),
+        )
+        StoreProduct.objects.create(store=cls.store, product=cls.product, quantity=12)
+        for dia, delta in ((10, 10), (12, -3), (15, 5)):
+            movimento = StockMovement.registrar(cls.store, cls.product, delta)
+            StockMovement.objects.filter(pk=movimento.pk).update(created_at=inicio_do_dia(date(2024, 1, dia)) + timedelta(hours=12))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_posicao_soma_o_fechamento_e_as_movimentacoes_posteriores(self):
+        self.assertEqual(registrar_fechamento(date(2024, 1, 11)), 1)
+        self.assertEqual(StockSnapshot.objects.get(store=self.store, date=date(2024, 1, 11)).quantity, 10)
+        # O fechamento passa a ser a base: movimentações anteriores a ele não são mais lidas
+        StockMovement.objects.filter(created_at__lt=inicio_do_dia(date(2024, 1, 11))).delete()
+
+        self.assertEqual(stock_on_date(self.store.id, date(2024, 1, 11)), {self.product.id: 10})
+        self.assertEqual(stock_on_date(self.store.id, date(2024, 1, 13)), {self.product.id: 7})
+        self.assertEqual(stock_on_date(self.store.id, date(2024, 1, 20)), {self.product.id: 12})
+
+    def test_relatorio_valoriza_a_posicao_da_data(self):
+        resposta = self.client.get('/api/reports/stock-position/', {'store': self.store.id, 'date': '2024-01-13'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['total_quantity'], 7)
+        self.assertEqual(Decimal(resposta.json()['total_cost_value']), Decimal('280.00'))
+
+    def test_loja_nao_numerica_devolve_400(self):
+        resposta = self.client.get('/api/reports/stock-position/', {'store': 'abc'})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_data_invalida_devolve_400(self):
+        resposta = self.client.get('/api/reports/stock-position/', {'store': self.store.id, 'date': '13/01/2024'})
+        self.assertEqual(resposta.status_code, 400)
+
+
+class EstoqueMinimoProdutoTests(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name='Loja A', address='Rua 1')
+        categoria = Category.objects.create(name='Categoria de teste')
+        produto = Product.objects.create(name='Armação', description='-', price=Decimal('10.00'), cost=Decimal('5.00'), category=categoria, reorder_level=5)
+        self.estoque = StoreProduct.objects.create(store=self.store, product=produto, quantity=3)
+        StoreProduct.objects.filter(pk=self.estoque.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        self.produto = Product.objects.get(pk=produto.pk)
+
+    def test_salvar_sem_mudar_estoque_minimo_nao_toca_as_lojas(self):
+        antes = StoreProduct.objects.get(pk=self.estoque.pk).updated_at
+        self.produto.name = 'Armação Nova'
+        self.produto.save()
+        self.assertEqual(StoreProduct.objects.get(pk=self.estoque.pk).updated_at, antes)
+
+    def test_mudar_estoque_minimo_recalcula_as_lojas(self):
+        self.assertEqual(self.estoque.stock_status, 'low')
+        self.produto.reorder_level = 2
+        self.produto.save()
+        self.assertEqual(StoreProduct.objects.get(pk=self.estoque.pk).stock_status, 'normal')
+        # Salvar de novo com o mesmo valor não é mudança
+        antes = StoreProduct.objects.get(pk=self.estoque.pk).updated_at
+        self.produto.save()
+        self.assertEqual(StoreProduct.objects.get(pk=self.estoque.pk).updated_at, antes)
+
+
+class ContasReceberTests(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name='Loja A', address='Rua 1')
+        self.cliente = Cliente.objects.create(nome='Maria', cpf='123.456.789-00')
+        self.conta = ContaReceber.objects.create(
+            descricao='Parcela', tipo='venda', cliente=self.cliente, valor=Decimal('300.00'),
+            data_vencimento=date(2024, 1, 10), store=self.store,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', password='x', role='admin'))
+
+    def _saldo(self):
+        return SaldoCliente.objects.values_list('total_aberto', 'contas_abertas').get(cliente=self.cliente)
+
+    def test_valor_recebido_legado_e_o_total_e_encerra_a_conta(self):
+        self.conta.registrar_recebimento(Decimal('100.00'))
+        resposta = self.client.post(f'/api/contas-receber/{self.conta.pk}/marcar_recebido/', {'valor_recebido': '250.00'})
+        self.assertEqual(resposta.status_code, 200)
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.valor_recebido, Decimal('250.00'))
+        self.assertEqual(self.conta.status, 'recebido')
+        self.assertEqual(list(self.conta.recebimentos.values_list('valor', flat=True)), [Decimal('150.00'), Decimal('100.00')])
+        self.assertEqual(self._saldo(), (Decimal('0.00'), 0))
+
+    def test_valor_recebido_legado_igual_ao_ja_recebido_so_encerra(self):
+        self.conta.registrar_recebimento(Decimal('100.00'))
+        resposta = self.client.post(f'/api/contas-receber/{self.conta.pk}/marcar_recebido/', {'valor_recebido': '100.00'})
+        self.assertEqual(resposta.status_code, 200)
+        self.conta.refresh_from_db()
+        self.assertEqual((self.conta.status, self.conta.valor_recebido), ('recebido', Decimal('100.00')))
+        self.assertEqual(self.conta.recebimentos.count(), 1)
+        self.assertEqual(self._saldo(), (Decimal('0.00'), 0))
+
+    def test_recebimentos_parciais_entram_no_relatorio_pela_propria_data(self):
+        from .relatorios import gerar_relatorios
+        servico = ContaReceber.objects.create(
+            descricao='Ajuste', tipo='servico', valor=Decimal('300.00'), data_vencimento=date(2024, 1, 10), store=self.store,
+        )
+        servico.registrar_recebimento(Decimal('100.00'), data_recebimento=date(2024, 1, 15))
+        servico.registrar_recebimento(Decimal('50.00'), data_recebimento=date(2024, 2, 10))
+        novos, _ = gerar_relatorios('mensal', date(2024, 1, 1), date(2024, 2, 29), [self.store.id])
+        self.assertEqual(
+            [(relatorio.data_inicio.month, relatorio.receita_servicos) for relatorio in novos],
+            [(1, Decimal('100.00')), (2, Decimal('50.00'))],
+        )
+
+    def test_resumo_soma_o_restante_das_contas(self):
+        self.conta.registrar_recebimento(Decimal('100.00'))
+        resposta = self.client.get('/api/financeiro/resumo-contas/')
+        self.assertEqual(Decimal(str(resposta.json()['contas_receber_vencidas'])), Decimal('200.00'))
+
+    def test_valor_recebido_legado_invalido_devolve_400(self):
+        resposta = self.client.post(f'/api/contas-receber/{self.conta.pk}/marcar_recebido/', {'valor_recebido': 'abc'})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_exclusao_em_cascata_da_loja_ajusta_o_saldo(self):
+        outra = Store.objects.create(name='Loja B', address='Rua 2')
+        ContaReceber.objects.create(
+            descricao='Parcela', tipo='venda', cliente=self.cliente, valor=Decimal('50.00'),
+            data_vencimento=date(2024, 1, 10), store=outra,
+        )
+        self.assertEqual(self._saldo(), (Decimal('350.00'), 2))
+        self.store.delete()
+        self.assertEqual(self._saldo(), (Decimal('50.00'), 1))
+        ContaReceber.objects.get().delete()
+        self.assertEqual(self._saldo(), (Decimal('0.00'), 0))
+
+
+class RelatoriosFinanceirosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.gerente = User.objects.create_user('gerente', password='x', role='gerente', store=cls.store)
+        seller = Seller.objects.create(name='Vendedor', store=cls.store)
+        for dia, total in ((5, '300.00'), (20, '200.00'), (40, '999.00')):
+            venda = Sale.objects.create(store=cls.store, seller=seller, customer_name='Cliente', customer_email='c@c.com', customer_phone='1', total_amount=Decimal(total))
+            Sale.objects.filter(pk=venda.pk).update(sale_date=inicio_do_dia(date(2024, 1, 1) + timedelta(days=dia)) + timedelta(hours=12))
+        ContaPagar.objects.create(
+            descricao='Lentes', tipo='fornecedor', valor=Decimal('150.00'), valor_pago=Decimal('150.00'),
+            data_vencimento=date(2024, 1, 10), data_pagamento=date(2024, 1, 10), status='pago', store=cls.store,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.gerente)
+
+    def _gerar(self, tipo, data_inicio='2024-01-01', data_fim='2024-01-31'):
+        return self.client.post('/api/relatorios-financeiros/gerar/', {'tipo': tipo, 'data_inicio': data_inicio, 'data_fim': data_fim})
+
+    def test_mensal_soma_as_fontes_e_regerar_preserva_observacoes(self):
+        resposta = self._gerar('mensal')
+        self.assertEqual(resposta.status_code, 201)
+        relatorio = RelatorioFinanceiro.objects.get(store=self.store, tipo='mensal')
+        self.assertEqual((relatorio.receita_vendas, relatorio.despesa_fornecedores), (Decimal('500.00'), Decimal('150.00')))
+        self.assertEqual(relatorio.lucro_bruto, Decimal('350.00'))
+
+        RelatorioFinanceiro.objects.filter(pk=relatorio.pk).update(observacoes='Conferido')
+        self.assertEqual(self._gerar('mensal').status_code, 200)
+        relatorio = RelatorioFinanceiro.objects.get(store=self.store, tipo='mensal')
+        self.assertEqual((relatorio.observacoes, relatorio.receita_vendas), ('Conferido', Decimal('500.00')))
+
+    def test_anual_roda_em_segundo_plano(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self._gerar('anual', data_fim='2024-12-31')
+        self.assertEqual(resposta.status_code, 202)
+        self.assertFalse(RelatorioFinanceiro.objects.exists())
+
+        self.assertEqual(tasks.rodar_pendentes(), 1)
+        tarefa = self.client.get(f"/api/tarefas/{resposta.json()['tarefa_id']}/").json()
+        self.assertEqual(tarefa['status'], 'concluida')
+        self.assertEqual(RelatorioFinanceiro.objects.get(tipo='anual').receita_vendas, Decimal('1499.00'))
+
+    def test_intervalo_invertido_devolve_400(self):
+        self.assertEqual(self._gerar('mensal', data_inicio='2024-02-01').status_code, 400)
+
+
+class ContasVencidasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.gerente = User.objects.create_user('gerente', password='x', role='gerente', store=cls.store)
+        cls.ontem = timezone.localdate() - timedelta(days=1)
+        for dia, situacao in ((cls.ontem, 'pendente'), (cls.ontem, 'pago'), (cls.ontem + timedelta(days=5), 'pendente')):
+            ContaPagar.objects.create(
+                descricao='Conta', tipo='fornecedor', valor=Decimal('100.00'), data_vencimento=dia, status=situacao, store=cls.store,
+            )
+        ContaReceber.objects.create(descricao='Parcela', tipo='servico', valor=Decimal('80.00'), data_vencimento=cls.ontem, store=cls.store)
+
+    def _resumo(self):
+        client = APIClient()
+        client.force_authenticate(self.gerente)
+        return client.get('/api/financeiro/resumo-contas/').json()
+
+    def test_varredura_marca_so_pendentes_com_vencimento_passado(self):
+        self.assertEqual(atualizar_vencidos(), (1, 1))
+        self.assertEqual(atualizar_vencidos(), (0, 0))
+        self.assertEqual(
+            sorted(ContaPagar.objects.values_list('status', flat=True)), ['pago', 'pendente', 'vencido']
+        )
+        self.assertEqual(ContaReceber.objects.get().status, 'vencido')
+
+    def test_resumo_igual_antes_e_depois_da_varredura(self):
+        antes = self._resumo()
+        self.assertEqual(Decimal(str(antes['contas_pagar_vencidas'])), Decimal('100.00'))
+        self.assertEqual(Decimal(str(antes['contas_receber_vencidas'])), Decimal('80.00'))
+        call_command('atualizar_vencidos', stdout=StringIO())
+        self.assertEqual(self._resumo(), antes)
+
+
+class FastSerializersTests(TestCase):
+    """Os campos dos FastSerializers são copiados à mão dos ModelSerializers; a saída tem de ser a mesma"""
+
+    @classmethod
+    def setUpTestData(cls):
+        store = Store.objects.create(name='Loja A', address='Rua 1')
+        categoria = Category.objects.create(name='Categoria de teste')
+        produto = Product.objects.create(name='Armação', brand='Ray', description='-', price=Decimal('199.90'), cost=Decimal('80.00'), category=categoria)
+        StoreProduct.objects.create(store=store, product=produto, quantity=10, reorder_level=3)
+        cliente = Cliente.objects.create(nome='Maria', cpf='123.456.789-00', data_nascimento=date(1990, 5, 1), grau_od='-1.25')
+        seller = Seller.objects.create(name='João', store=store)
+        venda = Sale.objects.create(store=store, seller=seller, cliente=cliente, customer_name='Maria', customer_phone='11999999999', payment_method='cash')
+        SaleItem.objects.create(sale=venda, product=produto, quantity=2, unit_price=Decimal('199.90'), total_price=Decimal('399.80'))
+
+    def _comparar(self, fast, serializer, queryset):
+        rapido = fast.serialize(queryset.values(*fast.value_paths()))
+        esperado = serializer(queryset, many=True).data
+        self.assertEqual(len(rapido), len(esperado))
+        for linha_rapida, linha in zip(rapido, esperado):
+            self.assertEqual(list(linha_rapida), list(linha))
+            self.assertEqual(linha_rapida, dict(linha))
+
+    def test_estoque(self):
+        self._comparar(StoreProductFastSerializer(), StoreProductSerializer, StoreProduct.objects.order_by('id'))
+
+    def test_itens_de_venda(self):
+        self._comparar(SaleItemFastSerializer(), SaleItemSerializer, SaleItem.objects.order_by('id'))
+
+    def test_clientes(self):
+        self._comparar(ClienteFastSerializer(), ClienteSerializer, Cliente.objects.order_by('id'))
+
+    def test_vendas(self):
+        self._comparar(SaleFastSerializer(), SaleSerializer, Sale.objects.order_by('id'))
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    dados = {
+        'total': Decimal('10.50'),
+        'quando': datetime(2024, 1, 10, 12, 30, tzinfo=dt_timezone.utc),
+        'dia': date(2024, 1, 10),
+        'nome': 'Óculos\u2028novo',
+        1: 'chave numérica',
+    }
+
+    def test_mesmo_formato_do_renderer_padrao(self):
+        rapido = FastJSONRenderer().render(self.dados)
+        padrao = JSONRenderer().render(self.dados)
+        self.assertEqual(json.loads(rapido), json.loads(padrao))
+        self.assertIn(b'"2024-01-10T12:30:00Z"', rapido)
+        self.assertIn(b'\\u2028', rapido)
+
+    def test_json_indentado_usa_o_renderer_padrao(self):
+        renderizado = FastJSONRenderer().render(self.dados, 'application/json; indent=2')
+        self.assertEqual(renderizado, JSONRenderer().render(self.dados, 'application/json; indent=2'))
+
+
+class CompressaoTests(SimpleTestCase):
+    corpo = json.dumps([{'id': n, 'nome': f'Produto {n}'} for n in range(200)]).encode()
+
+    def _processar(self, response, aceita='gzip, deflate'):
+        request = RequestFactory().get('/api/products/', HTTP_ACCEPT_ENCODING=aceita)
+        return CompressionMiddleware(lambda request: response).process_response(request, response)
+
+    def test_json_grande_comprimido_com_gzip(self):
+        resposta = self._processar(HttpResponse(self.corpo, content_type='application/json'))
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(resposta.content), self.corpo)
+        self.assertIn('Accept-Encoding', resposta['Vary'])
+
+    def test_sem_compressao_para_corpo_pequeno_ou_gzip_recusado(self):
+        pequena = self._processar(HttpResponse(b'{"ok":true}', content_type='application/json'))
+        recusada = self._processar(HttpResponse(self.corpo, content_type='application/json'), aceita='gzip;q=0')
+        self.assertFalse(pequena.has_header('Content-Encoding'))
+        self.assertFalse(recusada.has_header('Content-Encoding'))
+
+    def test_streaming_vira_um_unico_stream_gzip(self):
+        pedacos = [self.corpo[:1000], self.corpo[1000:]]
+        resposta = self._processar(StreamingHttpResponse(iter(pedacos), content_type='application/json'))
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+        # Um membro gzip só: o descompressor termina sem sobrar dados de outro membro
+        descompressor = zlib.decompressobj(31)
+        self.assertEqual(descompressor.decompress(b''.join(resposta.streaming_content)), self.corpo)
+        self.assertTrue(descompressor.eof)
+        self.assertEqual(descompressor.unused_data, b'')
+
+
+class VariantesImagemTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        configuracao = override_settings(MEDIA_ROOT=media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def _produto(self, largura, altura):
+        buffer = BytesIO()
+        Image.new('RGBA', (largura, altura), (255, 0, 0, 0)).save(buffer, 'PNG')
+        product = Product(
+            name='Armação', price=Decimal('100.00'), cost=Decimal('40.00'),
+            category=Category.objects.get_or_create(name='Categoria de teste')[0],
+        )
+        product.image.save('foto.png', ContentFile(buffer.getvalue()))
+        return product
+
+    def _abrir(self, product, largura, formato):
+        with product.image.storage.open(product.image_variants[str(largura)][formato]) as arquivo:
+            imagem = Image.open(arquivo)
+            imagem.load()
+        return imagem
+
+    def test_variacoes_reduzidas_em_webp_e_jpeg(self):
+        product = self._produto(1200, 600)
+        generate_variants(product)
+
+        self.assertEqual(Product.objects.get(pk=product.pk).image_variants, product.image_variants)
+        for largura in VARIANT_WIDTHS:
+            webp, jpeg = self._abrir(product, largura, 'webp'), self._abrir(product, largura, 'jpeg')
+            self.assertEqual((webp.format, webp.size), ('WEBP', (largura, largura // 2)))
+            self.assertEqual((jpeg.format, jpeg.mode), ('JPEG', 'RGB'))
+            # Transparência vira fundo branco no JPEG
+            self.assertEqual(jpeg.getpixel((0, 0)), (255, 255, 255))
+
+    def test_foto_menor_que_a_largura_nao_e_ampliada(self):
+        product = self._produto(300, 200)
+        generate_variants(product)
+        self.assertEqual(self._abrir(product, 960, 'webp').size, (300, 200))
+
+    def test_limpar_apaga_os_arquivos_das_variacoes(self):
+        product = self._produto(600, 600)
+        nomes = [nome for formatos in generate_variants(product).values() for nome in formatos.values()]
+        clear_variants(product)
+        self.assertFalse(any(product.image.storage.exists(nome) for nome in nomes))
+        self.assertEqual(Product.objects.get(pk=product.pk).image_variants, {})
+
+
+class ValorizacaoEstoqueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = Store.objects.create(name='Loja A', address='Rua 1')
+        categoria = Category.objects.create(name='Categoria de teste')
+        produto = Product.objects.create(name='Armação', description='-', price=Decimal('10.00'), cost=Decimal('4.00'), category=categoria)
+        self.estoque = StoreProduct.objects.create(store=self.store, product=produto, quantity=3)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', password='x', role='admin'))
+
+    def _valorizacao(self):
+        return self.client.get('/api/reports/inventory-valuation/', {'store': self.store.id}).json()[0]
+
+    def test_loja_nao_numerica_devolve_400(self):
+        resposta = self.client.get('/api/reports/inventory-valuation/', {'store': 'abc'})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_gravacoes_de_estoque_e_de_produto_invalidam_o_cache(self):
+        self.assertEqual(self._valorizacao()['total_quantity'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.estoque.quantity = 5
+            self.estoque.save()
+        self.assertEqual(self._valorizacao()['total_quantity'], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            produto = self.estoque.product
+            produto.cost = Decimal('6.00')
+            produto.save()
+        self.assertEqual(Decimal(str(self._valorizacao()['cost_value'])), Decimal('30.00'))
+
+
+class DesempenhoVendedoresTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store, outra = Store.objects.create(name='Loja A', address='Rua 1'), Store.objects.create(name='Loja B', address='Rua 2')
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        cls.gerente = User.objects.create_user('gerente', password='x', role='gerente', store=cls.store)
+        product = Product.objects.create(
+            name='Armação', price=Decimal('100.00'), cost=Decimal('40.00'),
+            category=Category.objects.create(name='Categoria de teste'),
+        )
+        cls.ana = Seller.objects.create(name='Ana', store=cls.store)
+        cls.bruno = Seller.objects.create(name='Bruno', store=cls.store)
+        carla = Seller.objects.create(name='Carla', store=outra)
+        for seller, itens in ((cls.ana, 1), (cls.ana, 3), (cls.bruno, 2), (carla, 1)):
+            venda = Sale.objects.create(
+                store=seller.store, seller=seller, customer_name='Cliente', customer_email='c@c.com',
+                customer_phone='1', total_amount=Decimal('100.00') * itens,
+            )
+            SaleItem.objects.create(sale=venda, product=product, quantity=itens, unit_price=Decimal('100.00'), total_price=Decimal('100.00') * itens)
+            SellerDailyStats.registrar(venda)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.gerente)
+
+    def _linhas(self):
+        return sorted(SellerDailyStats.objects.values_list('seller_id', 'date', 'sales_count', 'revenue', 'items_count'))
+
+    def test_ranking_da_loja_com_ticket_medio_e_itens_por_venda(self):
+        resposta = self.client.get('/api/reports/seller-performance/')
+        self.assertEqual(resposta.status_code, 200)
+        ranking = [(linha['seller_name'], linha['sales_count'], Decimal(str(linha['average_ticket'])), linha['items_per_sale']) for linha in resposta.json()]
+        self.assertEqual(ranking, [('Ana', 2, Decimal('200.00'), 2.0), ('Bruno', 1, Decimal('200.00'), 2.0)])
+
+    def test_recalcular_reproduz_os_totais_incrementais(self):
+        incrementais = self._linhas()
+        SellerDailyStats.objects.update(revenue=0, items_count=0)
+        self.assertEqual(recalcular_desempenho(), 3)
+        self.assertEqual(self._linhas(), incrementais)
+
+    def test_parametros_invalidos_devolvem_400(self):
+        self.client.force_authenticate(self.admin)
+        for params in ({'store': 'abc'}, {'group_by': 'year'}, {'start_date': '01/01/2024'}):
+            self.assertEqual(self.client.get('/api/reports/seller-performance/', params).status_code, 400, params)
+
+
+class ExclusaoLogicaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        cls.categoria = Category.objects.create(name='Categoria de teste')
+
+    def _produto(self, nome='Armação'):
+        return Product.objects.create(name=nome, price=Decimal('100.00'), cost=Decimal('40.00'), category=self.categoria)
+
+    def _excluir_ha(self, produto, dias):
+        Product.todos.filter(pk=produto.pk).update(excluido_em=timezone.now() - timedelta(days=dias))
+
+    def test_exclusao_pela_api_e_logica_e_gera_marca_de_sincronizacao(self):
+        produto = self._produto()
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        self.assertEqual(client.delete(f'/api/products/{produto.pk}/').status_code, 204)
+
+        self.assertFalse(Product.objects.filter(pk=produto.pk).exists())
+        self.assertIsNotNone(Product.todos.get(pk=produto.pk).excluido_em)
+        self.assertEqual(client.get(f'/api/products/{produto.pk}/').status_code, 404)
+        self.assertTrue(RegistroExclusao.objects.filter(recurso='products', objeto_id=produto.pk).exists())
+
+        Product.todos.get(pk=produto.pk).restaurar()
+        self.assertTrue(Product.objects.filter(pk=produto.pk).exists())
+
+    def test_historico_continua_vendo_o_excluido_e_nome_pode_ser_reusado(self):
+        seller = Seller.objects.create(name='Vendedor', store=self.store)
+        venda = Sale.objects.create(store=self.store, seller=seller, customer_name='Cliente', customer_email='c@c.com', customer_phone='1')
+        item = SaleItem.objects.create(sale=venda, product=self._produto(), quantity=1, unit_price=Decimal('100.00'), total_price=Decimal('100.00'))
+        item.product.delete()
+        self.assertEqual(SaleItem.objects.get(pk=item.pk).product.name, 'Armação')
+
+        self.categoria.delete()
+        Category.objects.create(name='Categoria de teste')
+
+    def test_purga_so_remove_excluidos_antigos_sem_historico(self):
+        antigo, recente, vendido = self._produto('Antigo'), self._produto('Recente'), self._produto('Vendido')
+        seller = Seller.objects.create(name='Vendedor', store=self.store)
+        venda = Sale.objects.create(store=self.store, seller=seller, customer_name='Cliente', customer_email='c@c.com', customer_phone='1')
+        SaleItem.objects.create(sale=venda, product=vendido, quantity=1, unit_price=Decimal('100.00'), total_price=Decimal('100.00'))
+        for produto, dias in ((antigo, 200), (recente, 10), (vendido, 200)):
+            self._excluir_ha(produto, dias)
+
+        resultado = purgar_excluidos(180)
+
+        self.assertEqual(resultado[Product._meta.verbose_name_plural], (1, 1))
+        self.assertEqual(sorted(Product.todos.values_list('name', flat=True)), ['Recente', 'Vendido'])
+        # A purga física não gera nova marca de exclusão
+        self.assertFalse(RegistroExclusao.objects.filter(objeto_id=antigo.pk).exists())
+
+
+class DadosBenchmarkTests(TestCase):
+    def test_remocao_apaga_fisicamente_e_situacao_do_estoque_confere(self):
+        from .management.commands._bench import criar_dados_benchmark, remover_dados_benchmark
+        dados = criar_dados_benchmark(30)
+        for store_product in StoreProduct.objects.filter(store=dados['store']).select_related('product'):
+            self.assertEqual(
+                store_product.stock_status,
+                StoreProduct.calcular_stock_status(store_product.quantity, store_product.effective_reorder_level),
+            )
+
+        remover_dados_benchmark(dados)
+        self.assertFalse(Product.todos.filter(category_id=dados['category'].id).exists())
+        self.assertFalse(Category.todos.filter(pk=dados['category'].id).exists())
+        self.assertFalse(Store.objects.filter(pk=dados['store'].id).exists())
+
+
+class BuscaClientesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Cliente.objects.create(nome='Ana Joséfa', cpf='111.222.333-44', telefone='(21) 97777-6666')
+        Cliente.objects.create(nome='José da Silva', cpf='123.456.789-00', telefone='(11) 98888-7777')
+        Cliente.objects.create(nome='Maria', cpf='987.654.321-00', telefone='(11) 91234-5678')
+        cls.usuario = User.objects.create_user('admin', password='x', role='admin')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _nomes(self, url, termo):
+        resposta = self.client.get(url, {'q': termo})
+        self.assertEqual(resposta.status_code, 200)
+        dados = resposta.json()
+        # A listagem é paginada; a ação buscar devolve a lista direto
+        return [cliente['nome'] for cliente in (dados['results'] if isinstance(dados, dict) else dados)]
+
+    def test_nome_sem_acento_prioriza_quem_comeca_com_o_termo(self):
+        self.assertEqual(self._nomes('/api/clientes/buscar/', 'jose'), ['José da Silva', 'Ana Joséfa'])
+
+    def test_digitos_buscam_prefixo_de_cpf_ou_telefone(self):
+        self.assertEqual(self._nomes('/api/clientes/buscar/', '123.456'), ['José da Silva'])
+        self.assertEqual(self._nomes('/api/clientes/buscar/', '(11) 9'), ['José da Silva', 'Maria'])
+
+    def test_listagem_filtra_pelo_mesmo_termo(self):
+        self.assertEqual(self._nomes('/api/clientes/', '98765432100'), ['Maria'])
+
+
+class HistoricoClienteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store, cls.outra = Store.objects.create(name='Loja A', address='Rua 1'), Store.objects.create(name='Loja B', address='Rua 2')
+        cls.gerente = User.objects.create_user('gerente', password='x', role='gerente', store=cls.store)
+        cls.cliente = Cliente.objects.create(nome='Maria', cpf='987.654.321-00', grau_od='-1.00')
+        cls.product = Product.objects.create(
+            name='Armação', price=Decimal('100.00'), cost=Decimal('40.00'),
+            category=Category.objects.create(name='Categoria de teste'),
+        )
+        cls.sellers = {store: Seller.objects.create(name='Vendedor', store=store) for store in (cls.store, cls.outra)}
+        for store in (cls.store, cls.store, cls.outra):
+            cls._comprar(store)
+        Order.objects.create(customer_name='Maria', cliente=cls.cliente, store=cls.store, total_price=Decimal('300.00'), sphere_right=Decimal('-1.25'))
+        Order.objects.create(customer_name='Maria', cliente=cls.cliente, store=cls.store, total_price=Decimal('50.00'))
+        Order.objects.create(customer_name='Maria', cliente=cls.cliente, store=cls.outra, total_price=Decimal('300.00'), sphere_left=Decimal('-2.00'))
+
+    @classmethod
+    def _comprar(cls, store):
+        venda = Sale.objects.create(
+            store=store, seller=cls.sellers[store], cliente=cls.cliente, customer_name='Maria',
+            customer_email='m@m.com', customer_phone='1', total_amount=Decimal('100.00'),
+        )
+        SaleItem.objects.create(sale=venda, product=cls.product, quantity=1, unit_price=Decimal('100.00'), total_price=Decimal('100.00'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.gerente)
+
+    def _historico(self, **params):
+        resposta = self.client.get(f'/api/clientes/{self.cliente.pk}/historico/', params)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def test_usuario_da_loja_ve_so_o_historico_da_loja(self):
+        historico = self._historico()
+        self.assertEqual(len(historico['compras']), 2)
+        self.assertEqual(len(historico['compras'][0]['items']), 1)
+        self.assertEqual(len(historico['pedidos']), 2)
+        # Pedido sem medidas não entra na linha do tempo; o grau do cadastro entra
+        self.assertEqual([receita['origem'] for receita in historico['receitas']].count('pedido'), 1)
+        self.assertIn('cadastro', [receita['origem'] for receita in historico['receitas']])
+
+    def test_limite_e_consultas_independentes_do_tamanho(self):
+        self.assertEqual(len(self._historico(limite=1)['compras']), 1)
+        with CaptureQueriesContext(connection) as antes:
+            self._historico()
+        for _ in range(3):
+            self._comprar(self.store)
+        with CaptureQueriesContext(connection) as depois:
+            self.assertEqual(len(self._historico()['compras']), 5)
+        self.assertEqual(len(depois), len(antes))
+
+
+class ListagensEnxutasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        Cliente.objects.create(nome='Maria', cpf='987.654.321-00', email='maria@exemplo.com', observacoes='Prefere armações leves')
+        for _ in range(3):
+            Order.objects.create(customer_name='Cliente', store=cls.store, total_price=Decimal('100.00'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_fields_limita_as_chaves_e_as_colunas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get('/api/clientes/', {'fields': 'id,nome'})
+        self.assertEqual(list(resposta.json()['results'][0]), ['id', 'nome'])
+        self.assertNotIn('observacoes', consultas.captured_queries[-1]['sql'])
+
+    def test_compact_usa_o_serializer_enxuto_sem_consulta_por_linha(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get('/api/orders/', {'compact': '1'})
+        pedidos = resposta.json()['results']
+        self.assertEqual(len(pedidos), 3)
+        self.assertEqual(pedidos[0]['store_name'], 'Loja A')
+        self.assertNotIn('sphere_right', pedidos[0])
+        # Contagem da paginação e a página, com loja e vendedor no mesmo JOIN
+        self.assertEqual(len(consultas), 2)
+
+
+class ClienteAdminTests(TestCase):
+    def setUp(self):
+        self.jose = Cliente.objects.create(nome='José da Silva', cpf='123.456.789-00', telefone='(11) 98888-7777', email='jose@exemplo.com')
+        Cliente.objects.create(nome='Maria', cpf='987.654.321-00', email='maria@exemplo.com')
+        self.client.force_login(User.objects.create_superuser('root', 'root@exemplo.com', 'x', role='admin'))
+
+    def _buscar(self, termo):
+        resposta = self.client.get('/admin/otica_app/cliente/', {'q': termo})
+        self.assertEqual(resposta.status_code, 200)
+        return list(resposta.context['cl'].queryset.values_list('nome', flat=True))
+
+    def test_busca_normaliza_nome_cpf_e_telefone(self):
+        for termo in ('José', 'jose', '123.456.789-00', '12345678900', '(11) 98888', 'jose@exemplo'):
+            self.assertEqual(self._buscar(termo), ['José da Silva'], termo)
+
+
+class EventosLojaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.gerente = User.objects.create_user('gerente', password='x', role='gerente', store=cls.store)
+        cls.product = Product.objects.create(name='Armação', price=Decimal('100.00'), cost=Decimal('40.00'), category=Category.objects.create(name='Categoria de teste'))
+
+    def setUp(self):
+        cache.clear()
+
+    def _usuario(self, **params):
+        request = RequestFactory().get('/api/events/', params)
+        request.user = AnonymousUser()
+        return _usuario_do_stream(request)
+
+    def test_ticket_e_de_uso_unico(self):
+        client = APIClient()
+        self.assertEqual(client.post('/api/events/ticket/').status_code, 401)
+        client.force_authenticate(self.gerente)
+        ticket = client.post('/api/events/ticket/').json()['ticket']
+
+        self.assertEqual(self._usuario(ticket=ticket), self.gerente)
+        self.assertIsNone(self._usuario(ticket=ticket))
+
+    def test_ticket_expirado_ou_jwt_na_url_nao_autenticam(self):
+        with override_settings(EVENTS_TICKET_MAX_AGE=-1):
+            self.assertIsNone(self._usuario(ticket=eventos.emitir_ticket(self.gerente)))
+        self.assertIsNone(self._usuario(token=str(RefreshToken.for_user(self.gerente).access_token)))
+
+    def test_estoque_so_publica_quando_quantidade_ou_situacao_mudam(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            store_product = StoreProduct.objects.create(store=self.store, product=self.product, quantity=10)
+        self.assertEqual(EventoLoja.objects.count(), 1)
+
+        store_product = StoreProduct.objects.get(pk=store_product.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            store_product.save()
+            store_product.reorder_level = 2
+            store_product.save()
+        self.assertEqual(EventoLoja.objects.count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            store_product.quantity = 1
+            store_product.save()
+        evento = EventoLoja.objects.latest('id')
+        self.assertEqual(EventoLoja.objects.count(), 2)
+        self.assertEqual(evento.dados, {'product': self.product.pk, 'quantity': 1, 'stock_status': 'low', 'removed': False})
+
+    def test_limpar_apaga_so_eventos_fora_da_retencao(self):
+        antigo = timezone.now() - timedelta(hours=settings.EVENTS_RETENTION_HOURS + 1)
+        EventoLoja.objects.create(store_id=self.store.pk, tipo='till_opened', criado_em=antigo)
+        recente = EventoLoja.objects.create(store_id=self.store.pk, tipo='till_closed')
+
+        self.assertEqual(eventos.limpar(), 1)
+        self.assertEqual(list(EventoLoja.objects.values_list('pk', flat=True)), [recente.pk])
+
+
+def _somar(a, b):
+    return a + b
+
+
+def _falhar():
+    raise RuntimeError('falhou')
+
+
+@mock.patch.dict(tasks.REGISTRO, {'somar': (_somar, 3), 'falhar': (_falhar, 2)})
+class FilaTarefasTests(TestCase):
+    def test_tarefa_executada_grava_o_resultado(self):
+        job = tasks.enfileirar('somar', 2, b=3)
+        self.assertEqual(tasks.rodar_pendentes(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.resultado, job.tentativas), ('concluida', 5, 1))
+
+    def test_falha_repetida_com_espera_ate_o_maximo(self):
+        job = tasks.enfileirar('falhar')
+        self.assertEqual(tasks.rodar_pendentes(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.tentativas), ('pendente', 1))
+        self.assertGreater(job.agendada_para, timezone.now())
+        # Ainda em espera: o worker não pega de novo
+        self.assertEqual(tasks.rodar_pendentes(), 0)
+
+        Tarefa.objects.filter(pk=job.pk).update(agendada_para=timezone.now())
+        self.assertEqual(tasks.rodar_pendentes(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.tentativas), ('falhou', 2))
+        self.assertIn('RuntimeError', job.erro)
+
+    def test_nome_desconhecido_nao_e_enfileirado(self):
+        with self.assertRaises(tasks.TarefaDesconhecida):
+            tasks.enfileirar('inexistente')
+
+
+@override_settings(TASKS_TIMEOUT=60)
+class RecuperarTravadasTests(TestCase):
+    def _travada(self, tentativas):
+        return Tarefa.objects.create(
+            nome='gerar_relatorios', status='executando', tentativas=tentativas, max_tentativas=3,
+            iniciada_em=timezone.now() - timedelta(minutes=5),
+        )
+
+    def test_recuperacao_conta_como_tentativa(self):
+        primeira = self._travada(tentativas=0)
+        em_andamento = Tarefa.objects.create(nome='gerar_relatorios', status='executando', iniciada_em=timezone.now())
+
+        self.assertEqual(tasks.recuperar_travadas(), (1, 0))
+        primeira.refresh_from_db()
+        em_andamento.refresh_from_db()
+        self.assertEqual((primeira.status, primeira.tentativas), ('pendente', 1))
+        self.assertEqual((em_andamento.status, em_andamento.tentativas), ('executando', 0))
+
+    def test_falha_ao_atingir_o_maximo_de_tentativas(self):
+        ultima = self._travada(tentativas=2)
+
+        self.assertEqual(tasks.recuperar_travadas(), (0, 1))
+        ultima.refresh_from_db()
+        self.assertEqual((ultima.status, ultima.tentativas), ('falhou', 3))
+        self.assertIsNotNone(ultima.concluida_em)
+        self.assertTrue(ultima.erro)
+
+
+class GerarFolhaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.hoje = timezone.localdate()
+
+    def _funcionario(self, nome, cpf):
+        return Funcionario.objects.create(
+            nome=nome, cpf=cpf, cargo='vendedor', data_admissao=date(2020, 1, 1),
+            salario_base=Decimal('2000.00'), comissao_percentual=Decimal('10.00'), store=self.store,
+        )
+
+    def _venda(self, seller, total):
+        Sale.objects.create(
+            store=self.store, seller=seller, customer_name='Cliente', customer_email='c@c.com',
+            customer_phone='1', total_amount=Decimal(total),
+        )
+
+    def _comissao(self, funcionario):
+        return FolhaPagamento.objects.get(funcionario=funcionario, ano=self.hoje.year, mes=self.hoje.month).comissao
+
+    def test_nome_so_conta_para_funcionario_sem_vendedor_vinculado(self):
+        ana, bruno = self._funcionario('Ana Souza', '111.111.111-11'), self._funcionario('Bruno Lima', '222.222.222-22')
+        self._venda(Seller.objects.create(name='Ana Souza', store=self.store, funcionario=ana), '1000.00')
+        self._venda(Seller.objects.create(name='ANA SOUZA', store=self.store), '500.00')
+        self._venda(Seller.objects.create(name='bruno lima', store=self.store), '200.00')
+
+        gerar_folha(self.hoje.year, self.hoje.month)
+
+        self.assertEqual(self._comissao(ana), Decimal('100.00'))
+        self.assertEqual(self._comissao(bruno), Decimal('20.00'))
+
+    def test_folha_paga_nao_e_recalculada(self):
+        ana = self._funcionario('Ana Souza', '111.111.111-11')
+        self._venda(Seller.objects.create(name='Ana Souza', store=self.store, funcionario=ana), '1000.00')
+        FolhaPagamento.objects.create(
+            funcionario=ana, ano=self.hoje.year, mes=self.hoje.month, salario_base=Decimal('2000.00'),
+            comissao=Decimal('0.00'), salario_liquido=Decimal('2000.00'), pago=True,
+        )
+
+        resumo = gerar_folha(self.hoje.year, self.hoje.month)
+
+        self.assertEqual((resumo['geradas'], resumo['ignoradas_pagas']), (0, 1))
+        self.assertEqual(self._comissao(ana), Decimal('0.00'))
+
+
+class ArquivoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Loja A', address='Rua 1')
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        cls.seller = Seller.objects.create(name='Vendedor', store=cls.store)
+        cls.produto = Product.objects.create(
+            name='Armação', price=Decimal('100.00'), cost=Decimal('40.00'),
+            category=Category.objects.create(name='Categoria de teste'),
+        )
+        cls.hoje = timezone.localdate()
+        cls.corte = cls.hoje - timedelta(days=30)
+        antiga = timezone.now() - timedelta(days=60)
+
+        cls.antiga = cls._venda(2, antiga)
+        cls.recente = cls._venda(1, timezone.now())
+        sessao = CashTillSession.objects.create(store=cls.store, opened_by=cls.admin, initial_amount=Decimal('0.00'))
+        cls.caixa_aberto = cls._venda(3, antiga, cash_till_session=sessao)
+        cls.a_receber = cls._venda(4, antiga)
+        ContaReceber.objects.create(
+            descricao='Parcela', tipo='venda', venda=cls.a_receber, valor=Decimal('400.00'),
+            data_vencimento=cls.hoje, store=cls.store,
+        )
+        movimento = StockMovement.objects.create(store=cls.store, product=cls.produto, quantity=5, movement_type='in')
+        StockMovement.objects.filter(pk=movimento.pk).update(created_at=antiga)
+        cls.movimento = movimento
+
+    @classmethod
+    def _venda(cls, itens, quando, **extra):
+        venda = Sale.objects.create(
+            store=cls.store, seller=cls.seller, customer_name='Cliente', customer_email='c@c.com',
+            customer_phone='1', total_amount=Decimal('100.00') * itens, **extra,
+        )
+        SaleItem.objects.create(sale=venda, product=cls.produto, quantity=itens, unit_price=Decimal('100.00'), total_price=Decimal('100.00') * itens)
+        Sale.objects.filter(pk=venda.pk).update(sale_date=quando)
+        return venda
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _relatorios(self):
+        return [
+            self.client.get('/api/reports/sales/', {'store': self.store.pk}).json(),
+            self.client.get('/api/reports/sales/', {'store': self.store.pk, 'start_date': (self.corte - timedelta(days=45)).isoformat()}).json(),
+            self.client.get('/api/reports/products/').json(),
+            self.client.get('/api/reports/dashboard-stats/').json(),
+        ]
+
+    def test_move_so_o_que_pode_ser_arquivado_preservando_ids(self):
+        arquivamento = arquivar(self.corte, tamanho_lote=1)
+
+        self.assertEqual(arquivamento.movidas, {'vendas': 1, 'movimentacoes_estoque': 1, 'fluxos_caixa': 0})
+        self.assertIsNotNone(arquivamento.concluido_em)
+        self.assertEqual(list(ArchivedSale.objects.values_list('pk', flat=True)), [self.antiga.pk])
+        self.assertEqual(ArchivedSaleItem.objects.get().sale_id, self.antiga.pk)
+        self.assertEqual(list(ArchivedStockMovement.objects.values_list('pk', flat=True)), [self.movimento.pk])
+        self.assertEqual(
+            set(Sale.objects.values_list('pk', flat=True)),
+            {self.recente.pk, self.caixa_aberto.pk, self.a_receber.pk},
+        )
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_relatorios_somam_o_arquivo_e_nao_mudam_com_o_arquivamento(self):
+        antes = self._relatorios()
+        self.assertEqual(antes[0], [{'total_sales': 4, 'total_revenue': 1000.0}])
+
+        arquivar(self.corte)
+
+        self.assertEqual(self._relatorios(), antes)
+        self.assertEqual(len(fontes(Sale, self.corte - timedelta(days=1))), 2)
+        self.assertEqual(len(fontes(Sale, self.corte)), 1)
+
+    def test_agregado_do_arquivo_fica_em_cache_ate_o_proximo_arquivamento(self):
+        arquivar(self.corte)
+        contar = lambda: ArchivedSale.objects.count()
+        self.assertEqual(agregado_arquivado('teste', contar), 1)
+
+        Sale.objects.filter(pk=self.a_receber.pk).update(sale_date=timezone.now() - timedelta(days=60))
+        ContaReceber.objects.filter(venda=self.a_receber).delete()
+        self.assertEqual(agregado_arquivado('teste', contar), 1)
+
+        arquivar(self.corte)
+        self.assertEqual(agregado_arquivado('teste', contar), 2)
+
+    def test_corte_invalido_no_comando(self):
+        with self.assertRaises(CommandError):
+            call_command('arquivar_periodos', corte='31/01/2024', stdout=StringIO())
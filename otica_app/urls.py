@@ -12,6 +12,7 @@ router.register(r'clientes', views.ClienteViewSet, basename='cliente')
 router.register(r'fornecedores', views.FornecedorViewSet, basename='fornecedor')
 router.register(r'funcionarios', views.FuncionarioViewSet, basename='funcionario')
 router.register(r'contas-pagar', views.ContaPagarViewSet, basename='conta-pagar')
+router.register(r'contas-pagar-recorrentes', views.ContaPagarRecorrenteViewSet, basename='conta-pagar-recorrente')
 router.register(r'contas-receber', views.ContaReceberViewSet, basename='conta-receber')
 router.register(r'folha-pagamento', views.FolhaPagamentoViewSet, basename='folha-pagamento')
 router.register(r'relatorios-financeiros', views.RelatorioFinanceiroViewSet, basename='relatorio-financeiro')
@@ -36,6 +37,7 @@ urlpatterns = [
 
     # Products
     path('products/', views.ProductListCreateView.as_view(), name='product-list-create'),
+    path('products/search/', views.ProductSearchView.as_view(), name='product-search'),
     path('products/<int:pk>/', views.ProductRetrieveUpdateDestroyView.as_view(), name='product-detail'),
 
     # Sales
@@ -50,6 +52,19 @@ urlpatterns = [
     path('reports/sales/', views.SalesReportView.as_view(), name='sales-report'),
     path('reports/products/', views.ProductsReportView.as_view(), name='products-report'),
     path('reports/dashboard-stats/', views.DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('reports/stock-position/', views.StockPositionView.as_view(), name='stock-position'),
+    path('reports/inventory-valuation/', views.InventoryValuationView.as_view(), name='inventory-valuation'),
+    path('reports/seller-performance/', views.SellerPerformanceView.as_view(), name='seller-performance'),
+
+    # Sincronização incremental do cache do front-end
+    path('sync/<str:recurso>/', views.SyncView.as_view(), name='sync'),
+
+    # Eventos em tempo real (SSE, servido por ASGI)
+    path('events/', views.eventos_loja, name='events'),
+    path('events/ticket/', views.ticket_eventos, name='events-ticket'),
+
+    # Tarefas em segundo plano
+    path('tarefas/<int:pk>/', views.TarefaDetailView.as_view(), name='tarefa-detail'),
     
     # Financial Reports
     path('financeiro/dashboard/', views.dashboard_financeiro, name='dashboard-financeiro'),
@@ -0,0 +1,25 @@
+import calendar
+import re
+import unicodedata
+
+
+def normalizar_texto(valor):
+    """Texto em minúsculas, sem acentos e com espaços simples, para busca"""
+    if not valor:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(valor))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+
+def somente_digitos(valor):
+    """Mantém apenas os dígitos (CPF, telefone, CEP...)"""
+    return re.sub(r'\D', '', valor or '')
+
+
+def somar_meses(data, meses):
+    """Mesma data `meses` meses depois, limitada ao último dia do mês de destino"""
+    indice = data.year * 12 + data.month - 1 + meses
+    ano, mes = divmod(indice, 12)
+    dia = min(data.day, calendar.monthrange(ano, mes + 1)[1])
+    return data.replace(year=ano, month=mes + 1, day=dia)
@@ -0,0 +1,31 @@
+"""
+Marcação de contas vencidas.
+
+O comando atualizar_vencidos (agendado para logo após a meia-noite) passa as
+contas pendentes com vencimento anterior a hoje para 'vencido' com um único
+UPDATE por tabela, apoiado no índice parcial de data_vencimento das
+pendentes. As consultas usam filtro_vencidas para continuar corretas entre
+uma execução e outra.
+"""
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ContaPagar, ContaReceber
+
+
+def filtro_vencidas(hoje):
+    """Contas já marcadas como vencidas ou pendentes com vencimento passado"""
+    return Q(status='vencido') | Q(status='pendente', data_vencimento__lt=hoje)
+
+
+def atualizar_vencidos(hoje=None):
+    """Devolve quantas contas a pagar e a receber passaram para 'vencido'"""
+    hoje = hoje or timezone.localdate()
+    agora = timezone.now()
+    pagar = ContaPagar.objects.filter(status='pendente', data_vencimento__lt=hoje).update(
+        status='vencido', atualizado_em=agora
+    )
+    receber = ContaReceber.objects.filter(status='pendente', data_vencimento__lt=hoje).update(
+        status='vencido', atualizado_em=agora
+    )
+    return pagar, receber
@@ -1,19 +1,50 @@
+import copy
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import status, permissions, generics, viewsets
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Sum, Count, F, DecimalField, ExpressionWrapper
+from django.db.models import Sum, Count, F, Q, DecimalField, ExpressionWrapper
+from django.core.cache import cache
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import User, Store, Product, Seller, Sale, SaleItem, StoreProduct, CashTillSession, Order, Category, Cliente, Fornecedor, ContaPagar, ContaReceber, Funcionario, FolhaPagamento, RelatorioFinanceiro
+from .models import User, Store, Product, Seller, Sale, SaleItem, StoreProduct, StockMovement, CashTillSession, Order, Category, Cliente, Fornecedor, ContaPagar, ContaPagarRecorrente, ContaReceber, RecebimentoConta, SaldoCliente, Funcionario, FolhaPagamento, RelatorioFinanceiro, SellerDailyStats, Tarefa
 from .serializers import (
     UserSerializer, StoreSerializer, ProductSerializer, SellerSerializer,
     SaleSerializer, SaleCreateSerializer, StoreProductSerializer, CashTillSessionSerializer,
-    OrderSerializer, CategorySerializer, ClienteSerializer, FornecedorSerializer, FuncionarioSerializer, ContaPagarSerializer, ContaReceberSerializer, FolhaPagamentoSerializer, RelatorioFinanceiroSerializer
+    OrderSerializer, CategorySerializer, ClienteSerializer, FornecedorSerializer, FuncionarioSerializer, ContaPagarSerializer, ContaPagarRecorrenteSerializer, ContaReceberSerializer, FolhaPagamentoSerializer, RelatorioFinanceiroSerializer, TarefaSerializer,
+    GerarFolhaSerializer, GerarRelatorioSerializer, GerarParcelasSerializer, RegistrarRecebimentoSerializer,
+    RecebimentoContaSerializer, SaldoClienteSerializer, HistoricoCompraSerializer,
+    ClienteListSerializer, OrderListSerializer, FuncionarioListSerializer, requested_fields
 )
 from rest_framework.serializers import ValidationError
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from decimal import Decimal
+from datetime import date
 from rest_framework.decorators import action
+from .stock import stock_on_date, versao_estoque
+from .search import search_clientes, search_products
+from .images import clear_variants, schedule_variants
+from . import eventos
+from .desempenho import AGRUPAMENTOS, desempenho_vendedores
+from .folha import gerar_folha
+from .paralelo import em_paralelo
+from .pedidos import TAMANHO_MAXIMO, TAMANHO_PADRAO, alterados_desde, contagem_por_status, pagina_coluna, removidos_desde
+from .historico import compras_do_cliente, linha_do_tempo_receitas, pedidos_do_cliente
+from .recebiveis import gerar_parcelas
+from .recorrencias import materializar_recorrencias
+from .replica import usar_replica
+from .arquivo import agregado_arquivado, fontes, somar_por
+from .relatorios import TIPOS_EM_SEGUNDO_PLANO, gerar_relatorios
+from .sincronizacao import RECURSOS as RECURSOS_SYNC, TAMANHO_MAXIMO as SYNC_TAMANHO_MAXIMO, TAMANHO_PADRAO as SYNC_TAMANHO_PADRAO, CursorExpirado, sincronizar
+from .tasks import enfileirar, resposta_tarefa
+from .vencimentos import filtro_vencidas
+from .fast_serializers import SaleFastSerializer, StoreProductFastSerializer, fast_list_response
 
 # --- Permissions ---
 
@@ -25,6 +56,41 @@ class IsStoreManager(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user and request.user.role == 'gerente'
 
+# --- Mixins ---
+
+class SparseFieldsetViewMixin:
+    """
+    Leituras enxutas: ?compact=1 troca para `compact_serializer_class` e
+    ?fields=a,b limita as colunas; em ambos os casos o queryset usa .only().
+    """
+    compact_serializer_class = None
+    compact_actions = ('list',)
+
+    def use_compact(self):
+        return (
+            self.compact_serializer_class is not None
+            and self.action in self.compact_actions
+            and self.request.query_params.get('compact') in ('1', 'true')
+        )
+
+    def get_serializer_class(self):
+        if self.use_compact():
+            return self.compact_serializer_class
+        return super().get_serializer_class()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.use_compact():
+            return queryset.only(*self.compact_serializer_class.queryset_only)
+
+        fields = requested_fields(self.request)
+        if fields:
+            model_fields = {f.name for f in queryset.model._meta.concrete_fields}
+            # Campos derivados (ex.: store_name) precisam do objeto completo
+            if fields <= model_fields:
+                return queryset.select_related(None).only(*fields)
+        return queryset
+
 # --- Auth Views ---
 
 @api_view(['POST'])
@@ -176,9 +242,39 @@ class ProductListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         user = self.request.user
         product = serializer.save()
+        if product.image:
+            schedule_variants(product)
         if user.role != 'admin' and user.store:
             StoreProduct.objects.create(store=user.store, product=product, quantity=0)
 
+class ProductSearchView(generics.ListAPIView):
+    """Busca rápida por nome, marca, modelo e código (prefixo), ordenada por relevância"""
+    serializer_class = ProductSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+    max_limit = 50
+
+    def get_queryset(self):
+        return Product.objects.select_related('category')
+
+    def list(self, request, *args, **kwargs):
+        user = request.user
+        queryset = self.get_queryset()
+        if user.role != 'admin':
+            if not user.store:
+                return Response([])
+            # Junção com o estoque da loja, resolvida no banco
+            queryset = queryset.filter(store_products__store=user.store)
+
+        try:
+            limite = max(min(int(request.query_params.get('limit', 20)), self.max_limit), 1)
+        except ValueError:
+            limite = 20
+
+        produtos = search_products(queryset, request.query_params.get('q'), limite)
+        serializer = self.get_serializer(produtos, many=True)
+        return Response(serializer.data)
+
 class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
@@ -189,6 +285,15 @@ class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         context['request'] = self.request
         return context
 
+    def perform_update(self, serializer):
+        image_changed = 'image' in serializer.validated_data
+        product = serializer.save()
+        if image_changed:
+            if product.image:
+                schedule_variants(product)
+            else:
+                clear_variants(product)
+
 # --- StoreProduct Views ---
 
 class StoreProductViewSet(viewsets.ModelViewSet):
@@ -209,16 +314,27 @@ class StoreProductViewSet(viewsets.ModelViewSet):
 
         if store_id:
             queryset = queryset.filter(store_id=store_id)
-        if stock_level:
-            if stock_level == 'low':
-                queryset = queryset.filter(quantity__gt=0, quantity__lt=5)
-            elif stock_level == 'out':
-                queryset = queryset.filter(quantity=0)
-            elif stock_level == 'normal':
-                queryset = queryset.filter(quantity__gte=5)
+        if stock_level in ('low', 'out', 'normal'):
+            queryset = queryset.filter(stock_status=stock_level)
         
         return queryset.select_related('product', 'store')
 
+    def list(self, request, *args, **kwargs):
+        return fast_list_response(self, self.filter_queryset(self.get_queryset()), StoreProductFastSerializer())
+
+    def perform_create(self, serializer):
+        store_product = serializer.save()
+        StockMovement.registrar(store_product.store, store_product.product, store_product.quantity, 'Cadastro no estoque da loja')
+
+    def perform_update(self, serializer):
+        quantidade_anterior = serializer.instance.quantity
+        store_product = serializer.save()
+        StockMovement.registrar(store_product.store, store_product.product, store_product.quantity - quantidade_anterior, 'Ajuste de estoque')
+
+    def perform_destroy(self, instance):
+        StockMovement.registrar(instance.store, instance.product, -instance.quantity, 'Removido do estoque da loja')
+        instance.delete()
+
 # --- Sale Views ---
 
 class SaleListCreateView(generics.ListCreateAPIView):
@@ -255,6 +371,9 @@ class SaleListCreateView(generics.ListCreateAPIView):
 
         return queryset.select_related('seller', 'store').prefetch_related('items__product')
 
+    def list(self, request, *args, **kwargs):
+        return fast_list_response(self, self.filter_queryset(self.get_queryset()), SaleFastSerializer())
+
     def perform_create(self, serializer):
         user = self.request.user
         store = user.store
@@ -283,6 +402,17 @@ class SaleRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
             return Sale.objects.filter(store=user.store)
         return Sale.objects.none()
 
+    def perform_update(self, serializer):
+        anterior = copy.copy(serializer.instance)
+        sale = serializer.save()
+        if (anterior.seller_id, anterior.total_amount) != (sale.seller_id, sale.total_amount):
+            SellerDailyStats.registrar(anterior, sign=-1)
+            SellerDailyStats.registrar(sale)
+
+    def perform_destroy(self, instance):
+        SellerDailyStats.registrar(instance, sign=-1)
+        instance.delete()
+
 # --- Seller Views ---
 
 class SellerListCreateView(generics.ListCreateAPIView):
@@ -333,38 +463,50 @@ class SalesReportView(generics.ListAPIView):
     def get_queryset(self):
         return Sale.objects.none()
 
+    @usar_replica()
     def list(self, request, *args, **kwargs):
         user = request.user
-        queryset = Sale.objects.all()
-
         store_id = self.request.query_params.get('store')
-        if user.role == 'admin':
-            if store_id:
-                queryset = queryset.filter(store_id=store_id)
-        elif user.store:
-            queryset = queryset.filter(store=user.store)
-        else:
-            queryset = Sale.objects.none()
-
         start_date = self.request.query_params.get('start_date')
         end_date = self.request.query_params.get('end_date')
+        try:
+            inicio = date.fromisoformat(start_date) if start_date else None
+        except ValueError:
+            return Response({'error': 'Datas devem estar no formato YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Períodos anteriores ao corte do arquivo somam as vendas arquivadas
+        linhas = []
+        for manager in fontes(Sale, inicio):
+            queryset = manager.all()
+            if user.role == 'admin':
+                if store_id:
+                    queryset = queryset.filter(store_id=store_id)
+            elif user.store:
+                queryset = queryset.filter(store=user.store)
+            else:
+                queryset = queryset.none()
+
+            if start_date:
+                queryset = queryset.filter(sale_date__date__gte=start_date)
+            if end_date:
+                queryset = queryset.filter(sale_date__date__lte=end_date)
+
+            if user.role == 'admin' and not store_id:
+                linhas += queryset.values('store__name').annotate(
+                    total_sales=Count('id'),
+                    total_revenue=Sum('total_amount')
+                ).order_by()
+            else:
+                linhas.append(queryset.aggregate(
+                    total_sales=Count('id'),
+                    total_revenue=Sum('total_amount')
+                ))
 
-        if start_date:
-            queryset = queryset.filter(sale_date__date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(sale_date__date__lte=end_date)
-            
         if user.role == 'admin' and not store_id:
-            data = queryset.values('store__name').annotate(
-                total_sales=Count('id'),
-                total_revenue=Sum('total_amount')
-            ).order_by('-total_revenue')
+            data = sorted(somar_por(linhas, 'store__name'), key=lambda row: row['total_revenue'] or 0, reverse=True)
         else:
-            data = queryset.aggregate(
-                total_sales=Count('id'),
-                total_revenue=Sum('total_amount')
-            )
-            data = [data] if data.get('total_sales') else []
+            data = somar_por(linhas)
+            data = data if data and data[0].get('total_sales') else []
             
         return Response(data)
 
@@ -372,9 +514,10 @@ class ProductsReportView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
+        return self.filtrar(SaleItem.objects.all())
+
+    def filtrar(self, queryset):
         user = self.request.user
-        queryset = SaleItem.objects.select_related('product', 'sale')
-        
         if user.role == 'admin':
             store_id = self.request.query_params.get('store')
             if store_id:
@@ -382,28 +525,37 @@ class ProductsReportView(generics.ListAPIView):
         elif user.store:
             queryset = queryset.filter(sale__store=user.store)
         else:
-            queryset = SaleItem.objects.none()
+            queryset = queryset.none()
             
         return queryset
 
+    def _totais(self, queryset):
+        money = DecimalField(max_digits=14, decimal_places=2)
+        return list(
+            self.filtrar(queryset)
+            .values('product__name')
+            .annotate(
+                quantidade=Sum('quantity'),
+                total=Sum(ExpressionWrapper(F('quantity') * F('unit_price'), output_field=money)),
+            )
+            .order_by()
+        )
+
+    @usar_replica()
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        
-        # Group by product and calculate totals
-        product_stats = {}
-        for item in queryset:
-            product_name = item.product.name
-            if product_name not in product_stats:
-                product_stats[product_name] = {
-                    'product__name': product_name,
-                    'quantity': 0,
-                    'total': 0
-                }
-            product_stats[product_name]['quantity'] += item.quantity
-            product_stats[product_name]['total'] += float(item.quantity * item.unit_price)
-        
-        # Convert to list and sort
-        products_list = list(product_stats.values())
+        # Agrupado por nome do produto no banco; o histórico inteiro inclui o
+        # arquivo, cujo agregado fica em cache até o próximo arquivamento
+        user = request.user
+        escopo = (request.query_params.get('store') or 'all') if user.role == 'admin' else user.store_id
+        quente, *arquivo = fontes(SaleItem)
+        linhas = self._totais(quente)
+        for manager in arquivo:
+            linhas += agregado_arquivado(f'produtos:{escopo}', lambda: self._totais(manager))
+
+        products_list = [
+            {'product__name': row['product__name'], 'quantity': row['quantidade'] or 0, 'total': float(row['total'] or 0)}
+            for row in somar_por(linhas, 'product__name')
+        ]
         top_products = sorted(products_list, key=lambda x: x['quantity'], reverse=True)[:5]
         less_sold_products = sorted(products_list, key=lambda x: x['quantity'])[:5]
 
@@ -417,38 +569,337 @@ class ProductsReportView(generics.ListAPIView):
 class DashboardStatsView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @usar_replica()
     def get(self, request):
         user = request.user
         store_id = request.query_params.get('store')
         
         sales_qs = Sale.objects.all()
         products_qs = StoreProduct.objects.all()
+        # Totais das vendas arquivadas ficam em cache até o próximo arquivamento
+        escopo, filtro_arquivo = 'all', {}
         
         if user.role == 'admin':
             if store_id:
                 sales_qs = sales_qs.filter(store_id=store_id)
                 products_qs = products_qs.filter(store_id=store_id)
+                escopo, filtro_arquivo = store_id, {'store_id': store_id}
         elif user.store:
             sales_qs = sales_qs.filter(store=user.store)
             products_qs = products_qs.filter(store=user.store)
+            escopo, filtro_arquivo = user.store_id, {'store_id': user.store_id}
         else:
             sales_qs = sales_qs.none()
             products_qs = products_qs.none()
-
-        total_revenue = sales_qs.aggregate(total=Sum('total_amount'))['total'] or 0
+            escopo, filtro_arquivo = 'none', {'pk__in': []}
+
+        consultas = {
+            'sales': lambda: sales_qs.aggregate(total_sales=Count('id'), total_revenue=Sum('total_amount')),
+            'archived_sales': lambda: [
+                agregado_arquivado(f'vendas:{escopo}', lambda: arquivo.filter(**filtro_arquivo).aggregate(
+                    total_sales=Count('id'), total_revenue=Sum('total_amount')
+                ))
+                for arquivo in fontes(Sale)[1:]
+            ],
+            'stock': lambda: products_qs.filter(stock_status__in=['low', 'out']).aggregate(
+                low=Count('id', filter=Q(stock_status='low')),
+                out=Count('id', filter=Q(stock_status='out')),
+            ),
+        }
+        if user.role == 'admin' and not store_id:
+            consultas['stores'] = Store.objects.count
+        resultados = em_paralelo(consultas)
+        sales_totals = somar_por([resultados['sales'], *resultados['archived_sales']])[0]
+        stock_totals = resultados['stock']
         
         stats = {
-            'total_sales': sales_qs.count(),
-            'total_revenue': total_revenue,
-            'low_stock_products': products_qs.filter(quantity__lt=5, quantity__gt=0).count(),
-            'out_of_stock_products': products_qs.filter(quantity=0).count()
+            'total_sales': sales_totals['total_sales'],
+            'total_revenue': sales_totals['total_revenue'] or 0,
+            'low_stock_products': stock_totals['low'],
+            'out_of_stock_products': stock_totals['out']
         }
         
-        if user.role == 'admin' and not store_id:
-             stats['total_stores'] = Store.objects.count()
+        if 'stores' in resultados:
+             stats['total_stores'] = resultados['stores']
 
         return Response(stats)
 
+class StockPositionView(generics.GenericAPIView):
+    """Estoque de uma loja no fechamento de uma data, com valorização a custo e a preço de venda"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    @usar_replica()
+    def get(self, request):
+        user = request.user
+        store_id = request.query_params.get('store')
+        if user.role != 'admin':
+            if not user.store:
+                return Response({'error': 'Usuário sem loja associada.'}, status=status.HTTP_400_BAD_REQUEST)
+            store_id = user.store.id
+        if not store_id:
+            return Response({'error': 'O parâmetro store é obrigatório.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            store_id = int(store_id)
+        except ValueError:
+            return Response({'error': 'O parâmetro store deve ser o ID numérico da loja.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        date_param = request.query_params.get('date')
+        try:
+            data = date.fromisoformat(date_param) if date_param else timezone.localdate()
+        except ValueError:
+            return Response({'error': 'Data inválida, use o formato AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        posicao = stock_on_date(store_id, data)
+        products = Product.objects.filter(id__in=posicao.keys()).values('id', 'name', 'code', 'cost', 'price')
+
+        items = []
+        total_cost = Decimal('0.00')
+        total_price = Decimal('0.00')
+        for product in products:
+            quantity = posicao[product['id']]
+            cost_value = product['cost'] * quantity
+            price_value = product['price'] * quantity
+            total_cost += cost_value
+            total_price += price_value
+            items.append({
+                'product': product['id'],
+                'product_name': product['name'],
+                'product_code': product['code'],
+                'quantity': quantity,
+                'cost_value': cost_value,
+                'price_value': price_value,
+            })
+        items.sort(key=lambda item: item['product_name'])
+
+        return Response({
+            'store': int(store_id),
+            'date': data,
+            'total_quantity': sum(item['quantity'] for item in items),
+            'total_cost_value': total_cost,
+            'total_price_value': total_price,
+            'items': items,
+        })
+
+class InventoryValuationView(generics.GenericAPIView):
+    """Valorização do estoque atual por loja (quantidade x custo e x preço), calculada no banco"""
+    permission_classes = [permissions.IsAuthenticated]
+    cache_timeout = 300
+
+    @usar_replica()
+    def get(self, request):
+        user = request.user
+        queryset = StoreProduct.objects.all()
+        store_id = request.query_params.get('store')
+
+        if user.role == 'admin':
+            if store_id:
+                try:
+                    store_id = int(store_id)
+                except ValueError:
+                    return Response({'error': 'O parâmetro store deve ser o ID numérico da loja.'}, status=status.HTTP_400_BAD_REQUEST)
+                queryset = queryset.filter(store_id=store_id)
+        elif user.store:
+            store_id = user.store.id
+            queryset = queryset.filter(store=user.store)
+        else:
+            return Response([])
+
+        # Vendas, movimentações e edições de produto mudam a versão e invalidam o cache
+        cache_key = f'inventory-valuation:{versao_estoque()}:{store_id or "all"}'
+        data = cache.get(cache_key)
+        if data is None:
+            money = DecimalField(max_digits=14, decimal_places=2)
+            data = list(
+                queryset.filter(quantity__gt=0)
+                .values('store_id', 'store__name')
+                .annotate(
+                    total_quantity=Sum('quantity'),
+                    cost_value=Sum(ExpressionWrapper(F('quantity') * F('product__cost'), output_field=money)),
+                    price_value=Sum(ExpressionWrapper(F('quantity') * F('product__price'), output_field=money)),
+                )
+                .order_by('store__name')
+            )
+            cache.set(cache_key, data, self.cache_timeout)
+
+        return Response(data)
+
+
+class SellerPerformanceView(generics.GenericAPIView):
+    """
+    Ranking de vendedores no período (vendas, faturamento, ticket médio e itens por venda),
+    lido dos totais diários em SellerDailyStats. ?group_by=day|week|month quebra por período.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @usar_replica()
+    def get(self, request):
+        user = request.user
+        queryset = SellerDailyStats.objects.all()
+
+        if user.role == 'admin':
+            store_id = request.query_params.get('store')
+            if store_id:
+                try:
+                    store_id = int(store_id)
+                except ValueError:
+                    return Response({'error': 'O parâmetro store deve ser o ID numérico da loja.'}, status=status.HTTP_400_BAD_REQUEST)
+                queryset = queryset.filter(store_id=store_id)
+        elif user.store:
+            queryset = queryset.filter(store=user.store)
+        else:
+            return Response([])
+
+        hoje = timezone.localdate()
+        try:
+            start_date = date.fromisoformat(request.query_params.get('start_date') or hoje.replace(day=1).isoformat())
+            end_date = date.fromisoformat(request.query_params.get('end_date') or hoje.isoformat())
+        except ValueError:
+            return Response({'error': 'Datas devem estar no formato YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = request.query_params.get('group_by')
+        if group_by and group_by not in AGRUPAMENTOS:
+            return Response({'error': 'group_by deve ser day, week ou month'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = queryset.filter(date__gte=start_date, date__lte=end_date)
+        return Response(desempenho_vendedores(queryset, group_by))
+
+
+# --- Tarefas ---
+
+class TarefaDetailView(generics.RetrieveAPIView):
+    """Consulta do andamento de uma tarefa em segundo plano"""
+    serializer_class = TarefaSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'admin':
+            return Tarefa.objects.all()
+        return Tarefa.objects.filter(criado_por=user)
+
+
+# --- Sincronização incremental ---
+
+class SyncView(generics.GenericAPIView):
+    """
+    Alterações de products, stock, clientes ou sellers desde ?cursor=.
+    Sem cursor devolve a carga completa; repita com o cursor recebido enquanto
+    has_more for verdadeiro. 410 indica cursor expirado (refazer a carga).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, recurso):
+        if recurso not in RECURSOS_SYNC:
+            return Response({'error': f'Recurso inválido. Use: {", ".join(RECURSOS_SYNC)}.'}, status=status.HTTP_404_NOT_FOUND)
+
+        user = request.user
+        if user.role == 'admin':
+            store_id = request.query_params.get('store') or None
+            if store_id is not None:
+                try:
+                    store_id = int(store_id)
+                except ValueError:
+                    return Response({'error': 'O parâmetro store deve ser o ID numérico da loja.'}, status=status.HTTP_400_BAD_REQUEST)
+        elif user.store_id:
+            store_id = user.store_id
+        else:
+            return Response({'error': 'Usuário sem loja associada.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            tamanho = min(int(request.query_params.get('limit', SYNC_TAMANHO_PADRAO)), SYNC_TAMANHO_MAXIMO)
+            if tamanho < 1:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'limit deve ser um inteiro positivo'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            data = sincronizar(recurso, request, store_id, request.query_params.get('cursor'), tamanho)
+        except CursorExpirado as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_410_GONE)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
+# --- Eventos em tempo real ---
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def ticket_eventos(request):
+    """Ticket de uso único para abrir /api/events/?ticket= (o EventSource não envia o JWT)"""
+    return Response({
+        'ticket': eventos.emitir_ticket(request.user),
+        'expires_in': settings.EVENTS_TICKET_MAX_AGE,
+    })
+
+
+def _usuario_do_stream(request):
+    """Ticket de uso único em ?ticket=, JWT no Authorization ou sessão"""
+    ticket = request.GET.get('ticket')
+    if ticket:
+        return eventos.usuario_do_ticket(ticket)
+    autenticador = JWTAuthentication()
+    try:
+        resultado = autenticador.authenticate(request)
+        if resultado is not None:
+            return resultado[0]
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return request.user if request.user.is_authenticated else None
+
+
+async def eventos_loja(request):
+    """
+    Stream SSE dos eventos da loja do usuário (sale_created, stock_changed,
+    order_status_changed, till_opened, till_closed). Administradores recebem
+    todas as lojas ou filtram com ?store=. Só funciona servido por ASGI; em
+    produção /api/events/ vai para o serviço otica-eventos (uvicorn, 1 worker).
+
+    O navegador autentica com ?ticket= (POST /api/events/ticket/). O ticket é
+    consumido na abertura: quando a conexão cai, o cliente pede outro e reabre
+    com ?last_event_id= para receber o que perdeu.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método não permitido.'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'O stream de eventos requer o servidor ASGI (otica_backend.asgi).'}, status=501)
+
+    user = await sync_to_async(_usuario_do_stream)(request)
+    if user is None:
+        return JsonResponse({'error': 'Autenticação necessária.'}, status=401)
+
+    if user.role == 'admin':
+        store_id = request.GET.get('store') or None
+        if store_id is not None:
+            try:
+                store_id = int(store_id)
+            except ValueError:
+                return JsonResponse({'error': 'Loja inválida.'}, status=400)
+    elif user.store_id:
+        store_id = user.store_id
+    else:
+        return JsonResponse({'error': 'Usuário sem loja associada.'}, status=403)
+
+    ultimo_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        ultimo_id = int(ultimo_id) if ultimo_id else None
+    except ValueError:
+        ultimo_id = None
+
+    response = StreamingHttpResponse(
+        eventos.stream(
+            store_id,
+            ultimo_id,
+            heartbeat=settings.EVENTS_HEARTBEAT,
+            duracao_maxima=settings.EVENTS_STREAM_MAX_AGE,
+        ),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # --- Cash Till Views ---
 
 class CashTillSessionViewSet(viewsets.ViewSet):
@@ -495,7 +946,12 @@ class CashTillSessionViewSet(viewsets.ViewSet):
     def open_session(self, request):
         serializer = CashTillSessionSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save()
+            session = serializer.save()
+            eventos.publicar(session.store_id, 'till_opened', {
+                'id': session.id,
+                'opened_by': session.opened_by_id,
+                'initial_amount': session.initial_amount,
+            })
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -528,6 +984,12 @@ class CashTillSessionViewSet(viewsets.ViewSet):
         session.notes = request.data.get('notes', '')
         session.status = 'fechado'
         session.save()
+        eventos.publicar(session.store_id, 'till_closed', {
+            'id': session.id,
+            'closed_by': session.closed_by_id,
+            'final_amount_calculated': session.final_amount_calculated,
+            'difference': session.difference,
+        })
 
         serializer = CashTillSessionSerializer(session)
         return Response(serializer.data)
@@ -544,22 +1006,29 @@ class CashTillSessionViewSet(viewsets.ViewSet):
 
 # --- Order Views ---
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
+    compact_serializer_class = OrderListSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
+    def pedidos_da_loja(self):
+        """Pedidos visíveis ao usuário, sem os filtros da listagem"""
         user = self.request.user
         if user.role == 'admin':
-            queryset = Order.objects.all()
-        elif user.store:
-            queryset = Order.objects.filter(store=user.store)
-        else:
-            queryset = Order.objects.none()
+            return Order.objects.all()
+        if user.store:
+            return Order.objects.filter(store=user.store)
+        return Order.objects.none()
+
+    def get_queryset(self):
+        queryset = self.pedidos_da_loja()
 
         status = self.request.query_params.get('status')
         if status:
             queryset = queryset.filter(status=status)
+        cliente = self.request.query_params.get('cliente')
+        if cliente:
+            queryset = queryset.filter(cliente_id=cliente)
             
         return queryset.select_related('seller', 'store')
 
@@ -575,14 +1044,141 @@ class OrderViewSet(viewsets.ModelViewSet):
             except Store.DoesNotExist:
                 raise ValidationError({'store': 'Loja inválida.'})
 
-        serializer.save(store=store)
+        order = serializer.save(store=store)
+        self.publicar_status(order, None)
+
+    def perform_update(self, serializer):
+        status_anterior = serializer.instance.status
+        order = serializer.save()
+        if order.status != status_anterior:
+            self.publicar_status(order, status_anterior)
+
+    def publicar_status(self, order, status_anterior):
+        eventos.publicar(order.store_id, 'order_status_changed', {
+            'id': order.id,
+            'customer_name': order.customer_name,
+            'status': order.status,
+            'previous_status': status_anterior,
+        })
+
+    @action(detail=False, methods=['get'])
+    def board(self, request):
+        """
+        Quadro por status: contagens e primeira página de cada coluna.
+        ?status=&cursor= pagina uma coluna; ?since=<server_time anterior> traz só os pedidos
+        alterados (changed) e os ids dos excluídos (removed).
+        """
+        # ?status= aqui escolhe a coluna paginada; as contagens são sempre de todas
+        queryset = self.pedidos_da_loja().select_related('seller', 'store')
+        store_id = request.user.store_id if request.user.role != 'admin' else None
+        if request.user.role == 'admin' and request.query_params.get('store'):
+            try:
+                store_id = int(request.query_params['store'])
+            except ValueError:
+                return Response({'error': 'store deve ser o ID numérico da loja'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(store_id=store_id)
+        queryset = queryset.only(*OrderListSerializer.queryset_only)
+
+        coluna = request.query_params.get('status')
+        if coluna and coluna not in dict(Order.STATUS_CHOICES):
+            return Response({'error': f'status deve ser um de: {", ".join(dict(Order.STATUS_CHOICES))}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            tamanho = min(max(int(request.query_params.get('page_size', TAMANHO_PADRAO)), 1), TAMANHO_MAXIMO)
+        except ValueError:
+            tamanho = TAMANHO_PADRAO
+
+        server_time = timezone.now()
+        data = {'server_time': server_time, 'counts': contagem_por_status(queryset)}
+
+        since = request.query_params.get('since')
+        if since:
+            try:
+                # None para formato inválido; ValueError para data inexistente (mês 13)
+                momento = parse_datetime(since)
+            except ValueError:
+                momento = None
+            if momento is None:
+                return Response({'error': 'since deve ser uma data/hora ISO 8601'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(momento):
+                momento = timezone.make_aware(momento)
+            try:
+                # Usuário sem loja não vê pedido algum, nem exclusões
+                visivel = request.user.role == 'admin' or store_id is not None
+                data['removed'] = removidos_desde(momento, store_id) if visivel else []
+            except CursorExpirado as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_410_GONE)
+            data['changed'] = OrderListSerializer(alterados_desde(queryset, momento), many=True).data
+            return Response(data)
+
+        colunas = [coluna] if coluna else [valor for valor, _ in Order.STATUS_CHOICES]
+        data['columns'] = {}
+        for valor in colunas:
+            try:
+                pedidos, proximo = pagina_coluna(queryset, valor, request.query_params.get('cursor') if coluna else None, tamanho)
+            except ValueError as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            data['columns'][valor] = {
+                'results': OrderListSerializer(pedidos, many=True).data,
+                'next_cursor': proximo,
+            }
+        return Response(data)
 
 # --- Cliente Views ---
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Cliente.objects.all().order_by('-criado_em')
     serializer_class = ClienteSerializer
+    compact_serializer_class = ClienteListSerializer
+    compact_actions = ('list', 'buscar')
     permission_classes = [permissions.IsAuthenticated]
+    max_resultados_busca = 10
+
+    def get_queryset(self):
+        queryset = Cliente.objects.all().order_by('-criado_em')
+        termo = self.request.query_params.get('q')
+        if termo:
+            queryset = search_clientes(queryset, termo)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def buscar(self, request):
+        """Melhores correspondências para o termo (CPF, telefone ou nome) sem paginação"""
+        termo = request.query_params.get('q', '')
+        clientes = self.filter_queryset(search_clientes(Cliente.objects.all(), termo))[:self.max_resultados_busca]
+        serializer = self.get_serializer(clientes, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def historico(self, request, pk=None):
+        """
+        Compras, pedidos e receitas do cliente em um número fixo de consultas.
+        Usuários de loja veem só o histórico da própria loja. ?limite= (padrão 20) por seção.
+        """
+        cliente = self.get_object()
+        try:
+            limite = min(max(int(request.query_params.get('limite', 20)), 1), 100)
+        except ValueError:
+            limite = 20
+        store = None if request.user.role == 'admin' else request.user.store
+        if request.user.role != 'admin' and store is None:
+            return Response({'error': 'Usuário sem loja associada'}, status=status.HTTP_403_FORBIDDEN)
+
+        saldo = SaldoCliente.objects.filter(cliente=cliente).first() or SaldoCliente(cliente=cliente)
+        return Response({
+            'cliente': ClienteSerializer(cliente, context=self.get_serializer_context()).data,
+            'saldo': SaldoClienteSerializer(saldo).data,
+            'compras': HistoricoCompraSerializer(compras_do_cliente(cliente, store, limite), many=True).data,
+            'pedidos': OrderSerializer(pedidos_do_cliente(cliente, store)[:limite], many=True).data,
+            'receitas': linha_do_tempo_receitas(cliente, store),
+        })
+
+    @action(detail=True, methods=['get'])
+    def saldo(self, request, pk=None):
+        """Quanto o cliente deve em contas a receber (leitura de uma linha de SaldoCliente)"""
+        cliente = self.get_object()
+        saldo = SaldoCliente.objects.filter(cliente=cliente).first() or SaldoCliente(cliente=cliente)
+        return Response(SaldoClienteSerializer(saldo).data)
 
 # --- Views para Gestão Financeira ---
 
@@ -604,8 +1200,9 @@ class FornecedorViewSet(viewsets.ModelViewSet):
             return Fornecedor.objects.filter(id__in=fornecedores_ids, ativo=True).order_by('nome')
         return Fornecedor.objects.none()
 
-class FuncionarioViewSet(viewsets.ModelViewSet):
+class FuncionarioViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = FuncionarioSerializer
+    compact_serializer_class = FuncionarioListSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -675,6 +1272,53 @@ class ContaPagarViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(conta)
         return Response(serializer.data)
 
+class ContaPagarRecorrenteViewSet(viewsets.ModelViewSet):
+    serializer_class = ContaPagarRecorrenteSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = ContaPagarRecorrente.objects.select_related('store', 'fornecedor')
+        
+        if user.role != 'admin' and user.store:
+            queryset = queryset.filter(store=user.store)
+        
+        ativo = self.request.query_params.get('ativo')
+        tipo = self.request.query_params.get('tipo')
+        if ativo is not None:
+            queryset = queryset.filter(ativo=ativo.lower() == 'true')
+        if tipo:
+            queryset = queryset.filter(tipo=tipo)
+        
+        return queryset
+
+    def perform_create(self, serializer):
+        user = self.request.user
+        if user.role != 'admin' and user.store:
+            serializer.save(store=user.store)
+        else:
+            serializer.save()
+
+    @action(detail=False, methods=['post'])
+    def gerar(self, request):
+        """Gera as contas dos próximos `meses` meses (padrão 3) para as recorrências visíveis ao usuário"""
+        try:
+            meses = int(request.data.get('meses', 3))
+        except (TypeError, ValueError):
+            meses = 0
+        if not 1 <= meses <= 24:
+            return Response({'error': 'meses deve estar entre 1 e 24'}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        store_ids = None
+        if user.role != 'admin':
+            if not user.store:
+                return Response({'error': 'Usuário sem loja associada'}, status=status.HTTP_403_FORBIDDEN)
+            store_ids = [user.store_id]
+
+        criadas = materializar_recorrencias(meses, store_ids=store_ids)
+        return Response({'criadas': criadas})
+
 class ContaReceberViewSet(viewsets.ModelViewSet):
     serializer_class = ContaReceberSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -715,18 +1359,42 @@ class ContaReceberViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def marcar_recebido(self, request, pk=None):
+        """Lança um recebimento; `valor` menor que o restante registra um pagamento parcial"""
         conta = self.get_object()
-        valor_recebido = request.data.get('valor_recebido', conta.valor)
-        data_recebimento = request.data.get('data_recebimento', timezone.now().date())
-        
-        conta.valor_recebido = valor_recebido
-        conta.data_recebimento = data_recebimento
-        conta.status = 'recebido'
-        conta.save()
+        params = RegistrarRecebimentoSerializer(data=request.data, context={'conta': conta})
+        params.is_valid(raise_exception=True)
         
+        conta.registrar_recebimento(usuario=request.user, **params.validated_data)
         serializer = self.get_serializer(conta)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def recebimentos(self, request, pk=None):
+        conta = self.get_object()
+        serializer = RecebimentoContaSerializer(conta.recebimentos.select_related('criado_por'), many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def gerar_parcelas(self, request):
+        """Cria todas as parcelas mensais de uma venda de uma vez"""
+        params = GerarParcelasSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        dados = params.validated_data
+
+        user = request.user
+        if user.role != 'admin':
+            if not user.store:
+                return Response({'error': 'Usuário sem loja associada'}, status=status.HTTP_403_FORBIDDEN)
+            if dados.get('venda') and dados['venda'].store_id != user.store_id:
+                return Response({'venda': 'Venda de outra loja.'}, status=status.HTTP_400_BAD_REQUEST)
+            dados['store'] = user.store
+        elif not dados.get('store'):
+            return Response({'store': 'Este campo é obrigatório para administradores.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        contas = gerar_parcelas(**dados)
+        serializer = self.get_serializer(contas, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 class FolhaPagamentoViewSet(viewsets.ModelViewSet):
     serializer_class = FolhaPagamentoSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -767,6 +1435,26 @@ class FolhaPagamentoViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(folha)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def gerar(self, request):
+        """Gera a folha do mês para os funcionários ativos, com comissão sobre as vendas"""
+        params = GerarFolhaSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        dados = params.validated_data
+
+        user = request.user
+        if user.role != 'admin':
+            if not user.store:
+                return Response({'error': 'Usuário sem loja associada'}, status=status.HTTP_403_FORBIDDEN)
+            store_ids = [user.store_id]
+        elif dados.get('store'):
+            store_ids = [dados['store'].id]
+        else:
+            store_ids = None
+
+        resumo = gerar_folha(dados['ano'], dados['mes'], store_ids)
+        return Response(resumo)
+
 class RelatorioFinanceiroViewSet(viewsets.ModelViewSet):
     serializer_class = RelatorioFinanceiroSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -787,88 +1475,111 @@ class RelatorioFinanceiroViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
 
+    @action(detail=False, methods=['post'])
+    def gerar(self, request):
+        """
+        Calcula os relatórios a partir de vendas, contas e folha.
+        Períodos trimestrais e anuais rodam em segundo plano (202 + tarefa).
+        """
+        params = GerarRelatorioSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        dados = params.validated_data
+
+        user = request.user
+        if user.role != 'admin':
+            if not user.store:
+                return Response({'error': 'Usuário sem loja associada'}, status=status.HTTP_403_FORBIDDEN)
+            store_ids = [user.store_id]
+        elif dados.get('store'):
+            store_ids = [dados['store'].id]
+        else:
+            store_ids = None
+
+        if dados['tipo'] in TIPOS_EM_SEGUNDO_PLANO:
+            job = enfileirar(
+                'gerar_relatorios_financeiros', dados['tipo'],
+                dados['data_inicio'].isoformat(), dados['data_fim'].isoformat(), store_ids,
+                criado_por=user,
+            )
+            return resposta_tarefa(request, job)
+
+        novos, alterados = gerar_relatorios(dados['tipo'], dados['data_inicio'], dados['data_fim'], store_ids)
+        serializer = self.get_serializer(novos + alterados, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED if novos else status.HTTP_200_OK)
+
 # --- Views para Dashboards e Relatórios ---
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@usar_replica()
 def dashboard_financeiro(request):
     """Dashboard com resumo financeiro"""
     user = request.user
-    hoje = timezone.now().date()
+    hoje = timezone.localdate()
     
     # Filtro por loja
     if user.role != 'admin' and user.store:
         store_filter = {'store': user.store}
+        folha_filter = {'funcionario__store': user.store}
+        recebimento_filter = {'conta__store': user.store}
     else:
         store_filter = {}
+        folha_filter = {}
+        recebimento_filter = {}
     
     # Período (mês atual)
     mes_atual = hoje.month
     ano_atual = hoje.year
+
+    def total(queryset, campo):
+        return queryset.aggregate(total=Sum(campo))['total'] or 0
+
+    # Consultas independentes, executadas em paralelo
+    resultados = em_paralelo({
+        # Receitas do mês
+        'receitas_vendas': lambda: total(Sale.objects.filter(
+            sale_date__month=mes_atual,
+            sale_date__year=ano_atual,
+            **store_filter
+        ), 'total_amount'),
+        # Recebimentos (inclusive parciais) lançados no mês
+        'receitas_servicos': lambda: total(RecebimentoConta.objects.filter(
+            conta__tipo='servico',
+            data_recebimento__month=mes_atual,
+            data_recebimento__year=ano_atual,
+            **recebimento_filter
+        ), 'valor'),
+        # Despesas do mês
+        'despesas_fornecedores': lambda: total(ContaPagar.objects.filter(
+            tipo='fornecedor',
+            data_pagamento__month=mes_atual,
+            data_pagamento__year=ano_atual,
+            status='pago',
+            **store_filter
+        ), 'valor_pago'),
+        'despesas_funcionarios': lambda: total(FolhaPagamento.objects.filter(
+            ano=ano_atual,
+            mes=mes_atual,
+            pago=True,
+            **folha_filter
+        ), 'salario_liquido'),
+        # Contas vencidas
+        'contas_pagar_vencidas': lambda: ContaPagar.objects.filter(filtro_vencidas(hoje), **store_filter).count(),
+        'contas_receber_vencidas': lambda: ContaReceber.objects.filter(filtro_vencidas(hoje), **store_filter).count(),
+        # Funcionários
+        'total_funcionarios': lambda: Funcionario.objects.filter(ativo=True, **store_filter).count(),
+        # Folha do mês
+        'folha_pagamento_mes': lambda: total(FolhaPagamento.objects.filter(
+            ano=ano_atual,
+            mes=mes_atual,
+            **folha_filter
+        ), 'salario_liquido'),
+        # Fornecedores ativos
+        'fornecedores_ativos': lambda: Fornecedor.objects.filter(ativo=True).count(),
+    })
     
-    # Receitas do mês
-    receitas_vendas = Sale.objects.filter(
-        sale_date__month=mes_atual,
-        sale_date__year=ano_atual,
-        **store_filter
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    receitas_servicos = ContaReceber.objects.filter(
-        tipo='servico',
-        data_recebimento__month=mes_atual,
-        data_recebimento__year=ano_atual,
-        status='recebido',
-        **store_filter
-    ).aggregate(total=Sum('valor_recebido'))['total'] or 0
-    
-    receita_total = receitas_vendas + receitas_servicos
-    
-    # Despesas do mês
-    despesas_fornecedores = ContaPagar.objects.filter(
-        tipo='fornecedor',
-        data_pagamento__month=mes_atual,
-        data_pagamento__year=ano_atual,
-        status='pago',
-        **store_filter
-    ).aggregate(total=Sum('valor_pago'))['total'] or 0
-    
-    despesas_funcionarios = FolhaPagamento.objects.filter(
-        ano=ano_atual,
-        mes=mes_atual,
-        pago=True,
-        funcionario__store__in=Store.objects.filter(**store_filter) if store_filter else Store.objects.all()
-    ).aggregate(total=Sum('salario_liquido'))['total'] or 0
-    
-    despesa_total = despesas_fornecedores + despesas_funcionarios
-    
-    # Contas vencidas
-    contas_pagar_vencidas = ContaPagar.objects.filter(
-        data_vencimento__lt=hoje,
-        status='pendente',
-        **store_filter
-    ).count()
-    
-    contas_receber_vencidas = ContaReceber.objects.filter(
-        data_vencimento__lt=hoje,
-        status='pendente',
-        **store_filter
-    ).count()
-    
-    # Funcionários
-    total_funcionarios = Funcionario.objects.filter(
-        ativo=True,
-        **store_filter
-    ).count()
-    
-    # Folha do mês
-    folha_pagamento_mes = FolhaPagamento.objects.filter(
-        ano=ano_atual,
-        mes=mes_atual,
-        funcionario__store__in=Store.objects.filter(**store_filter) if store_filter else Store.objects.all()
-    ).aggregate(total=Sum('salario_liquido'))['total'] or 0
-    
-    # Fornecedores ativos
-    fornecedores_ativos = Fornecedor.objects.filter(ativo=True).count()
+    receita_total = resultados['receitas_vendas'] + resultados['receitas_servicos']
+    despesa_total = resultados['despesas_fornecedores'] + resultados['despesas_funcionarios']
     
     # Cálculos
     lucro_bruto = receita_total - despesa_total
@@ -879,21 +1590,22 @@ def dashboard_financeiro(request):
         'total_despesas': despesa_total,
         'lucro_bruto': lucro_bruto,
         'margem_lucro': round(margem_lucro, 2),
-        'contas_pagar_vencidas': contas_pagar_vencidas,
-        'contas_receber_vencidas': contas_receber_vencidas,
-        'total_funcionarios': total_funcionarios,
-        'folha_pagamento_mes': folha_pagamento_mes,
-        'fornecedores_ativos': fornecedores_ativos,
+        'contas_pagar_vencidas': resultados['contas_pagar_vencidas'],
+        'contas_receber_vencidas': resultados['contas_receber_vencidas'],
+        'total_funcionarios': resultados['total_funcionarios'],
+        'folha_pagamento_mes': resultados['folha_pagamento_mes'],
+        'fornecedores_ativos': resultados['fornecedores_ativos'],
     }
     
     return Response(data)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@usar_replica()
 def resumo_contas(request):
     """Resumo de contas a pagar e receber"""
     user = request.user
-    hoje = timezone.now().date()
+    hoje = timezone.localdate()
     
     # Filtro por loja
     if user.role != 'admin' and user.store:
@@ -901,31 +1613,33 @@ def resumo_contas(request):
     else:
         store_filter = {}
     
+    # Somam o que falta pagar/receber: contas com pagamento parcial entram pelo restante
+    a_pagar = Sum(F('valor') - F('valor_pago'))
+    a_receber = Sum(F('valor') - F('valor_recebido'))
+    
     # Contas a pagar
     contas_pagar_pendentes = ContaPagar.objects.filter(
         status='pendente',
         data_vencimento__gte=hoje,
         **store_filter
-    ).aggregate(total=Sum('valor'))['total'] or 0
+    ).aggregate(total=a_pagar)['total'] or 0
     
     contas_pagar_vencidas = ContaPagar.objects.filter(
-        status='pendente',
-        data_vencimento__lt=hoje,
+        filtro_vencidas(hoje),
         **store_filter
-    ).aggregate(total=Sum('valor'))['total'] or 0
+    ).aggregate(total=a_pagar)['total'] or 0
     
     # Contas a receber
     contas_receber_pendentes = ContaReceber.objects.filter(
         status='pendente',
         data_vencimento__gte=hoje,
         **store_filter
-    ).aggregate(total=Sum('valor'))['total'] or 0
+    ).aggregate(total=a_receber)['total'] or 0
     
     contas_receber_vencidas = ContaReceber.objects.filter(
-        status='pendente',
-        data_vencimento__lt=hoje,
+        filtro_vencidas(hoje),
         **store_filter
-    ).aggregate(total=Sum('valor'))['total'] or 0
+    ).aggregate(total=a_receber)['total'] or 0
     
     data = {
         'contas_pagar_pendentes': contas_pagar_pendentes,
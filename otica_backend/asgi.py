@@ -1,5 +1,11 @@
 """
 ASGI config for otica_backend project.
+
+Serve a API inteira, incluindo o stream de eventos em /api/events/:
+
+    uvicorn otica_backend.asgi:application --workers 1
+
+O broker de eventos é local ao processo, por isso um único worker.
 """
 
 import os
@@ -8,4 +14,4 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'otica_backend.settings')
 
-application = get_asgi_application() 
\ No newline at end of file
+application = get_asgi_application()
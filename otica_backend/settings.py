@@ -32,11 +32,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'otica_app.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'otica_app.replica.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -60,6 +62,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'otica_backend.wsgi.application'
+# Necessário para /api/events/ (uvicorn otica_backend.asgi:application)
+ASGI_APPLICATION = 'otica_backend.asgi.application'
 
 # Database
 DATABASES = {
@@ -69,6 +73,22 @@ DATABASES = {
     }
 }
 
+# Réplica de leitura para relatórios e dashboards (otica_app/replica.py).
+# Para testar localmente com dois SQLite: rode as migrações, copie o arquivo
+# (cp db.sqlite3 db_replica.sqlite3) e exporte DB_REPLICA_NAME=db_replica.sqlite3;
+# as telas de relatório passam a mostrar o conteúdo da cópia.
+if os.environ.get('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / os.environ['DB_REPLICA_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['otica_app.replica.RoteadorReplica']
+REPLICA_DATABASE_ALIAS = 'replica'
+# Segundos em que o usuário lê do primário depois de uma escrita
+REPLICA_STICKY_SECONDS = 10
+
 # Custom User Model
 AUTH_USER_MODEL = 'otica_app.User'
 
@@ -102,6 +122,29 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Compressão das respostas JSON da API (brotli se instalado, senão gzip)
+API_COMPRESSION_MIN_SIZE = 1024
+
+# Fila de tarefas (python manage.py rodar_tarefas). True executa no próprio processo após o commit
+TASKS_EAGER = False
+TASKS_TIMEOUT = 30 * 60
+
+# Stream de eventos por loja: intervalo do heartbeat e duração de cada conexão (segundos)
+EVENTS_HEARTBEAT = 15
+EVENTS_STREAM_MAX_AGE = 5 * 60
+# Validade (s) do ticket de uso único que autentica a abertura do stream (?ticket=)
+EVENTS_TICKET_MAX_AGE = 60
+# Intervalo (s) entre as leituras de EventoLoja pelo processo ASGI e horas de retenção dos eventos
+EVENTS_POLL_INTERVAL = 1
+EVENTS_RETENTION_HOURS = 24
+
+# Threads para as consultas independentes dos dashboards (0 executa em sequência).
+# Cada thread mantém uma conexão própria com o banco.
+REPORT_QUERY_WORKERS = 4
+
+# Dias que as marcas de exclusão da sincronização incremental são mantidas (comando limpar_exclusoes)
+SYNC_TOMBSTONE_DAYS = 90
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -116,6 +159,11 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # FastJSONRenderer usa orjson se instalado; troque por rest_framework.renderers.JSONRenderer para voltar ao padrão
+    'DEFAULT_RENDERER_CLASSES': [
+        'otica_app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # JWT Settings
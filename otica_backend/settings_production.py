@@ -6,6 +6,8 @@ from pathlib import Path
 import os
 from datetime import timedelta
 
+from decouple import config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,11 +39,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'otica_app.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'otica_app.replica.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -65,19 +69,64 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'otica_backend.wsgi.application'
+# Necessário para /api/events/ (uvicorn otica_backend.asgi:application)
+ASGI_APPLICATION = 'otica_backend.asgi.application'
 
 # Database - PostgreSQL para produção
+# Conexões persistentes: cada processo (e cada thread de REPORT_QUERY_WORKERS)
+# reaproveita sua conexão por DB_CONN_MAX_AGE segundos em vez de abrir uma por
+# requisição; CONN_HEALTH_CHECKS testa a conexão reaproveitada antes de usá-la.
+# Conexões abertas no pico ~ processos x (1 + REPORT_QUERY_WORKERS).
+#
+# DB_POOLER=pgbouncer: aponte DB_HOST/DB_PORT para o PgBouncer em
+# pool_mode=transaction. Cursores do lado do servidor (.iterator()) não
+# sobrevivem entre transações nesse modo e ficam desligados. O psycopg2 não
+# usa prepared statements; para o Django não emitir SET TIME ZONE por sessão,
+# deixe o fuso do usuário em UTC: ALTER ROLE otica_user SET timezone TO 'UTC'.
+DB_POOLER = config('DB_POOLER', default='')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'otica_db',
-        'USER': 'otica_user',
-        'PASSWORD': 'otica_password_2024',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': config('DB_NAME', default='otica_db'),
+        'USER': config('DB_USER', default='otica_user'),
+        'PASSWORD': config('DB_PASSWORD', default='otica_password_2024'),
+        'HOST': config('DB_HOST', default='localhost'),
+        'PORT': config('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOLER == 'pgbouncer',
+        'OPTIONS': {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+        },
     }
 }
 
+# Réplica de leitura (streaming replication) para relatórios e dashboards;
+# ver otica_app/replica.py. Sem DB_REPLICA_HOST tudo lê do primário.
+if config('DB_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': config('DB_REPLICA_HOST'),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Cache compartilhado entre os workers do gunicorn: a marca de leia-o-que-escreveu
+# da réplica (e os caches de relatórios) precisa valer em qualquer processo.
+# A tabela é criada no deploy com manage.py createcachetable.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'otica_cache',
+    }
+}
+
+DATABASE_ROUTERS = ['otica_app.replica.RoteadorReplica']
+REPLICA_DATABASE_ALIAS = 'replica'
+# Segundos em que o usuário lê do primário depois de uma escrita
+REPLICA_STICKY_SECONDS = 10
+
 # Custom User Model
 AUTH_USER_MODEL = 'otica_app.User'
 
@@ -111,6 +160,29 @@ STATIC_ROOT = '/opt/otica/staticfiles'
 MEDIA_URL = '/otica2/media/'
 MEDIA_ROOT = '/opt/otica/media'
 
+# Compressão das respostas JSON da API (brotli se instalado, senão gzip)
+API_COMPRESSION_MIN_SIZE = 1024
+
+# Fila de tarefas (python manage.py rodar_tarefas). True executa no próprio processo após o commit
+TASKS_EAGER = False
+TASKS_TIMEOUT = 30 * 60
+
+# Stream de eventos por loja: intervalo do heartbeat e duração de cada conexão (segundos)
+EVENTS_HEARTBEAT = 15
+EVENTS_STREAM_MAX_AGE = 5 * 60
+# Validade (s) do ticket de uso único que autentica a abertura do stream (?ticket=)
+EVENTS_TICKET_MAX_AGE = 60
+# Intervalo (s) entre as leituras de EventoLoja pelo processo ASGI e horas de retenção dos eventos
+EVENTS_POLL_INTERVAL = 1
+EVENTS_RETENTION_HOURS = 24
+
+# Threads para as consultas independentes dos dashboards (0 executa em sequência).
+# Cada thread mantém uma conexão própria com o banco.
+REPORT_QUERY_WORKERS = 4
+
+# Dias que as marcas de exclusão da sincronização incremental são mantidas (comando limpar_exclusoes)
+SYNC_TOMBSTONE_DAYS = 90
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -125,6 +197,11 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # FastJSONRenderer usa orjson se instalado; troque por rest_framework.renderers.JSONRenderer para voltar ao padrão
+    'DEFAULT_RENDERER_CLASSES': [
+        'otica_app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # JWT Settings